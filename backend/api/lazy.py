@@ -0,0 +1,184 @@
+"""Routes chargées à la demande et pré-chauffage après démarrage
+
+Les modules de routes importent pandas, NumPy et les services au chargement :
+les importer tous dans create_app retarde la première réponse du health check.
+Les routes viennent d'une table générée en important les blueprints
+(api/route_table.py, versionnée) et pointent vers une LazyView qui n'importe
+son module qu'au premier appel. Les noms d'endpoint restent ceux des
+blueprints ("screening.analyze_ticker"), url_for est inchangé. Toute forme
+de déclaration est prise en charge (décorateur sur plusieurs lignes,
+add_url_rule, méthodes en variable).
+
+Après un ajout ou une modification de route, régénérer la table
+(depuis backend/) : python -m api.lazy
+tests/test_routes.py échoue tant que la table diffère des blueprints, et
+en debug (ou avec ATHAR_LAZY_ROUTES=0) le démarrage aussi.
+
+prewarm() importe ensuite tous les modules, vérifie que les routes
+enregistrées sont bien celles des blueprints (check_routes) et amorce les
+caches en arrière-plan, une fois le health check au vert. Le pré-chauffage
+a lieu dans chaque processus qui reçoit un health check.
+"""
+import importlib
+import os
+import threading
+import time
+
+from flask import Flask
+
+from services.market_data import get_provider
+from services.refresh_scheduler import get_scheduler
+from services.upstream import REFRESH, upstream_priority
+
+# nom du blueprint -> (préfixe, module, variable du blueprint) ; les routes
+# enregistrées au démarrage sont celles de ROUTE_TABLE (voir blueprint_routes)
+LAZY_BLUEPRINTS = {
+    "screening": ("/api/screening", "api.routes.screening", "screening_bp"),
+    "charting": ("/api/chart", "api.routes.charting", "charting_bp"),
+    "news": ("/api/news", "api.routes.news", "news_bp"),
+    "market": ("/api/market", "api.routes.market", "market_bp"),
+    "simulation": ("/api/simulation", "api.routes.simulation", "simulation_bp"),
+    "portfolio": ("/api/portfolio", "api.routes.portfolio", "portfolio_bp"),
+    "zakat": ("/api/zakat", "api.routes.zakat", "zakat_bp"),
+}
+
+ROUTE_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "route_table.py")
+
+
+def blueprint_routes() -> list:
+    """[(règle, endpoint, "module:vue", méthodes)] des blueprints, importés
+
+    Les vues doivent être des fonctions de niveau module (importables par nom).
+    """
+    routes = []
+    for name, (prefix, module, variable) in LAZY_BLUEPRINTS.items():
+        reference = Flask(f"check_{name}")
+        reference.register_blueprint(getattr(importlib.import_module(module), variable), url_prefix=prefix)
+        for rule in reference.url_map.iter_rules():
+            if rule.endpoint == "static":
+                continue
+            view = reference.view_functions[rule.endpoint]
+            target = f"{view.__module__}:{view.__name__}"
+            if getattr(importlib.import_module(view.__module__), view.__name__, None) is not view:
+                raise ValueError(f"{rule.rule} : vue {target} non importable par nom")
+            routes.append((rule.rule, rule.endpoint, target, tuple(sorted(rule.methods - {"HEAD", "OPTIONS"}))))
+    return sorted(routes)
+
+
+def render_route_table(routes: list) -> str:
+    rows = "".join(f"    {route!r},\n" for route in routes)
+    return ('"""Routes des blueprints (générées par python -m api.lazy depuis backend/, ne pas éditer)"""\n'
+            f"ROUTE_TABLE = [\n{rows}]\n")
+
+
+def write_route_table(path: str = ROUTE_TABLE_PATH) -> int:
+    routes = blueprint_routes()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render_route_table(routes))
+    return len(routes)
+
+
+class LazyView:
+    """Vue "module:fonction" importée au premier appel (thread-safe)"""
+
+    def __init__(self, import_name: str):
+        self.import_name = import_name
+        self.__name__ = import_name.rsplit(":", 1)[1]
+        self._view = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._view is not None
+
+    def resolve(self):
+        if self._view is None:
+            with self._lock:
+                if self._view is None:
+                    module, _, name = self.import_name.partition(":")
+                    self._view = getattr(importlib.import_module(module), name)
+        return self._view
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+
+def register_lazy_blueprints(app, eager: bool = False):
+    """Déclare toutes les routes de ROUTE_TABLE (eager=True : imports immédiats et vérification)"""
+    from api.route_table import ROUTE_TABLE
+    for rule, endpoint, target, methods in ROUTE_TABLE:
+        app.add_url_rule(rule, endpoint=endpoint, view_func=LazyView(target), methods=list(methods))
+    # En debug, une table périmée fait échouer le démarrage plutôt qu'une requête
+    if eager or app.debug:
+        load_all(app)
+        verify_routes()
+
+
+def lazy_views(app) -> list:
+    return [v for v in app.view_functions.values() if isinstance(v, LazyView)]
+
+
+def load_all(app) -> int:
+    """Importe tous les modules de routes ; renvoie le nombre de vues chargées"""
+    views = lazy_views(app)
+    for view in views:
+        view.resolve()
+    return len(views)
+
+
+def check_routes() -> list:
+    """Écarts entre ROUTE_TABLE et les routes réellement déclarées par les blueprints"""
+    from api.route_table import ROUTE_TABLE
+    return sorted(set(map(tuple, ROUTE_TABLE)) ^ set(blueprint_routes()))
+
+
+def verify_routes():
+    """Lève une erreur si check_routes trouve un écart (routes importées)"""
+    mismatches = check_routes()
+    if mismatches:
+        raise RuntimeError(f"Routes paresseuses incohérentes avec les blueprints "
+                           f"(régénérer : python -m api.lazy) : {mismatches}")
+
+
+_prewarm = {"state": "idle", "duration": None, "error": None}
+_prewarm_lock = threading.Lock()
+
+
+def prewarm(app):
+    """Importe les routes, instancie le provider et charge les datasets de fond"""
+    start = time.perf_counter()
+    try:
+        load_all(app)
+        verify_routes()
+        get_provider()
+        scheduler = get_scheduler()
+        with upstream_priority(REFRESH):
+            for name in scheduler.status():
+                try:
+                    scheduler.get(name)
+                except Exception as e:
+                    print(f"Pré-chauffage {name} : {e}")
+        _prewarm.update(state="done", error=None)
+    except Exception as e:
+        print(f"Erreur pré-chauffage: {e}")
+        _prewarm.update(state="failed", error=str(e))
+    finally:
+        _prewarm["duration"] = round(time.perf_counter() - start, 2)
+
+
+def start_prewarm(app) -> bool:
+    """Lance prewarm dans un thread de fond (une seule fois par processus)"""
+    with _prewarm_lock:
+        if _prewarm["state"] != "idle":
+            return False
+        _prewarm["state"] = "running"
+    threading.Thread(target=prewarm, args=(app,), name="athar-prewarm", daemon=True).start()
+    return True
+
+
+def prewarm_status() -> dict:
+    return dict(_prewarm)
+
+
+if __name__ == "__main__":
+    print(f"✅ {write_route_table()} routes écrites dans {ROUTE_TABLE_PATH}")
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from flask import Response, g, request
+
+from services.market_data import get_provider
+from services.metrics import (REGISTRY, HTTP_ERRORS, HTTP_IN_FLIGHT, HTTP_LATENCY, Counter, Gauge)
+from services.profiling import PROFILE_THRESHOLD_MS, dump_folded, get_sampler
+
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _route() -> str:
+    # Motif de la route (pas l'URL) : cardinalité bornée ; 404 regroupés
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def provider_metrics() -> list:
+    """Cache, regroupement et budget amont du provider, relus à chaque scrape"""
+    stats = get_provider().stats()
+    requests = Counter("athar_cache_requests_total", "Lectures du cache par type et résultat", ("kind", "result"))
+    ratio = Gauge("athar_cache_hit_ratio", "Taux de succès du cache par type", ("kind",))
+    for kind, counts in stats["by_kind"].items():
+        requests.inc(counts["hits"], kind=kind, result="hit")
+        requests.inc(counts["misses"], kind=kind, result="miss")
+        total = counts["hits"] + counts["misses"]
+        ratio.set(round(counts["hits"] / total, 4) if total else 0, kind=kind)
+
+    cache = stats["cache"]
+    entries = Gauge("athar_cache_entries", "Entrées du cache de données de marché", ("backend",))
+    entries.set(cache["entries"], backend=cache.get("backend", "memory"))
+    evictions = Counter("athar_cache_evictions_total", "Entrées évincées (processus courant)")
+    evictions.inc(cache.get("evictions", 0))
+
+    flights = stats["single_flight"]
+    in_flight = Gauge("athar_single_flight_in_flight", "Appels amont regroupés en cours")
+    in_flight.set(flights["in_flight"])
+    shared = Counter("athar_single_flight_shared_total", "Demandes servies par un appel déjà en cours")
+    shared.inc(flights["shared"])
+    metrics = [requests, ratio, entries, evictions, in_flight, shared]
+
+    upstream = stats.get("upstream")
+    if upstream:
+        breaker = Gauge("athar_upstream_breaker_state", "Disjoncteur Yahoo (0 fermé, 1 semi-ouvert, 2 ouvert)")
+        breaker.set(BREAKER_STATES[upstream["breaker"]["state"]])
+        trips = Counter("athar_upstream_breaker_trips_total", "Ouvertures du disjoncteur Yahoo")
+        trips.inc(upstream["breaker"]["trips"])
+        tokens = Gauge("athar_upstream_tokens", "Jetons disponibles dans le budget Yahoo")
+        tokens.set(upstream["bucket"]["tokens"])
+        waiting = Gauge("athar_upstream_waiting", "Appels en attente d'un jeton")
+        waiting.set(upstream["bucket"]["waiting"])
+        rejected = Counter("athar_upstream_rejected_total", "Appels rejetés (budget épuisé / disjoncteur)")
+        rejected.inc(upstream["rejected"])
+        metrics += [breaker, trips, tokens, waiting, rejected]
+    return metrics
+
+
+def process_metrics() -> list:
+    # Le label pid est ajouté à toutes les séries par le registre
+    info = Gauge("athar_process_info", "Worker qui a servi ce scrape")
+    info.set(1)
+    threads = Gauge("athar_process_threads", "Threads du worker")
+    threads.set(threading.active_count())
+    return [info, threads]
+
+
+REGISTRY.register_collector(process_metrics)
+REGISTRY.register_collector(provider_metrics)
+
+
+def init_metrics(app, profile_threshold_ms: float = PROFILE_THRESHOLD_MS):
+    """Latence / requêtes en cours / exceptions par route, endpoint /metrics
+
+    profile_threshold_ms : si défini, les requêtes plus longues laissent un
+    profil folded (voir services.profiling).
+    """
+    sampler = get_sampler() if profile_threshold_ms is not None else None
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_route = _route()
+        g.metrics_start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(route=g.metrics_route)
+        if sampler is not None:
+            g.metrics_thread = threading.get_ident()
+            sampler.start(g.metrics_thread)
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request_metrics(exc):
+        if "metrics_start" not in g:
+            return
+        duration = time.perf_counter() - g.metrics_start
+        route = g.metrics_route
+        HTTP_IN_FLIGHT.dec(route=route)
+        if exc is not None:
+            HTTP_ERRORS.inc(route=route, error=type(exc).__name__)
+        status = 500 if exc is not None else g.get("metrics_status", 500)
+        HTTP_LATENCY.observe(duration, route=route, method=request.method, status=status)
+
+        if sampler is not None:
+            stacks = sampler.stop(g.metrics_thread)
+            duration_ms = duration * 1000
+            if duration_ms >= profile_threshold_ms and stacks:
+                path = dump_folded(stacks, f"{request.method}-{route}", duration_ms)
+                print(f"🐢 Requête lente {request.method} {route} ({duration_ms:.0f} ms) : profil {path}")
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype=PROMETHEUS_MIMETYPE)
@@ -0,0 +1,89 @@
+import gzip
+import json
+
+from flask import Response, request
+
+# Dépendances optionnelles : encodeur JSON rapide et compression brotli
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Format "colonnes" : {"dates": [...], "open": [...], ...} au lieu d'une liste de dicts
+COLUMNAR_MIMETYPE = "application/vnd.athar.columnar+json"
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE_MIMETYPES = {"application/json", COLUMNAR_MIMETYPE}
+
+
+def _default(obj):
+    # Tableaux et scalaires NumPy (repli sans orjson)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Type non sérialisable : {type(obj).__name__}")
+
+
+def dumps(payload) -> bytes:
+    """JSON compact ; orjson sérialise les tableaux NumPy directement depuis leur buffer"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def wants_columnar() -> bool:
+    """Format négocié via ?format=columnar, {"format": "columnar"} ou l'en-tête Accept"""
+    if request.args.get("format") == "columnar":
+        return True
+    body = request.get_json(silent=True)
+    if isinstance(body, dict) and body.get("format") == "columnar":
+        return True
+    return COLUMNAR_MIMETYPE in request.headers.get("Accept", "")
+
+
+def columnar_response(payload: dict, status: int = 200) -> Response:
+    return Response(dumps(payload), status=status, mimetype=COLUMNAR_MIMETYPE)
+
+
+def rows_to_columns(rows: list, keys: list = None) -> dict:
+    """[{"a": 1, "b": 2}, ...] -> {"a": [1, ...], "b": [2, ...]}"""
+    keys = keys or list(dict.fromkeys(k for row in rows for k in row))
+    return {k: [row.get(k) for row in rows] for k in keys}
+
+
+def init_compression(app, min_size: int = COMPRESS_MIN_BYTES):
+    """Compresse (brotli sinon gzip) les réponses JSON au-delà de min_size octets"""
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200 or response.status_code >= 300
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        encodings = request.accept_encodings
+        if brotli is not None and encodings.quality("br") > 0:
+            body, encoding = brotli.compress(body, quality=5), "br"
+        elif encodings.quality("gzip") > 0:
+            body, encoding = gzip.compress(body, compresslevel=5), "gzip"
+        else:
+            return response
+
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Content-Length"] = str(len(body))
+        response.vary.add("Accept-Encoding")
+        return response
+
+    return app
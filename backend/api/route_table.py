@@ -0,0 +1,19 @@
+"""Routes des blueprints (générées par python -m api.lazy depuis backend/, ne pas éditer)"""
+ROUTE_TABLE = [
+    ('/api/chart/history', 'charting.get_stock_history', 'api.routes.charting:get_stock_history', ('POST',)),
+    ('/api/market/live-prices', 'market.get_live_prices', 'api.routes.market:get_live_prices', ('GET',)),
+    ('/api/market/stream', 'market.stream_live_prices', 'api.routes.market:stream_live_prices', ('GET',)),
+    ('/api/news/latest', 'news.get_market_news', 'api.routes.news:get_market_news', ('GET',)),
+    ('/api/portfolio/analyze', 'portfolio.analyze', 'api.routes.portfolio:analyze', ('POST',)),
+    ('/api/screening/analyze', 'screening.analyze_ticker', 'api.routes.screening:analyze_ticker', ('POST',)),
+    ('/api/screening/etf-look-through', 'screening.look_through_etfs', 'api.routes.screening:look_through_etfs', ('POST',)),
+    ('/api/screening/etf-scan', 'screening.scan_etf', 'api.routes.screening:scan_etf', ('POST',)),
+    ('/api/screening/indicators', 'screening.ticker_indicators', 'api.routes.screening:ticker_indicators', ('POST',)),
+    ('/api/screening/query', 'screening.query_index', 'api.routes.screening:query_index', ('GET', 'POST')),
+    ('/api/simulation/calculate', 'simulation.calculate_simulation', 'api.routes.simulation:calculate_simulation', ('POST',)),
+    ('/api/simulation/grid', 'simulation.calculate_grid', 'api.routes.simulation:calculate_grid', ('POST',)),
+    ('/api/simulation/project', 'simulation.project_simulation', 'api.routes.simulation:project_simulation', ('POST',)),
+    ('/api/zakat/batch', 'zakat.calculate_batch', 'api.routes.zakat:calculate_batch', ('POST',)),
+    ('/api/zakat/calculate', 'zakat.calculate', 'api.routes.zakat:calculate', ('POST',)),
+    ('/api/zakat/nisab', 'zakat.get_nisab', 'api.routes.zakat:get_nisab', ('GET',)),
+]
@@ -1,17 +1,86 @@
 from flask import Blueprint, request, jsonify
-import yfinance as yf
+import numpy as np
 import pandas as pd
+from services.market_data import get_provider
+from services.history_store import get_history_store
+from services.downsampling import lttb_indices, ohlc_buckets, aggregate_ohlc
+from services.indicators import compute as compute_indicators, INDICATORS
+from api.responses import wants_columnar, columnar_response
 
 charting_bp = Blueprint('charting', __name__)
 
+
+def history_columns(hist, date_format: str, max_points: int = None, mode: str = "line",
+                    indicators: dict = None) -> dict:
+    """Colonnes du graphique (tableaux NumPy), sous-échantillonnées si max_points
+
+    - mode "line" : LTTB sur les clôtures (les barres retenues gardent leur OHLCV)
+    - mode "ohlc" : barres agrégées par seau (bougies)
+
+    `indicators` ({nom: série alignée sur hist}) est échantillonné de la même
+    façon (valeur à la dernière barre du seau en mode "ohlc").
+    """
+    dates = hist.index
+    open_, high, low, close = (hist[c].to_numpy(dtype=float) for c in ('Open', 'High', 'Low', 'Close'))
+    volume = hist['Volume'].to_numpy(dtype=float)
+    indicators = indicators or {}
+
+    if max_points and len(hist) > max_points:
+        if mode == "ohlc":
+            starts = ohlc_buckets(len(hist), max_points)
+            open_, high, low, close, volume = aggregate_ohlc(starts, open_, high, low, close, volume)
+            dates = dates[starts]
+            last = np.append(starts[1:], len(hist)) - 1
+            indicators = {name: values[last] for name, values in indicators.items()}
+        else:
+            keep = lttb_indices(dates.asi8.astype(float), close, max_points)
+            dates = dates[keep]
+            open_, high, low, close, volume = open_[keep], high[keep], low[keep], close[keep], volume[keep]
+            indicators = {name: values[keep] for name, values in indicators.items()}
+
+    columns = {
+        "dates": dates.strftime(date_format).tolist(),
+        "price": np.round(close, 2),
+        "volume": np.nan_to_num(volume).astype(np.int64),
+        "open": np.round(open_, 2),
+        "high": np.round(high, 2),
+        "low": np.round(low, 2),
+    }
+    if indicators:
+        # NaN (période d'amorçage) -> null en JSON
+        columns["indicators"] = {
+            name: [None if np.isnan(v) else v for v in np.round(values, 2).tolist()]
+            for name, values in indicators.items()
+        }
+    return columns
+
+
+def history_rows(columns: dict) -> list:
+    """Format historique : une liste de dicts (une entrée par barre)"""
+    return [
+        {"date": d, "price": c, "volume": v, "open": o, "high": h, "low": l}
+        for d, c, v, o, h, l in zip(
+            columns["dates"], columns["price"].tolist(), columns["volume"].tolist(),
+            columns["open"].tolist(), columns["high"].tolist(), columns["low"].tolist(),
+        )
+    ]
+
+
 @charting_bp.route('/history', methods=['POST'])
 def get_stock_history():
     data = request.json
     ticker_symbol = data.get('ticker', '').upper()
     period = data.get('period', '1y') # 1d, 5d, 1mo, 6mo, 1y, 5y, max
+    max_points = data.get('max_points') # Ex: 500 => taille de réponse constante
+    mode = data.get('downsample', 'line') # 'line' (LTTB) ou 'ohlc' (bougies)
+    requested = data.get('indicators') or [] # Ex: ["rsi", "macd", "bb_upper", "bb_lower"]
     
     if not ticker_symbol:
         return jsonify({"error": "Ticker manquant"}), 400
+    try:
+        max_points = int(max_points) if max_points not in (None, "") else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "'max_points' doit être un entier"}), 400
 
     try:
         # Configuration de l'intervalle selon la période
@@ -19,41 +88,48 @@ def get_stock_history():
         if period in ["1d", "5d"]:
             interval = "15m" # Plus précis pour le court terme
         
-        stock = yf.Ticker(ticker_symbol)
-        hist = stock.history(period=period, interval=interval)
+        provider = get_provider()
+        # Journalier : stock local + fin manquante ; intraday : provider direct
+        hist = get_history_store().get_history(ticker_symbol, period=period, interval=interval)
         
         if hist.empty:
             return jsonify({"error": "Aucune donnée disponible"}), 404
 
         # Formatage des données pour le graphique
-        chart_data = []
-        for date, row in hist.iterrows():
-            chart_data.append({
-                # Convertir la date en string (ISO format)
-                "date": date.strftime('%Y-%m-%d %H:%M') if period in ["1d", "5d"] else date.strftime('%Y-%m-%d'),
-                "price": round(row['Close'], 2),
-                "volume": int(row['Volume']),
-                "open": round(row['Open'], 2),
-                "high": round(row['High'], 2),
-                "low": round(row['Low'], 2)
-            })
+        date_format = '%Y-%m-%d %H:%M' if period in ["1d", "5d"] else '%Y-%m-%d'
+        max_points = max_points if max_points and max_points >= 3 else None
+        # Indicateurs calculés sur tout l'historique, avant sous-échantillonnage
+        names = [n for n in requested if n in INDICATORS]
+        series = {}
+        if names:
+            series = {n: v[0] for n, v in compute_indicators(hist['Close'].to_numpy(dtype=float), names).items()}
+        columns = history_columns(hist, date_format, max_points, mode, series)
+        indicator_columns = columns.pop("indicators", None)
 
         # Récupération infos temps réel
-        info = stock.info
+        info = provider.get_info(ticker_symbol)
         current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
         previous_close = info.get('regularMarketPreviousClose', 0)
         change_p = 0
         if previous_close:
             change_p = round(((current_price - previous_close) / previous_close) * 100, 2)
 
-        return jsonify({
+        payload = {
             "ticker": ticker_symbol,
             "name": info.get('longName', ticker_symbol),
             "current_price": current_price,
             "change_p": change_p,
             "currency": info.get('currency', 'USD'),
-            "history": chart_data
-        })
+            "points_total": len(hist),
+            "downsampled": len(columns["dates"]) < len(hist)
+        }
+        if indicator_columns:
+            payload["indicators"] = indicator_columns
+
+        # Format colonnes (opt-in) : encodé directement depuis les tableaux NumPy
+        if wants_columnar():
+            return columnar_response({**payload, "history": columns})
+        return jsonify({**payload, "history": history_rows(columns)})
 
     except Exception as e:
         print(f"Erreur Charting: {e}")
@@ -1,42 +1,65 @@
-from flask import Blueprint, jsonify
-import yfinance as yf
+import json
+import time
+
+from flask import Blueprint, Response, jsonify, request
+from services.live_feed import get_live_poller, live_prices
 
 market_bp = Blueprint('market', __name__)
 
+# Flux SSE : commentaire keep-alive et durée max d'une connexion (le navigateur se reconnecte)
+HEARTBEAT_SECONDS = 15
+STREAM_MAX_SECONDS = 300
+
+
+def _requested_symbols() -> set:
+    """?symbols=SGLD.L,ISDW.L restreint la réponse aux symboles suivis par le poller"""
+    raw = request.args.get('symbols', '')
+    return {s.strip().upper() for s in raw.split(',') if s.strip()}
+
+
+def _select(rows: list, wanted: set) -> list:
+    return [row for row in rows if row["symbol"] in wanted] if wanted else rows
+
+
 @market_bp.route('/live-prices', methods=['GET'])
 def get_live_prices():
-    # Sélection Sharia Compliant
-    assets = {
-        "SGLD.L": "Or Physique",
-        "SSLV.L": "Argent Phys.",
-        "ISDW.L": "World Islamic"
-    }
-    
-    results = []
+    # Snapshot partagé : aucun appel amont par requête
     try:
-        # On récupère tout d'un coup pour la vitesse
-        tickers = yf.Tickers(' '.join(assets.keys()))
-        
-        for symbol, name in assets.items():
-            t = tickers.tickers[symbol]
-            hist = t.history(period="2d") # Pour calculer la variation
-            
-            if len(hist) >= 2:
-                price = hist['Close'].iloc[-1]
-                prev_price = hist['Close'].iloc[-2]
-                change = ((price - prev_price) / prev_price) * 100
-            else:
-                price = t.info.get('regularMarketPrice', 0)
-                change = 0
-
-            results.append({
-                "symbol": symbol,
-                "name": name,
-                "price": round(price, 2),
-                "change": round(change, 2),
-                "currency": "USD" if "L" in symbol else "$"
-            })
-            
-        return jsonify(results)
+        return jsonify(_select(live_prices(), _requested_symbols()))
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@market_bp.route('/stream', methods=['GET'])
+def stream_live_prices():
+    """Server-Sent Events : un évènement "prices" à chaque nouveau snapshot du poller"""
+    live_prices() # Premier chargement si le processus vient de démarrer
+    poller = get_live_poller()
+    wanted = _requested_symbols()
+
+    def events():
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        version, updated_at, rows = poller.snapshot()
+        yield f"retry: {int(poller.interval * 1000)}\n\n"
+        while True:
+            payload = {"updated_at": updated_at, "prices": _select(rows, wanted)}
+            yield f"id: {version}\nevent: prices\ndata: {json.dumps(payload)}\n\n"
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                new_version, updated_at, rows = poller.wait_for_update(
+                    version, min(HEARTBEAT_SECONDS, remaining))
+                if new_version > version:
+                    version = new_version
+                    break
+                # Sans nouveau snapshot : relance le rafraîchissement s'il a expiré
+                live_prices()
+                yield ": keep-alive\n\n"
+
+    return Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
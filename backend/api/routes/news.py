@@ -1,62 +1,170 @@
-from flask import Blueprint, jsonify
-import yfinance as yf
+from flask import Blueprint, jsonify, request
+from api.responses import wants_columnar, columnar_response, rows_to_columns
+from services.market_data import get_provider
+from services.concurrency import fan_out
+from services.live_feed import parse_assets
+from services.refresh_scheduler import get_scheduler
+from services.metrics import timed
 from datetime import datetime
+from bisect import bisect_left, bisect_right
+import hashlib
+import heapq
 import logging
+import os
+import re
 
 news_bp = Blueprint('news', __name__)
 
-def get_news_for_ticker(ticker_symbol):
+# Rafraîchissement du fil d'actualités en arrière-plan (secondes)
+NEWS_REFRESH_SECONDS = 5 * 60
+
+# Actifs suivis : ATHAR_NEWS_ASSETS="GC=F=Or;BTC-USD=Bitcoin", sinon la sélection par défaut
+DEFAULT_NEWS_ASSETS = {
+    "GC=F": "Or",
+    "SI=F": "Argent",
+    "BTC-USD": "Bitcoin",
+    "^GSPC": "S&P 500"
+}
+NEWS_ASSETS = parse_assets(os.environ.get("ATHAR_NEWS_ASSETS", "")) or DEFAULT_NEWS_ASSETS
+
+# Articles conservés dans le fil fusionné, taille de page par défaut / max
+FEED_SIZE = 200
+DEFAULT_LIMIT = 12
+MAX_LIMIT = 50
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def title_hash(title: str) -> str:
+    """Empreinte d'un titre normalisé (casse, ponctuation et espaces ignorés)"""
+    normalized = _NON_WORD.sub(" ", title.casefold()).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def get_news_for_ticker(ticker_symbol, refresh=False):
     try:
-        ticker = yf.Ticker(ticker_symbol)
-        # ticker.news est une liste de dictionnaires
-        return ticker.news if ticker.news else []
+        # Liste de dictionnaires (mise en cache par le provider)
+        return get_provider().get_news(ticker_symbol, refresh=refresh)
     except Exception as e:
+        # Remontée à build_news_feed : un échec ne doit pas passer pour "aucune actualité"
         logging.error(f"Erreur News pour {ticker_symbol}: {e}")
-        return []
+        raise
 
-@news_bp.route('/latest', methods=['GET'])
-def get_market_news():
-    assets = {
-        "GC=F": "Or",
-        "SI=F": "Argent", 
-        "BTC-USD": "Bitcoin", 
-        "^GSPC": "S&P 500"
+
+def format_news_item(item: dict, symbol: str, label: str) -> dict:
+    publish_time = item.get('providerPublishTime', 0)
+    date_obj = datetime.fromtimestamp(publish_time)
+
+    # Récupération de l'image si elle existe
+    thumbnail = item.get('thumbnail', {})
+    img_url = None
+    if thumbnail and 'resolutions' in thumbnail:
+        # On prend la résolution la plus haute disponible
+        img_url = thumbnail['resolutions'][0].get('url')
+
+    return {
+        "id": title_hash(item['title']),
+        "title": item['title'],
+        "publisher": item.get('publisher'),
+        "link": item.get('link'),
+        "date": date_obj.strftime("%d/%m %H:%M"),
+        "timestamp": publish_time,
+        "symbol": symbol,
+        "asset_label": label,
+        "thumbnail": img_url,
+        # Certains providers donnent un petit résumé
+        "summary": item.get('summary', '')
     }
-    
-    all_news = []
-    seen_titles = set()
 
+
+@timed("news.build_feed")
+def build_news_feed(assets: dict = None):
+    """Fil fusionné (rechargé par l'ordonnanceur, jamais dans une requête)
+
+    Les actifs sont interrogés en parallèle ; un même titre (normalisé)
+    n'apparaît qu'une fois, rattaché au premier actif de la liste. Seuls les
+    FEED_SIZE plus récents sont retenus (tas), triés par (date desc, id) :
+    `keys` permet la pagination par curseur en O(log n).
+
+    Lève une erreur si tous les actifs ont échoué, ou si le fil est vide alors
+    que le précédent ne l'était pas : l'ordonnanceur garde alors l'ancien fil.
+    """
+    assets = assets or NEWS_ASSETS
+    fetched, errors = fan_out(lambda symbol: get_news_for_ticker(symbol, refresh=True), list(assets))
+    if errors and len(errors) == len(assets):
+        raise RuntimeError(f"actualités indisponibles pour tous les actifs ({len(errors)})")
+
+    unique = {}
     for symbol, label in assets.items():
-        news_items = get_news_for_ticker(symbol)
-        
-        for item in news_items:
-            title = item.get('title')
-            if title and title not in seen_titles:
-                seen_titles.add(title)
-                
-                publish_time = item.get('providerPublishTime', 0)
-                date_obj = datetime.fromtimestamp(publish_time)
-                
-                # Récupération de l'image si elle existe
-                thumbnail = item.get('thumbnail', {})
-                img_url = None
-                if thumbnail and 'resolutions' in thumbnail:
-                    # On prend la résolution la plus haute disponible
-                    img_url = thumbnail['resolutions'][0].get('url')
-
-                all_news.append({
-                    "title": title,
-                    "publisher": item.get('publisher'),
-                    "link": item.get('link'),
-                    "date": date_obj.strftime("%d/%m %H:%M"),
-                    "timestamp": publish_time,
-                    "asset_label": label,
-                    "thumbnail": img_url,
-                    # Certains providers donnent un petit résumé
-                    "summary": item.get('summary', '') 
-                })
-
-    # Tri par plus récent
-    all_news.sort(key=lambda x: x['timestamp'], reverse=True)
-
-    return jsonify(all_news[:12])
\ No newline at end of file
+        for item in fetched.get(symbol, []):
+            if not item.get('title'):
+                continue
+            news = format_news_item(item, symbol, label)
+            unique.setdefault(news["id"], news)
+
+    items = heapq.nsmallest(FEED_SIZE, unique.values(), key=lambda n: (-n['timestamp'], n['id']))
+    if not items and (get_scheduler().peek("news_feed") or {}).get("items"):
+        raise RuntimeError("fil d'actualités vide, fil précédent conservé")
+    return {"items": items, "keys": [(-n['timestamp'], n['id']) for n in items]}
+
+
+def parse_cursor(cursor: str) -> tuple:
+    """"<timestamp>:<id>" -> clé de tri du dernier article déjà reçu"""
+    timestamp, _, news_id = cursor.partition(":")
+    return (-int(timestamp), news_id)
+
+
+def page_news(feed: dict, limit: int = DEFAULT_LIMIT, cursor: str = None,
+              since: int = None, symbols: set = None) -> tuple:
+    """(articles, curseur suivant) : page après `cursor`, limitée aux articles plus récents que `since`"""
+    items, keys = feed["items"], feed["keys"]
+    start = bisect_right(keys, parse_cursor(cursor)) if cursor else 0
+    # Articles publiés strictement après `since` : clés < (-since, "")
+    stop = bisect_left(keys, (-int(since), "")) if since is not None else len(items)
+
+    page = []
+    for news in items[start:stop]:
+        if symbols and news["symbol"] not in symbols:
+            continue
+        page.append(news)
+        if len(page) == limit:
+            break
+
+    next_cursor = None
+    if len(page) == limit:
+        last = page[-1]
+        next_cursor = f"{last['timestamp']}:{last['id']}"
+    return page, next_cursor
+
+
+get_scheduler().register("news_feed", build_news_feed, NEWS_REFRESH_SECONDS)
+
+
+@news_bp.route('/latest', methods=['GET'])
+def get_market_news():
+    """Fil d'actualités paginé
+
+    ?limit=12&cursor=<X-Next-Cursor précédent>&since=<timestamp>&assets=GC=F,BTC-USD
+    Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        since = request.args.get('since', type=int)
+        cursor = request.args.get('cursor')
+        if cursor:
+            parse_cursor(cursor)
+    except ValueError:
+        return jsonify({"error": "Paramètres de pagination invalides"}), 400
+
+    symbols = {s.strip().upper() for s in request.args.get('assets', '').split(',') if s.strip()}
+
+    # Dernier fil connu, servi sans attendre Yahoo
+    latest, next_cursor = page_news(get_scheduler().get("news_feed"), limit, cursor, since, symbols)
+
+    if wants_columnar():
+        response = columnar_response(rows_to_columns(latest))
+    else:
+        response = jsonify(latest)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
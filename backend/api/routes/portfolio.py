@@ -1,8 +1,10 @@
 from flask import Blueprint, jsonify, request
-from services.portfolio_service import PortfolioService
+from services.portfolio_service import PortfolioService, PortfolioSessionService
+from api.responses import wants_columnar, columnar_response, rows_to_columns
 
 portfolio_bp = Blueprint('portfolio', __name__)
 service = PortfolioService()
+sessions = PortfolioSessionService()
 
 @portfolio_bp.route('/analyze', methods=['POST'])
 def analyze():
@@ -11,11 +13,26 @@ def analyze():
         # Ex: [{"ticker": "AAPL", "qty": 10, "type": "stock"}, ...]
         data = request.get_json()
         assets = data.get('assets', [])
+
+        # Mode différentiel : {"delta": true, "session_id": "...", "assets": [...]}
+        # (sans "assets" : simple rafraîchissement des cours de la session ; session
+        # expirée => valorisation complète, 404 seulement si la liste d'actifs est inconnue)
+        if data.get('delta') or data.get('session_id'):
+            try:
+                result = sessions.analyze_delta(data.get('assets'), data.get('session_id'))
+            except KeyError as e:
+                return jsonify({'success': False, 'error': str(e.args[0])}), 404
+            if wants_columnar():
+                return columnar_response({'success': True, 'result': {**result, 'changed': rows_to_columns(result['changed'])}})
+            return jsonify({'success': True, 'result': result})
         
         if not assets:
             return jsonify({'success': True, 'result': {'total_value': 0, 'assets': []}})
 
         result = service.analyze_portfolio(assets)
+        if wants_columnar():
+            # Une colonne par champ au lieu d'une liste de dicts par actif
+            return columnar_response({'success': True, 'result': {**result, 'assets': rows_to_columns(result['assets'])}})
         return jsonify({'success': True, 'result': result})
         
     except Exception as e:
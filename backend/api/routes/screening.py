@@ -1,6 +1,16 @@
 from flask import Blueprint, request, jsonify
-import yfinance as yf
+import numpy as np
 import pandas as pd
+from services.market_data import get_provider
+from services.concurrency import fan_out
+from services.compliance_engine import ratios_row
+from services.business_rules import RULES
+from services.etf_lookthrough import holding_rows, get_lookthrough_service
+from services.screening_index import get_screening_index, RANGE_FILTERS, DEFAULT_PAGE_SIZE
+from services.history_store import get_history_store
+from services.indicators import calendar_groups, compute as compute_indicators, INDICATORS
+from services.upstream import batch_budget, stale_sources, upstream_deadline, upstream_priority
+from services.metrics import timed
 
 screening_bp = Blueprint('screening', __name__)
 
@@ -17,81 +27,120 @@ def sanitize_value(val, default=0, is_percent=False):
     return round(val, 2) if isinstance(val, (int, float)) else val
 
 
-# --- ROUTE 1 : ANALYSE ACTION ---
-@screening_bp.route('/analyze', methods=['POST'])
-def analyze_ticker():
-    data = request.json
-    ticker_input = data.get('tickers', '').upper()
-    
-    if not ticker_input:
-        return jsonify({"error": "Ticker manquant"}), 400
+class TickerNotFound(Exception):
+    pass
+
+
+class UpstreamUnavailable(Exception):
+    pass
 
+
+MAX_BATCH_TICKERS = 500
+
+
+def parse_tickers(raw):
+    """Accepte une liste ou une chaîne "AAPL, MSFT" et renvoie des tickers uniques"""
+    if isinstance(raw, str):
+        raw = raw.replace(';', ',').replace(' ', ',').split(',')
+    elif not isinstance(raw, (list, tuple)):
+        return []
+    tickers = [str(t).strip().upper() for t in raw if t and str(t).strip()]
+    return list(dict.fromkeys(tickers))
+
+
+@timed("screening.screen_ticker")
+def screen_ticker(ticker_input):
+    """Analyse AAOIFI + sectorielle d'un ticker (lève TickerNotFound / UpstreamUnavailable)"""
     try:
-        stock = yf.Ticker(ticker_input)
-        
-        try:
-            info = stock.info
-            if not info or len(info) < 5:
-                return jsonify({"error": "Ticker introuvable ou données indisponibles"}), 404
-        except Exception:
-            return jsonify({"error": "Yahoo Finance indisponible, réessayez dans quelques secondes"}), 503
+        info = get_provider().get_info(ticker_input)
+    except Exception:
+        raise UpstreamUnavailable("Yahoo Finance indisponible, réessayez dans quelques secondes")
+    if not info or len(info) < 5:
+        raise TickerNotFound("Ticker introuvable ou données indisponibles")
 
-        # --- CALCULS AAOIFI ---
-        market_cap = info.get('marketCap', 0)
-        total_debt = info.get('totalDebt', 0)
-        total_cash = info.get('totalCash', 0)
-        
-        debt_ratio = (total_debt / market_cap * 100) if market_cap > 0 else 0
-        cash_ratio = (total_cash / market_cap * 100) if market_cap > 0 else 0
-        
-        # --- SCREENER SECTORIEL ---
-        banned = [
-            'bank', 'insurance', 'reinsurance', 'mortgage', 'lending', 'interest',
-            'casino', 'gambling', 'betting', 'lottery', 'adult entertainment', 'pornography', 'music',
-            'alcohol', 'liquor', 'brewery', 'distillery', 'wine', 'tobacco', 'cigarette', 'cigar',
-            'pork', 'bacon', 'ham', 'swine',
-            'defense', 'military', 'weapon', 'armament', 'missile'
-        ]
-        
-        business_text = f"{info.get('sector', '')} {info.get('industry', '')} {info.get('longBusinessSummary', '')}".lower()
-        found_keywords = [w for w in banned if w in business_text]
-        
-        is_halal = len(found_keywords) == 0 and debt_ratio < 33 and cash_ratio < 33
+    # --- CALCULS AAOIFI ---
+    debt_ratio, cash_ratio = ratios_row(info, method='analyze')
+    
+    # --- SCREENER SECTORIEL ---
+    business_text = f"{info.get('sector', '')} {info.get('industry', '')} {info.get('longBusinessSummary', '')}"
+    matches = RULES.scan(business_text)
+    found_keywords = list(dict.fromkeys(m.term for m in matches))
+    
+    is_halal = len(found_keywords) == 0 and debt_ratio < 33 and cash_ratio < 33
 
-        # --- CORRECTION INTELLIGENTE DU POURCENTAGE ---
-        raw_change = info.get('regularMarketChangePercent') or 0
-        change_p = round(raw_change * 100, 2) if abs(raw_change) < 0.5 else round(raw_change, 2)
+    # --- CORRECTION INTELLIGENTE DU POURCENTAGE ---
+    raw_change = info.get('regularMarketChangePercent') or 0
+    change_p = round(raw_change * 100, 2) if abs(raw_change) < 0.5 else round(raw_change, 2)
 
-        result = {
-            "ticker": ticker_input,
-            "name": info.get('longName', ticker_input),
-            "price": info.get('currentPrice', info.get('regularMarketPrice', 0)),
-            "change_p": change_p,
-            "sector": info.get('sector', 'N/A'),
-            "industry": info.get('industry', 'N/A'),
-            "ratios": {
-                "debt_ratio": round(debt_ratio, 2),
-                "cash_ratio": round(cash_ratio, 2)
-            },
-            "compliance": {
-                "is_halal": is_halal,
-                "business_check": {
-                    "failed": len(found_keywords) > 0,
-                    "found_keywords": found_keywords
-                }
-            },
-            "technicals": {
-                "per": sanitize_value(info.get('trailingPE'), "N/A"),
-                "roe": sanitize_value(info.get('returnOnEquity'), "N/A", is_percent=True),
-                "dividend_yield": sanitize_value(info.get('dividendYield'), 0, is_percent=True)
+    result = {
+        "ticker": ticker_input,
+        "name": info.get('longName', ticker_input),
+        "price": info.get('currentPrice', info.get('regularMarketPrice', 0)),
+        "change_p": change_p,
+        "sector": info.get('sector', 'N/A'),
+        "industry": info.get('industry', 'N/A'),
+        "ratios": {
+            "debt_ratio": round(debt_ratio, 2),
+            "cash_ratio": round(cash_ratio, 2)
+        },
+        "compliance": {
+            "is_halal": is_halal,
+            "business_check": {
+                "failed": len(found_keywords) > 0,
+                "found_keywords": found_keywords,
+                "matches": [m._asdict() for m in matches],
+                "rules_version": RULES.version
             }
+        },
+        "technicals": {
+            "per": sanitize_value(info.get('trailingPE'), "N/A"),
+            "roe": sanitize_value(info.get('returnOnEquity'), "N/A", is_percent=True),
+            "dividend_yield": sanitize_value(info.get('dividendYield'), 0, is_percent=True)
         }
+    }
 
-        return jsonify({"results": [result]})
+    return result
 
-    except Exception as e:
-        print(f"Erreur Analyse: {e}")
-        return jsonify({"error": str(e)}), 500
+
+# --- ROUTE 1 : ANALYSE ACTION(S) ---
+@screening_bp.route('/analyze', methods=['POST'])
+def analyze_ticker():
+    data = request.json or {}
+    tickers = parse_tickers(data.get('tickers', ''))
+    
+    if not tickers:
+        return jsonify({"error": "Ticker manquant"}), 400
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({"error": f"Maximum {MAX_BATCH_TICKERS} tickers par requête"}), 400
+
+    # Un seul ticker : on garde les codes d'erreur historiques (404 / 503)
+    if len(tickers) == 1:
+        try:
+            result = screen_ticker(tickers[0])
+            return jsonify({"success": True, "results": [result], "errors": [], "stale": bool(stale_sources())})
+        except TickerNotFound as e:
+            return jsonify({"error": str(e)}), 404
+        except UpstreamUnavailable as e:
+            return jsonify({"error": str(e)}), 503
+        except Exception as e:
+            print(f"Erreur Analyse: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    # Plusieurs tickers : fan-out borné, résultats partiels + erreurs par ticker.
+    # Un appel amont par ticker : un gros lot attend ses jetons en priorité batch
+    priority, timeout = batch_budget(len(tickers))
+    with upstream_priority(priority), upstream_deadline(timeout):
+        results, errors = fan_out(screen_ticker, tickers, timeout=timeout)
+    for ticker, e in errors.items():
+        print(f"Erreur Analyse {ticker}: {e}")
+
+    return jsonify({
+        "success": True,
+        "results": [results[t] for t in tickers if t in results],
+        "errors": [{"ticker": t, "error": str(errors[t])} for t in tickers if t in errors],
+        # Vrai si une partie des données vient du cache périmé (Yahoo limité / en panne)
+        "stale": bool(stale_sources())
+    })
 
 
 # --- ROUTE 2 : ETF X-RAY ---
@@ -99,15 +148,16 @@ def analyze_ticker():
 def scan_etf():
     data = request.json
     ticker_input = data.get('ticker', '').upper()
+    look_through = bool(data.get('look_through'))
     
     if not ticker_input:
         return jsonify({"error": "Ticker manquant"}), 400
 
     try:
-        etf = yf.Ticker(ticker_input)
+        provider = get_provider()
 
         try:
-            info = etf.info
+            info = provider.get_info(ticker_input)
             if not info or len(info) < 5:
                 return jsonify({"error": "ETF introuvable ou données indisponibles"}), 404
         except Exception:
@@ -116,18 +166,7 @@ def scan_etf():
         # 1. Holdings
         top_holdings = []
         try:
-            funds_data = etf.funds_data
-            top_h = funds_data.top_holdings if funds_data else None
-            if top_h is not None and not top_h.empty:
-                for _, row in top_h.head(10).iterrows():
-                    holding_name = row.get("Holding Name", row.get("Symbol", "Inconnu"))
-                    percent = row.get("% Net Assets", row.get("Weight", 0))
-                    if isinstance(percent, float) and percent < 1:
-                        percent = percent * 100
-                    top_holdings.append({
-                        "name": str(holding_name),
-                        "percent": round(float(percent), 2)
-                    })
+            top_holdings = holding_rows(provider.get_holdings(ticker_input))
         except Exception:
             top_holdings = []
 
@@ -151,8 +190,135 @@ def scan_etf():
             "top_region": "Global"
         }
 
+        # 3. Conformité par transparence (optionnelle) : chaque ligne passée au crible
+        if look_through:
+            service = get_lookthrough_service()
+            profiles = service.screen_holdings([h["symbol"] for h in top_holdings])
+            result["look_through"] = service.summarize(ticker_input, top_holdings, profiles)
+
+        result["stale"] = bool(stale_sources())
         return jsonify(result)
 
     except Exception as e:
         print(f"Erreur ETF: {e}")
         return jsonify({"error": "Impossible d'analyser cet ETF ou données indisponibles."}), 500
+
+
+# --- ROUTE 3 : ETF LOOK-THROUGH (plusieurs fonds) ---
+@screening_bp.route('/etf-look-through', methods=['POST'])
+def look_through_etfs():
+    """Conformité pondérée de plusieurs ETF ; les lignes communes ne sont analysées qu'une fois"""
+    data = request.json or {}
+    etfs = parse_tickers(data.get('tickers', data.get('ticker', '')))
+
+    if not etfs:
+        return jsonify({"error": "Ticker manquant"}), 400
+    if len(etfs) > MAX_BATCH_TICKERS:
+        return jsonify({"error": f"Maximum {MAX_BATCH_TICKERS} tickers par requête"}), 400
+
+    try:
+        summaries, errors, unique_holdings = get_lookthrough_service().analyze(etfs)
+    except Exception as e:
+        print(f"Erreur Look-through: {e}")
+        return jsonify({"error": "Impossible d'analyser ces ETF ou données indisponibles."}), 500
+
+    for etf, e in errors.items():
+        print(f"Erreur Look-through {etf}: {e}")
+    return jsonify({
+        "success": True,
+        "results": [summaries[t] for t in etfs if t in summaries],
+        "errors": [{"ticker": t, "error": str(errors[t])} for t in etfs if t in errors],
+        "unique_holdings": unique_holdings
+    })
+
+
+# --- ROUTE 4 : RECHERCHE DANS L'INDEX PRÉCALCULÉ ---
+def _query_params() -> dict:
+    """Paramètres de /query : corps JSON (POST) ou query string (GET)"""
+    if request.method == 'POST':
+        return request.get_json(silent=True) or {}
+    params = request.args.to_dict()
+    sectors = [s for value in request.args.getlist('sector') for s in value.split(',') if s.strip()]
+    if sectors:
+        params['sector'] = [s.strip() for s in sectors]
+    return params
+
+
+@screening_bp.route('/query', methods=['GET', 'POST'])
+def query_index():
+    """Filtre / trie l'univers précalculé (aucun appel à Yahoo)
+
+    Filtres : sector, type, is_halal, q, min_/max_ score|debt|cash|rsi|rating|position_52w|price
+    Tri : sort (ex: sharia_score, debt_ratio, rsi), order (asc|desc) ; pagination : limit, offset ou page
+    """
+    params = _query_params()
+    filters = {k: params[k] for k in ('sector', 'type', 'q') if params.get(k)}
+    if params.get('is_halal') not in (None, ''):
+        filters['is_halal'] = str(params['is_halal']).lower() in ('1', 'true', 'yes', 'oui')
+
+    try:
+        for name in RANGE_FILTERS:
+            for key in ('min_' + name, 'max_' + name):
+                if params.get(key) not in (None, ''):
+                    filters[key] = float(params[key])
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(params['offset']) if params.get('offset') is not None else (int(params.get('page', 1)) - 1) * limit
+        result = get_screening_index().query(
+            filters, sort=params.get('sort', 'sharia_score'), order=params.get('order', 'desc'),
+            limit=limit, offset=offset,
+        )
+    except ValueError as e:
+        return jsonify({"error": f"Paramètres invalides : {e}"}), 400
+    except Exception as e:
+        print(f"Erreur Query: {e}")
+        return jsonify({"error": "Index de screening indisponible"}), 500
+
+    return jsonify({"success": True, **result})
+
+
+# --- ROUTE 5 : INDICATEURS TECHNIQUES (plusieurs tickers) ---
+@screening_bp.route('/indicators', methods=['POST'])
+def ticker_indicators():
+    """Dernières valeurs des indicateurs pour une liste de tickers (un seul calcul matriciel)
+
+    {"tickers": "AAPL, MSFT", "indicators": ["rsi", "macd"], "period": "2y"}
+    """
+    data = request.json or {}
+    tickers = parse_tickers(data.get('tickers', ''))
+    names = [n for n in (data.get('indicators') or INDICATORS) if n in INDICATORS]
+    period = data.get('period', '2y') # 52 semaines + amorçage des moyennes
+
+    if not tickers:
+        return jsonify({"error": "Ticker manquant"}), 400
+    if len(tickers) > MAX_BATCH_TICKERS:
+        return jsonify({"error": f"Maximum {MAX_BATCH_TICKERS} tickers par requête"}), 400
+
+    store = get_history_store()
+    priority, timeout = batch_budget(len(tickers))
+    with upstream_priority(priority), upstream_deadline(timeout):
+        histories, errors = fan_out(lambda t: store.get_history(t, period=period)['Close'], tickers,
+                                    timeout=timeout)
+    closes = {t: histories[t] for t in tickers if t in histories and len(histories[t])}
+    # Un calcul matriciel par calendrier de cotation : chaque ticker est
+    # évalué sur ses propres séances et daté de sa dernière clôture
+    latest = {}
+    for symbols, dates, matrix in calendar_groups(closes):
+        values = compute_indicators(matrix, names)
+        for i, ticker in enumerate(symbols):
+            last = np.flatnonzero(np.isfinite(matrix[i]))[-1]
+            latest[ticker] = {
+                "ticker": ticker,
+                "date": dates[last].strftime('%Y-%m-%d'),
+                "close": round(float(matrix[i, last]), 2),
+                "indicators": {n: None if np.isnan(values[n][i, last]) else round(float(values[n][i, last]), 2)
+                               for n in names}
+            }
+    results = [latest[t] for t in tickers if t in latest]
+    missing = [t for t in tickers if t not in latest and t not in errors]
+
+    return jsonify({
+        "success": True,
+        "results": results,
+        "errors": [{"ticker": t, "error": str(errors[t])} for t in tickers if t in errors]
+                  + [{"ticker": t, "error": "Aucune donnée disponible"} for t in missing]
+    })
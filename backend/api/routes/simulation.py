@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request
-from services.simulation_service import SimulationService
+from services.simulation_service import SimulationService, MAX_PROJECTION_PATHS
 
 simulation_bp = Blueprint('simulation', __name__)
 service = SimulationService()
@@ -21,5 +21,66 @@ def calculate_simulation():
         else:
             return jsonify({'success': False, 'error': "Erreur lors de la simulation"}), 400
             
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@simulation_bp.route('/grid', methods=['POST'])
+def calculate_grid():
+    """Mode grille : toutes les combinaisons (tickers x mises x années)"""
+    try:
+        data = request.get_json()
+        
+        # Ex: {"ticker_sets": ["AAPL", "AAPL, MSFT"], "monthly_amounts": [100, 200], "start_years": [2015, 2018]}
+        ticker_sets = data.get('ticker_sets', [data.get('tickers', 'AAPL')])
+        monthly_amounts = data.get('monthly_amounts', [data.get('monthly_amount', 100)])
+        start_years = data.get('start_years', [data.get('start_year', 2018)])
+        # Une chaîne serait parcourue caractère par caractère ("AAPL" -> "A", "A", ...)
+        for name, values in (('ticker_sets', ticker_sets), ('monthly_amounts', monthly_amounts),
+                             ('start_years', start_years)):
+            if not isinstance(values, list):
+                return jsonify({'success': False, 'error': f"'{name}' doit être une liste"}), 400
+        
+        result = service.simulate_grid(ticker_sets, monthly_amounts, start_years)
+        
+        if result:
+            return jsonify({'success': True, 'result': result})
+        else:
+            return jsonify({'success': False, 'error': "Erreur lors de la simulation"}), 400
+            
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@simulation_bp.route('/project', methods=['POST'])
+def project_simulation():
+    """Projection Monte Carlo : bandes de percentiles sur la valeur finale"""
+    try:
+        data = request.get_json()
+        
+        tickers = data.get('tickers', 'AAPL')
+        monthly_amount = float(data.get('monthly_amount', 100))
+        horizon_years = min(int(data.get('horizon_years', 10)), 50)
+        history_start_year = int(data.get('history_start_year', 2010))
+        n_paths = min(int(data.get('n_paths', 10000)), MAX_PROJECTION_PATHS)
+        if horizon_years < 1 or n_paths < 1:
+            return jsonify({'success': False, 'error': "'horizon_years' et 'n_paths' doivent être >= 1"}), 400
+        block_months = max(1, int(data.get('block_months', 12)))
+        seed = data.get('seed') # Graine optionnelle => résultats reproductibles
+        
+        result = service.project_dca(
+            tickers, monthly_amount, horizon_years, history_start_year, n_paths, block_months,
+            seed=int(seed) if seed is not None else None
+        )
+        
+        if result:
+            return jsonify({'success': True, 'result': result})
+        else:
+            return jsonify({'success': False, 'error': "Erreur lors de la projection"}), 400
+            
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
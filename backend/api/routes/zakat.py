@@ -1,5 +1,5 @@
 from flask import Blueprint, jsonify, request
-from services.zakat_service import ZakatService
+from services.zakat_service import MAX_BATCH_HOUSEHOLDS, ZakatService
 
 zakat_bp = Blueprint('zakat', __name__)
 service = ZakatService()
@@ -11,5 +11,37 @@ def calculate():
         result = service.calculate_zakat(data)
         
         return jsonify({'success': True, 'result': result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@zakat_bp.route('/batch', methods=['POST'])
+def calculate_batch():
+    """Zakat de nombreux foyers en un appel : {"households": [{...}], "currency": "EUR", "nisab": "silver"}"""
+    data = request.get_json(silent=True) or {}
+    households = data.get('households')
+    if not isinstance(households, list) or not households:
+        return jsonify({'success': False, 'error': "Liste 'households' requise"}), 400
+    if len(households) > MAX_BATCH_HOUSEHOLDS:
+        return jsonify({'success': False, 'error': f"Maximum {MAX_BATCH_HOUSEHOLDS} foyers par lot"}), 400
+    try:
+        result = service.calculate_batch(households, data.get('currency') or 'EUR', data.get('nisab'))
+        return jsonify({'success': True, 'result': result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@zakat_bp.route('/nisab', methods=['GET'])
+def get_nisab():
+    """Seuils du nisab et provenance des cours ; ?fx=1 ajoute la matrice de change"""
+    try:
+        result = service.get_metal_prices(request.args.get('currency', 'EUR'))
+        if request.args.get('fx') == '1':
+            result['fx_matrix'] = service.oracle.fx_matrix()
+        return jsonify({'success': True, 'result': result})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
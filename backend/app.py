@@ -1,36 +1,68 @@
 import os
 from flask import Flask, jsonify
 from flask_cors import CORS
+from api.responses import init_compression
+from api.metrics import init_metrics
+from api.lazy import register_lazy_blueprints, start_prewarm, prewarm_status
+from services.refresh_scheduler import get_scheduler
+from services.upstream import stale_sources, track_stale
 
-# Importation des Blueprints
-from api.routes.screening import screening_bp
-from api.routes.news import news_bp
-# [NOUVEAU] Importation du module de prix en direct
-from api.routes.market import market_bp
-from api.routes.charting import charting_bp
+# Les blueprints (pandas, NumPy, services) sont importés à la première requête
+# sur leurs routes (api/lazy.py) : le health check répond dès le démarrage
 
 def create_app():
     app = Flask(__name__)
 
     # --- CONFIGURATION DES CORS ---
     # Autorise ton frontend à communiquer avec l'API
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, expose_headers=["X-Next-Cursor", "X-Data-Stale"])
+
+    # --- COMPRESSION ---
+    # gzip / brotli des réponses JSON volumineuses (historiques, portefeuilles)
+    init_compression(app)
+
+    # --- MÉTRIQUES ---
+    # Latences par route et par appel Yahoo, cache, erreurs : GET /metrics (Prometheus)
+    init_metrics(app)
+
+    # --- DONNÉES PÉRIMÉES ---
+    # Yahoo limité / en panne : le provider sert la dernière valeur connue,
+    # signalée au client par l'en-tête X-Data-Stale (types de données concernés)
+    @app.before_request
+    def start_stale_tracking():
+        track_stale()
+
+    @app.after_request
+    def flag_stale_response(response):
+        sources = stale_sources()
+        if sources:
+            response.headers["X-Data-Stale"] = ",".join(sorted({kind for kind, _ in sources}))
+        return response
 
     # --- ENREGISTREMENT DES BLUEPRINTS ---
-    # Chaque module a son propre préfixe pour éviter les conflits
-    app.register_blueprint(screening_bp, url_prefix='/api/screening')
-    app.register_blueprint(charting_bp, url_prefix='/api/chart')
-    app.register_blueprint(news_bp, url_prefix='/api/news')
-    # [NOUVEAU] Route pour le "Marché en Direct" de l'accueil
-    app.register_blueprint(market_bp, url_prefix='/api/market')
+    # Chaque module a son propre préfixe pour éviter les conflits (table dans api/lazy.py)
+    # ATHAR_LAZY_ROUTES=0 : tout importer au démarrage (comportement historique)
+    register_lazy_blueprints(app, eager=os.environ.get("ATHAR_LAZY_ROUTES", "1") == "0")
+
+    # --- RAFRAÎCHISSEMENT EN ARRIÈRE-PLAN ---
+    # Prix live, actualités, cours des métaux : servis depuis la dernière valeur connue
+    if os.environ.get("ATHAR_BACKGROUND_REFRESH", "1") != "0":
+        get_scheduler().start()
 
     # --- ROUTE DE TEST (HEALTH CHECK) ---
+    # Premier health check au vert : pré-chauffage en arrière-plan (routes, provider,
+    # prix live / actualités / métaux), sauf ATHAR_PREWARM=0
+    prewarm_enabled = os.environ.get("ATHAR_PREWARM", "1") != "0"
+
     @app.route('/')
     def health_check():
+        if prewarm_enabled:
+            start_prewarm(app)
         return jsonify({
             "status": "online",
             "message": "Athar API is running",
-            "version": "1.1.0"
+            "version": "1.1.0",
+            "warm": prewarm_status()["state"]
         }), 200
 
     return app
@@ -0,0 +1,249 @@
+"""Suite de charge hors-ligne : chaque blueprint via le client de test Flask
+
+Les données Yahoo sont rejouées (services.replay) : enregistrement local
+s'il existe (data/fixtures/yahoo.pkl), sinon jeu synthétique déterministe.
+Pour chaque endpoint : débit, p50 / p99 sous charge multi-thread et
+allocations par requête (tracemalloc, passe séparée mono-thread).
+Chaque mesure est répétée (--repeat) et la médiane retenue. Les résultats
+peuvent être sauvegardés comme référence (benchmarks/baselines/, versionné)
+puis comparés : code de sortie 1 si un endpoint renvoie plus d'erreurs, ou
+ralentit au-delà de la tolérance relative ET du plancher absolu (--floor-ms,
+les p50 de ~1 ms varient de plus de 25 % d'un passage à l'autre). La
+référence dépend de la machine : la régénérer avec --save-baseline sur celle
+qui fait les comparaisons.
+
+Le flux SSE /api/market/stream (connexion longue) n'est pas mesuré ici.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_api [--threads 8] [--requests 40] [--only screening,chart]
+                                   [--latency-ms 0] [--repeat 3] [--save-baseline]
+                                   [--tolerance 0.25] [--floor-ms 2]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+
+_tmp = tempfile.mkdtemp(prefix="athar-bench-api-")
+os.environ.setdefault("ATHAR_BACKGROUND_REFRESH", "0")
+os.environ.setdefault("ATHAR_CACHE_URL", "memory")
+os.environ.setdefault("ATHAR_HISTORY_DIR", os.path.join(_tmp, "history"))
+os.environ.setdefault("ATHAR_SCREENING_INDEX", os.path.join(_tmp, "screening_index.sqlite"))
+
+from app import create_app  # noqa: E402
+from services.market_data import MarketDataProvider, set_provider  # noqa: E402
+from services.replay import ETFS, FIXTURES_PATH, ReplayBackend, load_fixtures, synthetic_fixtures  # noqa: E402
+from services.screening_index import get_screening_index  # noqa: E402
+
+# Hors de data/ (ignoré par git) : la référence est versionnée avec le code
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "api_baseline.json")
+
+PORTFOLIO = [
+    {"ticker": t, "qty": 10 + i, "avg_price": 100 + 3 * i, "type": "stock"}
+    for i, t in enumerate(["AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "JNJ", "PG", "XOM"] * 6)
+]
+
+HOUSEHOLDS = [
+    {"cash": 500 * i, "savings": 1000 + 37 * i, "stocks": 250 * (i % 9), "gold": 80 * (i % 5),
+     "debts": 400 * (i % 7), "currency": ("EUR", "USD", "GBP", "MAD")[i % 4]}
+    for i in range(2000)
+]
+
+# (nom, blueprint, méthode, url, corps JSON)
+SCENARIOS = [
+    ("screening.analyze", "screening", "POST", "/api/screening/analyze", {"tickers": "AAPL"}),
+    ("screening.analyze_batch", "screening", "POST", "/api/screening/analyze",
+     {"tickers": "AAPL,MSFT,NVDA,GOOGL,AMZN,JNJ,PG,XOM"}),
+    ("screening.etf_scan", "screening", "POST", "/api/screening/etf-scan", {"ticker": "SPUS", "look_through": True}),
+    ("screening.etf_look_through", "screening", "POST", "/api/screening/etf-look-through",
+     {"tickers": ["SPUS", "HLAL"]}),
+    ("screening.query", "screening", "GET", "/api/screening/query?min_score=40&sort=debt_ratio&order=asc", None),
+    ("screening.indicators", "screening", "POST", "/api/screening/indicators",
+     {"tickers": ["AAPL", "MSFT", "NVDA", "GOOGL"], "indicators": ["rsi", "macd", "bb_upper"], "period": "2y"}),
+    ("chart.history_1y", "chart", "POST", "/api/chart/history",
+     {"ticker": "AAPL", "period": "1y", "max_points": 300, "indicators": ["rsi"]}),
+    ("chart.history_5y", "chart", "POST", "/api/chart/history", {"ticker": "MSFT", "period": "5y"}),
+    ("news.latest", "news", "GET", "/api/news/latest?limit=12", None),
+    ("market.live_prices", "market", "GET", "/api/market/live-prices", None),
+    ("portfolio.analyze", "portfolio", "POST", "/api/portfolio/analyze", {"assets": PORTFOLIO}),
+    ("simulation.calculate", "simulation", "POST", "/api/simulation/calculate",
+     {"tickers": "AAPL, MSFT", "monthly_amount": 200, "start_year": 2018}),
+    ("simulation.grid", "simulation", "POST", "/api/simulation/grid",
+     {"ticker_sets": ["AAPL", "AAPL, MSFT"], "monthly_amounts": [100, 300], "start_years": [2017, 2020]}),
+    ("simulation.project", "simulation", "POST", "/api/simulation/project",
+     {"tickers": "AAPL", "monthly_amount": 100, "horizon_years": 10, "n_paths": 2000, "seed": 1}),
+    ("zakat.calculate", "zakat", "POST", "/api/zakat/calculate",
+     {"cash": 5000, "savings": 12000, "stocks": 8000, "gold": 1500, "debts": 2000}),
+    ("zakat.batch", "zakat", "POST", "/api/zakat/batch", {"households": HOUSEHOLDS}),
+]
+
+
+def setup(latency_ms: float):
+    """Provider de rejeu, index de screening et application"""
+    if os.path.exists(FIXTURES_PATH):
+        fixtures, source = load_fixtures(FIXTURES_PATH), FIXTURES_PATH
+    else:
+        fixtures, source = synthetic_fixtures(), "synthétique"
+    set_provider(MarketDataProvider(ReplayBackend(fixtures, latency_ms / 1000)))
+    get_screening_index().build([s for s in fixtures if s not in ETFS])
+
+    return create_app(), source
+
+
+def call(client, method: str, url: str, body):
+    return client.open(url, method=method, json=body) if body is not None else client.open(url, method=method)
+
+
+def load(app, method: str, url: str, body, threads: int, requests: int) -> dict:
+    """`threads` clients envoient chacun `requests` requêtes en boucle"""
+    latencies, statuses = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        client = app.test_client()
+        local_lat, local_status = [], []
+        barrier.wait()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            response = call(client, method, url, body)
+            response.get_data()
+            local_lat.append(time.perf_counter() - t0)
+            local_status.append(response.status_code)
+        with lock:
+            latencies.extend(local_lat)
+            statuses.extend(local_status)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "throughput": round(len(latencies) / wall, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "errors": sum(s >= 400 for s in statuses),
+    }
+
+
+def repeated_load(app, method: str, url: str, body, threads: int, requests: int, repeat: int) -> dict:
+    """Médiane de `repeat` passages (erreurs : le pire passage)"""
+    runs = [load(app, method, url, body, threads, requests) for _ in range(max(1, repeat))]
+    stats = {key: round(float(np.median([r[key] for r in runs])), 2) for key in ("throughput", "p50_ms", "p99_ms")}
+    stats["errors"] = max(r["errors"] for r in runs)
+    return stats
+
+
+def allocations(app, method: str, url: str, body, samples: int = 5) -> dict:
+    """Pic et reliquat de mémoire Python allouée par requête (moyennes)"""
+    client = app.test_client()
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            call(client, method, url, body).get_data()
+            after, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_kib": round(np.mean(peaks) / 1024, 1), "alloc_retained_kib": round(np.mean(retained) / 1024, 1)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float, floor_ms: float = 0) -> list:
+    """Endpoints avec plus d'erreurs, plus lents (p50) ou moins rapides (débit) que la référence
+
+    Une hausse du p50 n'est une régression que si elle dépasse à la fois la
+    tolérance relative et floor_ms ; le débit suit le même plancher, converti
+    en requêtes/s au p50 de référence.
+    """
+    regressions = []
+    for name, current in results.items():
+        ref = baseline.get(name)
+        if not ref:
+            continue
+        if current["errors"] > ref.get("errors", 0):
+            regressions.append(f"{name}: erreurs {ref.get('errors', 0)} -> {current['errors']}")
+        if current["p50_ms"] > ref["p50_ms"] * (1 + tolerance) and current["p50_ms"] - ref["p50_ms"] > floor_ms:
+            regressions.append(f"{name}: p50 {ref['p50_ms']} -> {current['p50_ms']} ms")
+        # Débit équivalent au plancher : ref x p50 / (p50 + plancher)
+        floor_ratio = ref["p50_ms"] / (ref["p50_ms"] + floor_ms) if ref["p50_ms"] > 0 else 1
+        if current["throughput"] < ref["throughput"] * min(1 - tolerance, floor_ratio):
+            regressions.append(f"{name}: débit {ref['throughput']} -> {current['throughput']} req/s")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=40, help="requêtes par thread")
+    parser.add_argument("--only", default="", help="blueprints ou scénarios, séparés par des virgules")
+    parser.add_argument("--latency-ms", type=float, default=0, help="latence Yahoo simulée par appel")
+    parser.add_argument("--repeat", type=int, default=3, help="passages par endpoint (médiane)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--floor-ms", type=float, default=2.0, help="hausse minimale du p50 comptée comme régression")
+    args = parser.parse_args(argv)
+
+    with redirect_stdout(io.StringIO()):
+        app, source = setup(args.latency_ms)
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+    scenarios = [s for s in SCENARIOS if not only or s[0] in only or s[1] in only]
+    print(f"données : {source} | {args.threads} threads x {args.requests} requêtes | "
+          f"latence amont {args.latency_ms:.0f} ms")
+    print(f"{'endpoint':28s} {'req/s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'pic KiB':>9s} {'reste KiB':>10s} erreurs")
+
+    results = {}
+    for name, _, method, url, body in scenarios:
+        # Les print des services ("💼 Analyse de ...") masqueraient le tableau
+        with redirect_stdout(io.StringIO()):
+            warm = call(app.test_client(), method, url, body)
+            stats = repeated_load(app, method, url, body, args.threads, args.requests, args.repeat)
+            stats.update(allocations(app, method, url, body))
+        if warm.status_code >= 400:
+            print(f"{name:28s} ⚠️ statut {warm.status_code} : {warm.get_data(as_text=True)[:120]}")
+        results[name] = stats
+        print(f"{name:28s} {stats['throughput']:8.1f} {stats['p50_ms']:8.2f} {stats['p99_ms']:8.2f} "
+              f"{stats['alloc_peak_kib']:9.1f} {stats['alloc_retained_kib']:10.1f} {stats['errors']}")
+
+    status = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if (baseline.get("threads"), baseline.get("requests")) != (args.threads, args.requests):
+            print(f"⚠️ référence mesurée avec {baseline.get('threads')} threads x {baseline.get('requests')} requêtes")
+        regressions = compare(results, baseline["results"], args.tolerance, args.floor_ms)
+        for line in regressions:
+            print(f"❌ régression {line}")
+        if not regressions:
+            print("✅ aucune régression vs la référence")
+        status = 1 if regressions else 0
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.strftime("%Y-%m-%d %H:%M:%S"), "source": source,
+                       "threads": args.threads, "requests": args.requests, "repeat": args.repeat,
+                       "results": results}, f, indent=2)
+        print(f"💾 référence enregistrée : {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
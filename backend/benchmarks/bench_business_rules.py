@@ -0,0 +1,105 @@
+"""Benchmark : référentiel d'activités compilé vs scans de sous-chaînes historiques
+
+Usage (depuis backend/) : python -m benchmarks.bench_business_rules [n_textes]
+"""
+import random
+import sys
+import time
+
+from services.business_rules import RULES
+
+FILLER = (
+    "the company designs manufactures and markets smartphones personal computers "
+    "tablets wearables and accessories worldwide. it also provides cloud software "
+    "platforms, data analytics and enterprise solutions to customers in Birmingham, "
+    "Chicago and Shanghai through its retail and online stores"
+).split()
+
+
+# Textes distincts du scénario "requêtes répétées"
+HOT_TEXTS = 200
+
+
+def legacy_analyze(sector: str, industry: str, summary: str):
+    """Copie du filtre historique de /api/screening/analyze"""
+    banned = [
+        'bank', 'insurance', 'reinsurance', 'mortgage', 'lending', 'interest',
+        'casino', 'gambling', 'betting', 'lottery', 'adult entertainment', 'pornography', 'music',
+        'alcohol', 'liquor', 'brewery', 'distillery', 'wine', 'tobacco', 'cigarette', 'cigar',
+        'pork', 'bacon', 'ham', 'swine',
+        'defense', 'military', 'weapon', 'armament', 'missile'
+    ]
+    business_text = f"{sector} {industry} {summary}".lower()
+    return [w for w in banned if w in business_text]
+
+
+def legacy_profile(ticker: str, summary: str):
+    """Copie du filtre historique de get_company_profile"""
+    forbidden_terms = [
+        'alcohol', 'tobacco', 'gambling', 'casino', 'pork', 'music',
+        'cinema', 'adult', 'porn', 'bank', 'insurance', 'interest',
+        'lending', 'defense', 'weapon', 'military', 'distiller', 'brewer', 'wine',
+        'hotel', 'resort', 'entertainment'
+    ]
+    manual_blacklist = ['PLTR', 'LMT', 'RTX', 'BA', 'JPM', 'BAC']
+    manual_whitelist = ['SPUS', 'HLAL', 'ISDW.L', 'ISDU.L', 'GLDM', 'SPSK']
+    if ticker in manual_whitelist or ticker in manual_blacklist:
+        return []
+    return [term for term in forbidden_terms if term in summary.lower()]
+
+
+def compiled_analyze(sector: str, industry: str, summary: str):
+    return RULES.scan(f"{sector} {industry} {summary}")
+
+
+def compiled_profile(ticker: str, summary: str):
+    if RULES.is_whitelisted(ticker) or RULES.is_blacklisted(ticker):
+        return []
+    return RULES.found_terms(summary)
+
+
+def timed(func, rows) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        func(*row)
+    return time.perf_counter() - start
+
+
+def random_universe(n_texts: int, words: int = 350, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    flagged = [form for _, _, forms in RULES.rules for form in forms]
+    universe = []
+    for i in range(n_texts):
+        text = [rng.choice(FILLER) for _ in range(words)]
+        if i % 8 == 0:
+            text.insert(rng.randrange(words), rng.choice(flagged))
+        universe.append((f"T{i:05d}", "Technology", "Consumer Electronics", ' '.join(text)))
+    return universe
+
+
+def main(n_texts: int = 10_000):
+    universe = random_universe(n_texts)
+    analyze_rows = [row[1:] for row in universe]
+    profile_rows = [(row[0], row[3]) for row in universe]
+
+    chars = sum(len(row[3]) for row in universe)
+    print(f"textes       : {n_texts} ({chars / n_texts:.0f} caractères en moyenne)")
+    for label, legacy, compiled, rows in [
+        ("analyze", legacy_analyze, compiled_analyze, analyze_rows),
+        ("profile", legacy_profile, compiled_profile, profile_rows),
+    ]:
+        legacy_s = timed(legacy, rows)
+        compiled_s = timed(compiled, rows)
+        print(f"{label:<12} : sous-chaînes {legacy_s * 1000:.1f} ms | référentiel "
+              f"{compiled_s * 1000:.1f} ms | x{legacy_s / compiled_s:.1f}")
+
+    # Trafic réel : les mêmes tickers populaires reviennent (résumés déjà scannés)
+    hot = (analyze_rows[:HOT_TEXTS] * (n_texts // HOT_TEXTS + 1))[:n_texts]
+    legacy_s = timed(legacy_analyze, hot)
+    compiled_s = timed(compiled_analyze, hot)
+    print(f"{'analyze hot':<12} : sous-chaînes {legacy_s * 1000:.1f} ms | référentiel "
+          f"{compiled_s * 1000:.1f} ms | x{legacy_s / compiled_s:.1f} ({HOT_TEXTS} textes distincts)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,65 @@
+"""Benchmark : taille et temps d'encodage de /api/chart/history (1y / 5y / max)
+
+Compare le format historique (liste de dicts, json stdlib), le format
+colonnes (api.responses.dumps) et leur version gzip, avec et sans LTTB.
+
+Usage (depuis backend/) : python -m benchmarks.bench_chart_payload [max_points]
+"""
+import gzip
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from api.responses import dumps
+from api.routes.charting import history_columns, history_rows
+
+# Nombre de séances approximatif par période
+PERIODS = {"1y": 252, "5y": 1260, "max": 252 * 45}
+
+
+def synthetic_ohlcv(n_bars: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n_bars)))
+    spread = np.abs(rng.normal(0, 0.01, n_bars)) * close
+    index = pd.bdate_range(end="2026-01-02", periods=n_bars, tz="America/New_York", name="Date")
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.3, n_bars) * spread,
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1e5, 1e7, n_bars).astype(float),
+    }, index=index)
+
+
+def measure(hist, max_points, mode, columnar):
+    start = time.perf_counter()
+    columns = history_columns(hist, '%Y-%m-%d', max_points, mode)
+    if columnar:
+        body = dumps({"history": columns})
+    else:
+        body = json.dumps({"history": history_rows(columns)}).encode("utf-8")
+    elapsed = time.perf_counter() - start
+    return len(columns["dates"]), len(body), len(gzip.compress(body, compresslevel=5)), elapsed
+
+
+def main(max_points: int = 500):
+    cases = [
+        ("lignes", None, "line", False),
+        ("colonnes", None, "line", True),
+        ("LTTB", max_points, "line", False),
+        ("LTTB+col", max_points, "line", True),
+        ("OHLC+col", max_points, "ohlc", True),
+    ]
+    print(f"{'période':<8}{'format':<10}{'points':>8}{'octets':>10}{'gzip':>10}{'encodage':>12}")
+    for period, n_bars in PERIODS.items():
+        hist = synthetic_ohlcv(n_bars)
+        for label, points, mode, columnar in cases:
+            n, size, compressed, elapsed = measure(hist, points, mode, columnar)
+            print(f"{period:<8}{label:<10}{n:>8}{size:>10}{compressed:>10}{elapsed * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,88 @@
+"""Démarrage à froid : temps jusqu'à la première réponse saine du health check
+
+Chaque essai lance un interpréteur neuf (comme un nouveau worker Render) qui
+importe app, crée l'application et appelle GET / via le client de test ; le
+parent chronomètre du lancement du processus à la réponse 200. L'enfant
+mesure ensuite la première requête API (données rejouées, aucun réseau),
+qui paie en mode paresseux l'import du module de routes.
+
+Comparaison : ATHAR_LAZY_ROUTES=0 (tous les blueprints importés au
+démarrage, comportement historique) contre les routes paresseuses.
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_cold_start [essais]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t_import = time.perf_counter()
+app = create_app()
+client = app.test_client()
+assert client.get('/').status_code == 200
+t_healthy = time.perf_counter()
+heavy = sorted(m for m in ('pandas', 'numpy', 'yfinance') if m in sys.modules)
+print('HEALTHY', flush=True)
+
+# Première requête API : provider de rejeu (import hors chronométrage)
+from services.market_data import MarketDataProvider, set_provider
+from services.replay import ReplayBackend, synthetic_fixtures
+set_provider(MarketDataProvider(ReplayBackend(synthetic_fixtures(['AAPL'], years=2))))
+t1 = time.perf_counter()
+status = client.post('/api/chart/history', json={'ticker': 'AAPL', 'period': '1y'}).status_code
+t_api = time.perf_counter()
+print(json.dumps({'import': t_import - t0, 'healthy': t_healthy - t0, 'first_api': t_api - t1,
+                  'api_status': status, 'heavy': heavy}))
+"""
+
+
+def run_once(lazy: bool) -> dict:
+    env = dict(os.environ, ATHAR_LAZY_ROUTES="1" if lazy else "0", ATHAR_BACKGROUND_REFRESH="0",
+               ATHAR_PREWARM="0", ATHAR_CACHE_URL="memory")
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in proc.stdout:
+        if line.strip() == "HEALTHY":
+            spawn_to_healthy = time.perf_counter() - start
+            break
+    else:
+        proc.wait()
+        raise RuntimeError("le processus enfant n'a pas répondu au health check")
+    result = {}
+    for line in proc.stdout:
+        if line.startswith("{"):
+            result = json.loads(line)
+    proc.wait()
+    result["spawn_to_healthy"] = spawn_to_healthy
+    return result
+
+
+def summarize(runs: list) -> dict:
+    return {key: statistics.median(r[key] for r in runs) * 1000
+            for key in ("spawn_to_healthy", "import", "healthy", "first_api")}
+
+
+def main():
+    trials = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{trials} essais par mode (médianes, ms)")
+    print(f"{'mode':10s} {'lancement→200':>14s} {'import app':>11s} {'→ /':>8s} {'1re API':>9s}  modules lourds")
+    for label, lazy in (("eager", False), ("paresseux", True)):
+        runs = [run_once(lazy) for _ in range(trials)]
+        stats = summarize(runs)
+        heavy = ",".join(runs[-1]["heavy"]) or "aucun"
+        print(f"{label:10s} {stats['spawn_to_healthy']:14.0f} {stats['import']:11.0f} {stats['healthy']:8.0f} "
+              f"{stats['first_api']:9.0f}  {heavy} (statut API {runs[-1]['api_status']})")
+
+
+if __name__ == "__main__":
+    main()
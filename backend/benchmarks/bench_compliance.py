@@ -0,0 +1,129 @@
+"""Benchmark : moteur AAOIFI vectoriel vs logique scalaire historique
+
+Le temps vectoriel inclut la construction de la table (build_frame) : c'est
+le coût réel d'un lot. evaluate_row est le chemin des requêtes unitaires.
+
+Usage (depuis backend/) : python -m benchmarks.bench_compliance [n_rows]
+"""
+import sys
+import time
+
+import numpy as np
+
+from services.compliance_engine import build_frame, evaluate, evaluate_row
+
+
+def legacy_profile(info: dict, whitelisted: bool = False, activity_halal: bool = True) -> dict:
+    """Copie de la logique par ticker de get_company_profile (référence)"""
+    total_assets = info.get('totalAssets')
+    total_debt = info.get('totalDebt')
+    cash = info.get('totalCash') or info.get('cashAndCashEquivalents')
+    market_cap = info.get('marketCap')
+
+    denominator = market_cap if market_cap else total_assets
+    debt_ratio = 0
+    cash_ratio = 0
+    if denominator and denominator > 0:
+        if total_debt: debt_ratio = round((total_debt / denominator) * 100, 2)
+        if cash: cash_ratio = round((cash / denominator) * 100, 2)
+
+    is_halal = activity_halal and (debt_ratio < 33) and (cash_ratio < 33)
+
+    sharia_score = 0
+    if activity_halal:
+        sharia_score += 40
+        if whitelisted: sharia_score = 100
+        else:
+            if debt_ratio < 33: sharia_score += 30 * (1 - (debt_ratio / 33))
+            if cash_ratio < 33: sharia_score += 30 * (1 - (cash_ratio / 33))
+    sharia_score = round(max(0, min(100, sharia_score)))
+
+    roe = info.get('returnOnEquity')
+    profit_margin = info.get('profitMargins')
+    peg = info.get('pegRatio')
+    rating = 1
+    if roe and roe > 0.15: rating += 1
+    if profit_margin and profit_margin > 0.15: rating += 1
+    if peg and peg < 1.5: rating += 1
+    if is_halal: rating += 1
+    if whitelisted: rating = 5
+
+    return {
+        "debt_ratio": debt_ratio, "cash_ratio": cash_ratio, "is_halal": is_halal,
+        "sharia_score": sharia_score, "rating": min(5, rating),
+    }
+
+
+def random_universe(n_rows: int, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+
+    def maybe(values, missing=0.1):
+        return [None if m else float(v) for v, m in zip(values, rng.random(n_rows) < missing)]
+
+    columns = {
+        'marketCap': maybe(rng.lognormal(22, 2, n_rows)),
+        'totalAssets': maybe(rng.lognormal(22, 2, n_rows)),
+        'totalDebt': maybe(rng.lognormal(20, 2, n_rows), 0.2),
+        'totalCash': maybe(rng.lognormal(20, 2, n_rows), 0.2),
+        'cashAndCashEquivalents': maybe(rng.lognormal(20, 2, n_rows), 0.5),
+        'returnOnEquity': maybe(rng.normal(0.12, 0.15, n_rows), 0.2),
+        'profitMargins': maybe(rng.normal(0.1, 0.12, n_rows), 0.2),
+        'pegRatio': maybe(rng.normal(1.8, 1.2, n_rows), 0.3),
+    }
+    return {
+        f"T{i:05d}": {k: v[i] for k, v in columns.items() if v[i] is not None}
+        for i in range(n_rows)
+    }
+
+
+def main(n_rows: int = 10_000):
+    infos = random_universe(n_rows)
+
+    start = time.perf_counter()
+    legacy = {t: legacy_profile(info) for t, info in infos.items()}
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = evaluate(build_frame(infos))
+    vector_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = {t: evaluate_row(info) for t, info in infos.items()}
+    row_s = time.perf_counter() - start
+
+    # Ligne unique : ce que coûterait une requête unitaire via la table
+    ticker, info = next(iter(infos.items()))
+    start = time.perf_counter()
+    for _ in range(100):
+        evaluate(build_frame({ticker: info}))
+    single_frame_s = (time.perf_counter() - start) / 100
+    start = time.perf_counter()
+    for _ in range(100):
+        evaluate_row(info)
+    single_row_s = (time.perf_counter() - start) / 100
+
+    def summary(row) -> dict:
+        return {
+            "debt_ratio": float(row['debt_ratio']), "cash_ratio": float(row['cash_ratio']),
+            "is_halal": bool(row['is_halal']), "sharia_score": int(row['sharia_score']),
+            "rating": int(row['rating']),
+        }
+
+    mismatches = row_mismatches = 0
+    for ticker, expected in legacy.items():
+        if summary(result.loc[ticker]) != expected:
+            mismatches += 1
+        if summary(rows[ticker]) != expected:
+            row_mismatches += 1
+
+    print(f"lignes            : {n_rows}")
+    print(f"scalaire          : {legacy_s * 1000:.1f} ms")
+    print(f"vectoriel         : {vector_s * 1000:.1f} ms (construction table comprise)")
+    print(f"evaluate_row      : {row_s * 1000:.1f} ms")
+    print(f"accélération      : x{legacy_s / vector_s:.1f}")
+    print(f"ligne unique      : table {single_frame_s * 1e6:.0f} µs / evaluate_row {single_row_s * 1e6:.1f} µs")
+    print(f"écarts de résultat: {mismatches} (table) / {row_mismatches} (evaluate_row)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,85 @@
+"""Benchmark : look-through de plusieurs ETF aux lignes communes
+
+Un backend local simule la latence de Yahoo. On compte les appels amont :
+ils doivent suivre le nombre de lignes distinctes, pas la somme des lignes.
+
+Usage (depuis backend/) : python -m benchmarks.bench_etf_lookthrough [n_etfs] [latence_ms]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import MarketDataProvider, set_provider
+from services.etf_lookthrough import ETFLookThroughService
+
+
+class SlowBackend:
+    """Backend factice : 10 lignes par ETF tirées d'un univers restreint de méga-capitalisations"""
+
+    def __init__(self, n_etfs: int, universe: int, latency: float, seed: int = 5):
+        rng = np.random.default_rng(seed)
+        self.latency = latency
+        self.calls = 0
+        self.funds = {}
+        for i in range(n_etfs):
+            symbols = rng.choice(universe, size=10, replace=False)
+            weights = np.sort(rng.uniform(0.01, 0.08, size=10))[::-1]
+            self.funds[f"ETF{i}"] = pd.DataFrame(
+                {"Name": [f"Company {s}" for s in symbols], "Holding Percent": weights},
+                index=pd.Index([f"CO{s}" for s in symbols], name="Symbol"),
+            )
+        self.rng = rng
+
+    def _call(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def fetch_holdings(self, ticker: str):
+        self._call()
+        return self.funds[ticker]
+
+    def fetch_info(self, ticker: str) -> dict:
+        self._call()
+        seed = sum(map(ord, ticker))
+        return {
+            "longName": ticker, "sector": "Technology", "industry": "Software",
+            "marketCap": 1e12, "totalDebt": (seed % 40) * 1e10, "totalCash": (seed % 25) * 1e10,
+            "longBusinessSummary": "Designs software and hardware.",
+        }
+
+    def fetch_history(self, ticker: str, **params):
+        self._call()
+        index = pd.date_range("2026-01-01", periods=60, freq="B")
+        return pd.DataFrame({"Close": np.linspace(100, 120, len(index))}, index=index)
+
+
+def main(n_etfs: int = 20, latency_ms: float = 30):
+    backend = SlowBackend(n_etfs, universe=40, latency=latency_ms / 1000)
+    set_provider(MarketDataProvider(backend))
+    etfs = list(backend.funds)
+
+    service = ETFLookThroughService()
+    start = time.perf_counter()
+    summaries, errors, unique_holdings = service.analyze(etfs)
+    elapsed = time.perf_counter() - start
+
+    total_lines = sum(len(f) for f in backend.funds.values())
+    print(f"ETF : {n_etfs} | lignes : {total_lines} | lignes distinctes : {unique_holdings} "
+          f"| latence amont : {latency_ms:.0f} ms")
+    print(f"appels amont : {backend.calls} (holdings {n_etfs} + 2 x {unique_holdings} profils)")
+    print(f"durée        : {elapsed:.2f} s | erreurs : {len(errors)}")
+
+    calls_before = backend.calls
+    start = time.perf_counter()
+    service.analyze(etfs)
+    print(f"2e passage   : {time.perf_counter() - start:.3f} s, {backend.calls - calls_before} appel(s) amont")
+    sample = summaries[etfs[0]]
+    print(f"{etfs[0]} : score pondéré {sample['weighted_score']} | "
+          f"exposition non conforme {sample['non_compliant_exposure']}%")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 20, float(args[1]) if len(args) > 1 else 30)
@@ -0,0 +1,98 @@
+"""Benchmark : moteur d'indicateurs matriciel vs calcul pandas ticker par ticker
+
+Usage (depuis backend/) : python -m benchmarks.bench_indicators [n_tickers] [n_dates]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.indicators import IndicatorState, compute
+
+
+def random_prices(n_tickers: int, n_dates: int, seed: int = 9) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, size=(n_tickers, n_dates)), axis=1))
+    # Introductions en bourse échelonnées : NaN avant la première cotation
+    starts = rng.integers(0, n_dates // 4, size=n_tickers)
+    prices[np.arange(n_dates) < starts[:, None]] = np.nan
+    return prices
+
+
+def wilder(values: pd.Series, period: int) -> pd.Series:
+    """Lissage de Wilder amorcé par la moyenne simple des `period` premières variations"""
+    seeded = values.copy()
+    seeded.iloc[period] = values.iloc[1:period + 1].mean()
+    seeded.iloc[:period] = np.nan
+    return seeded.ewm(alpha=1 / period, adjust=False).mean()
+
+
+def pandas_indicators(close: pd.Series) -> dict:
+    """Référence : mêmes indicateurs avec pandas, un ticker à la fois"""
+    delta = close.diff()
+    gain = wilder(delta.clip(lower=0), 14)
+    loss = wilder(-delta.clip(upper=0), 14)
+    ema12 = close.ewm(span=12, adjust=False).mean()
+    ema26 = close.ewm(span=26, adjust=False).mean()
+    macd = ema12 - ema26
+    mid = close.rolling(20).mean()
+    std = close.rolling(20).std(ddof=0)
+    low = close.rolling(252, min_periods=1).min()
+    high = close.rolling(252, min_periods=1).max()
+    return {
+        "rsi": 100 - 100 / (1 + gain / loss), "sma": mid, "ema": close.ewm(span=20, adjust=False).mean(),
+        "macd": macd, "macd_signal": macd.ewm(span=9, adjust=False).mean(),
+        "bb_upper": mid + 2 * std, "bb_lower": mid - 2 * std, "position_52w": (close - low) / (high - low) * 100,
+    }
+
+
+# Indicateurs comparés à la référence pandas
+CHECKED = ("sma", "ema", "bb_upper", "bb_lower", "rsi", "macd", "macd_signal")
+
+
+def check(prices: np.ndarray, out: dict, sample: int):
+    """Résultats du moteur identiques à la référence pandas (à la tolérance flottante près)"""
+    for i, row in enumerate(prices[:sample]):
+        valid = np.isfinite(row)
+        reference = pandas_indicators(pd.Series(row[valid]))
+        for name in CHECKED:
+            np.testing.assert_allclose(out[name][i, valid], reference[name].to_numpy(), rtol=1e-7, atol=1e-7,
+                                       equal_nan=True, err_msg=f"{name}, ticker {i}")
+
+
+def main(n_tickers: int = 5000, n_dates: int = 504):
+    prices = random_prices(n_tickers, n_dates)
+    print(f"matrice : {n_tickers} tickers x {n_dates} dates")
+
+    start = time.perf_counter()
+    out = compute(prices)
+    matrix_s = time.perf_counter() - start
+
+    sample = 200
+    start = time.perf_counter()
+    for row in prices[:sample]:
+        pandas_indicators(pd.Series(row).dropna())
+    pandas_s = (time.perf_counter() - start) * n_tickers / sample
+    check(prices, out, sample)
+
+    state = IndicatorState(n_tickers)
+    state.fit(prices[:, :-20])
+    start = time.perf_counter()
+    for j in range(n_dates - 20, n_dates):
+        latest = state.update(prices[:, j])
+    update_ms = (time.perf_counter() - start) / 20 * 1000
+    # La mise à jour barre par barre retombe sur le calcul de l'historique complet
+    for name in CHECKED:
+        np.testing.assert_allclose(latest[name], out[name][:, -1], rtol=1e-7, atol=1e-7, equal_nan=True,
+                                   err_msg=f"{name}, mise à jour")
+
+    print(f"résultats identiques à pandas      : {', '.join(CHECKED)} ({min(sample, n_tickers)} tickers)")
+    print(f"pandas, ticker par ticker (estimé) : {pandas_s:8.2f} s")
+    print(f"moteur matriciel (historique)      : {matrix_s:8.2f} s  (x{pandas_s / matrix_s:.1f})")
+    print(f"mise à jour d'une barre            : {update_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 5000, int(args[1]) if len(args) > 1 else 504)
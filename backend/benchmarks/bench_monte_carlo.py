@@ -0,0 +1,50 @@
+"""Benchmark : passage à l'échelle de la projection Monte Carlo (1 à N processus)
+
+Usage (depuis backend/) : python -m benchmarks.bench_monte_carlo [n_paths]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from services.monte_carlo import project
+
+
+def synthetic_history(n_months: int = 240, n_tickers: int = 5, seed: int = 1):
+    """Rendements mensuels corrélés et dividendes trimestriels (sans réseau)"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.007, 0.04, size=(n_months, 1))
+    returns = market + rng.normal(0.001, 0.03, size=(n_months, n_tickers))
+    yields = np.zeros_like(returns)
+    yields[::3] = rng.uniform(0.002, 0.008, size=(len(yields[::3]), n_tickers))
+    return returns, yields
+
+
+def main(n_paths: int = 100_000):
+    returns, yields = synthetic_history()
+    amounts = np.full(returns.shape[1], 100.0)
+    horizon = 240
+
+    reference = None
+    baseline_s = None
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"trajectoires : {n_paths} | horizon : {horizon} mois | tickers : {returns.shape[1]}")
+    for workers in counts:
+        if workers > 1:
+            # Démarrage du pool hors chronométrage (il est persistant en production)
+            project(returns, yields, amounts, 12, workers * 2048, seed=0, workers=workers)
+        start = time.perf_counter()
+        result = project(returns, yields, amounts, horizon, n_paths, seed=42, workers=workers)
+        elapsed = time.perf_counter() - start
+
+        baseline_s = baseline_s or elapsed
+        if reference is None:
+            reference = result["final_value"]
+        identical = np.array_equal(reference, result["final_value"])
+        print(f"{workers:>3} processus : {elapsed:6.2f} s | x{baseline_s / elapsed:4.1f} | "
+              f"médiane {np.median(result['final_value']):,.0f} | identique : {identical}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,126 @@
+"""Benchmark : valorisation d'un gros portefeuille (cours groupés, calendriers de dividendes partagés)
+
+Un backend local simule la latence de Yahoo (sans réseau). La référence est
+la boucle historique : un appel cours + un appel info par ligne, en série.
+La purification n'est plus comparée : elle vient désormais des ex-dates
+réelles (calendriers) et non du rendement `dividendYield`. Une seconde
+passe mesure le coût une fois les calendriers en cache.
+
+Usage (depuis backend/) : python -m benchmarks.bench_portfolio [n_positions] [latence_ms]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("ATHAR_HISTORY_DIR", tempfile.mkdtemp(prefix="athar-bench-portfolio-"))
+
+from services.market_data import MarketDataProvider, set_provider
+from services.portfolio_service import PortfolioService, PURIFICATION_RATES
+
+
+class SlowBackend:
+    """Backend factice : latence fixe par appel, données déterministes"""
+
+    def __init__(self, latency: float, seed: int = 7):
+        self.latency = latency
+        self.rng = np.random.default_rng(seed)
+        self.calls = 0
+        self.index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=5 * 252, tz="America/New_York")
+
+    def _quote(self, ticker: str) -> dict:
+        price = 10 + (hash(ticker) % 50000) / 100
+        return {"price": price, "previous_close": price * 0.99}
+
+    def fetch_quotes(self, tickers: list) -> dict:
+        self.calls += 1
+        time.sleep(self.latency * 2) # Un téléchargement groupé coûte plus qu'un appel unitaire
+        return {t: self._quote(t) for t in tickers}
+
+    def fetch_info(self, ticker: str) -> dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        return {"dividendYield": (hash(ticker) % 60) / 1000}
+
+    def fetch_history(self, ticker: str, **params):
+        """Historique journalier brut avec un dividende trimestriel"""
+        self.calls += 1
+        time.sleep(self.latency)
+        index = self.index
+        price = self._quote(ticker)["price"]
+        dividends = np.zeros(len(index))
+        dividends[::63] = price * (hash(ticker) % 60) / 1000 / 4
+        return pd.DataFrame({"Open": price, "High": price, "Low": price, "Close": price, "Volume": 1e6,
+                             "Dividends": dividends, "Stock Splits": 0.0}, index=index)
+
+
+def random_portfolio(n_positions: int, seed: int = 3) -> list:
+    rng = np.random.default_rng(seed)
+    # ~60% de tickers distincts : les doublons (plusieurs lignes d'achat) sont fréquents
+    universe = [f"TCK{i}" for i in range(max(1, int(n_positions * 0.6)))]
+    types = list(PURIFICATION_RATES)
+    return [
+        {
+            "ticker": str(rng.choice(universe)),
+            "qty": float(rng.integers(1, 200)),
+            "avg_price": float(np.round(rng.uniform(5, 500), 2)),
+            "type": str(rng.choice(types, p=[0.7, 0.2, 0.1])),
+        }
+        for _ in range(n_positions)
+    ]
+
+
+def legacy_row(backend: SlowBackend, asset: dict) -> dict:
+    """Logique historique par ligne (un appel cours + un appel info, en série)"""
+    ticker = asset['ticker'].upper().strip()
+    qty = float(asset.get('qty', 0))
+    time.sleep(backend.latency)
+    current_price = backend._quote(ticker)["price"]
+    current_value = current_price * qty
+    avg_price = float(asset.get('avg_price', 0))
+    gain = current_value - (avg_price * qty)
+    dividend_yield = backend.fetch_info(ticker).get('dividendYield', 0) or 0
+    purification = current_value * dividend_yield * PURIFICATION_RATES.get(asset['type'], 0.0)
+    return {"current_value": round(current_value, 2), "gain": round(gain, 2),
+            "purification_amount": round(purification, 2)}
+
+
+def main(n_positions: int = 1000, latency_ms: float = 50):
+    latency = latency_ms / 1000
+    assets = random_portfolio(n_positions)
+
+    backend = SlowBackend(latency)
+    set_provider(MarketDataProvider(backend, max_entries=10 * n_positions))
+    start = time.perf_counter()
+    result = PortfolioService().analyze_portfolio(assets)
+    elapsed = time.perf_counter() - start
+
+    # Référence sur un échantillon (la boucle complète prendrait des minutes)
+    sample = assets[:50]
+    legacy_start = time.perf_counter()
+    legacy = [legacy_row(SlowBackend(latency), a) for a in sample]
+    legacy_estimate = (time.perf_counter() - legacy_start) * n_positions / len(sample)
+
+    calls = backend.calls
+    start = time.perf_counter()
+    PortfolioService().analyze_portfolio(assets)
+    cached = time.perf_counter() - start
+
+    mismatches = sum(
+        any(row[k] != ref[k] for k in ("current_value", "gain"))
+        for row, ref in zip(result["assets"], legacy)
+    )
+    print(f"positions : {n_positions} | tickers distincts : {len({a['ticker'] for a in assets})} "
+          f"| latence amont : {latency_ms:.0f} ms")
+    print(f"boucle série (estimée) : {legacy_estimate:8.2f} s")
+    print(f"version groupée        : {elapsed:8.2f} s  ({calls} appels amont)")
+    print(f"calendriers en cache   : {cached:8.2f} s  ({backend.calls - calls} appels amont)")
+    print(f"écarts valeur / plus-value sur l'échantillon : {mismatches}/{len(sample)}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 1000, float(args[1]) if len(args) > 1 else 50)
@@ -0,0 +1,65 @@
+"""Benchmark : requêtes sur l'index de screening précalculé (univers synthétique)
+
+Usage (depuis backend/) : python -m benchmarks.bench_screening_index [n_symbols]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from services.screening_index import ScreeningIndex
+
+SECTORS = ["Technology", "Healthcare", "Industrials", "Energy", "Consumer Cyclical",
+           "Financial Services", "Utilities", "Basic Materials"]
+
+QUERIES = {
+    "secteur + score": ({"sector": "Technology", "min_score": 70}, "sharia_score"),
+    "halal, dette < 20%": ({"is_halal": True, "max_debt": 20}, "debt_ratio"),
+    "RSI survendu": ({"max_rsi": 30}, "rsi"),
+    "multi-critères": ({"sector": ["Healthcare", "Industrials"], "min_rating": 4,
+                        "max_cash": 25, "min_rsi": 40, "max_rsi": 60}, "rating"),
+    "sans filtre": ({}, "sharia_score"),
+}
+
+
+def synthetic_profiles(n_symbols: int, seed: int = 11) -> list:
+    rng = np.random.default_rng(seed)
+    debt = rng.gamma(2.0, 12.0, n_symbols)
+    cash = rng.gamma(2.0, 8.0, n_symbols)
+    rsi = rng.uniform(10, 90, n_symbols)
+    return [
+        {
+            "ticker": f"SYM{i:05d}", "name": f"Company {i}", "sector": SECTORS[i % len(SECTORS)],
+            "type": "STOCK", "is_halal": bool(debt[i] < 33 and cash[i] < 33),
+            "sharia_score": int(rng.integers(0, 101)), "reason": "",
+            "ratios": {"debt": round(float(debt[i]), 2), "cash": round(float(cash[i]), 2)},
+            "technicals": {"rsi": round(float(rsi[i]), 2), "position_52w": int(rng.integers(0, 101)),
+                           "current_price": round(float(rng.uniform(5, 500)), 2)},
+            "rating": int(rng.integers(1, 6)),
+        }
+        for i in range(n_symbols)
+    ]
+
+
+def main(n_symbols: int = 10_000, repeat: int = 200):
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ScreeningIndex(os.path.join(tmp, "index.sqlite"))
+        start = time.perf_counter()
+        index.upsert(synthetic_profiles(n_symbols))
+        print(f"univers : {n_symbols} symboles | chargement : {time.perf_counter() - start:.2f} s")
+
+        for label, (filters, sort) in QUERIES.items():
+            timings = []
+            for page in range(repeat):
+                t0 = time.perf_counter()
+                result = index.query(filters, sort=sort, limit=50, offset=(page % 5) * 50)
+                timings.append(time.perf_counter() - t0)
+            timings = np.array(timings) * 1000
+            print(f"{label:20s}: {result['total']:6d} résultats | p50 {np.percentile(timings, 50):6.2f} ms "
+                  f"| p99 {np.percentile(timings, 99):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
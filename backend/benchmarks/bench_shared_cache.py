@@ -0,0 +1,125 @@
+"""Benchmark : démarrage à froid de N workers, cache par processus vs cache partagé
+
+Chaque worker (processus) sert les mêmes requêtes (fondamentaux + historique
+de M tickers) dans un ordre différent, avec un démarrage décalé comme après
+un déploiement. On compte les appels amont et les entrées stockées.
+Puis lectures répétées d'un historique chaud : SQLite seul (dépickle à
+chaque lecture) vs L1 du processus devant SQLite (TieredCache).
+
+Usage (depuis backend/) : python -m benchmarks.bench_shared_cache [n_workers] [n_tickers] [latence_ms]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import MarketDataProvider, TTLCache
+from services.shared_cache import LocalRedis, RedisCache, SQLiteCache, TieredCache
+
+
+class SlowBackend:
+    """Backend factice : latence fixe par appel, données déterministes"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def fetch_info(self, ticker: str) -> dict:
+        self.calls += 1
+        time.sleep(self.latency)
+        return {"longName": ticker, "marketCap": 1e9, "totalDebt": 2e8, "sector": "Technology"}
+
+    def fetch_history(self, ticker: str, **params):
+        self.calls += 1
+        time.sleep(self.latency)
+        index = pd.bdate_range(end="2024-12-31", periods=252)
+        close = 100 + np.cumsum(np.random.default_rng(len(ticker)).normal(0, 1, len(index)))
+        return pd.DataFrame({"Close": close, "Volume": 1e6}, index=index)
+
+
+class _RedisManager(BaseManager):
+    """Sert un LocalRedis unique à tous les processus (remplaçant du serveur)"""
+
+
+_RedisManager.register("LocalRedis", LocalRedis)
+
+
+def worker(args):
+    mode, target, worker_id, tickers, latency, stagger = args
+    time.sleep(worker_id * stagger)
+    if mode == "memory":
+        cache = TTLCache()
+    elif mode == "sqlite":
+        cache = SQLiteCache(target)
+    else:
+        cache = RedisCache(target)
+    backend = SlowBackend(latency)
+    provider = MarketDataProvider(backend, cache=cache)
+    order = tickers[:]
+    random.Random(worker_id).shuffle(order)
+    for ticker in order:
+        provider.get_info(ticker)
+        provider.get_history(ticker, period="1y")
+    return backend.calls, len(cache)
+
+
+def run(mode: str, n_workers: int, tickers: list, latency: float, stagger: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = None
+        target = os.path.join(tmp, "cache.sqlite")
+        if mode == "redis":
+            manager = _RedisManager()
+            manager.start()
+            target = manager.LocalRedis()
+        start = time.perf_counter()
+        with get_context("spawn").Pool(n_workers) as pool:
+            results = pool.map(worker, [(mode, target, i, tickers, latency, stagger) for i in range(n_workers)])
+        elapsed = time.perf_counter() - start
+        calls = sum(r[0] for r in results)
+        # Cache partagé : toutes les entrées sont visibles par chaque worker
+        entries = sum(r[1] for r in results) if mode == "memory" else results[0][1]
+        if manager is not None:
+            manager.shutdown()
+    return calls, entries, elapsed
+
+
+def hot_reads(n_reads: int = 2000) -> dict:
+    """Lectures répétées d'un historique 5 ans (µs par lecture)"""
+    history = SlowBackend(0).fetch_history("AAPL")
+    history = pd.concat([history] * 5)
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite")
+        for name, cache in (("sqlite", SQLiteCache(path)), ("sqlite + L1", TieredCache(SQLiteCache(path)))):
+            cache.set(("history", "AAPL"), (time.time(), history), 60)
+            start = time.perf_counter()
+            for _ in range(n_reads):
+                cache.get(("history", "AAPL"))
+            timings[name] = (time.perf_counter() - start) / n_reads * 1e6
+    return timings
+
+
+def main(n_workers: int = 4, n_tickers: int = 50, latency_ms: float = 20):
+    tickers = [f"TCK{i}" for i in range(n_tickers)]
+    latency = latency_ms / 1000
+    stagger = 2 * latency * n_tickers / n_workers
+    print(f"{n_workers} workers, {n_tickers} tickers (info + historique), latence {latency_ms:.0f} ms")
+    for mode in ("memory", "sqlite", "redis"):
+        calls, entries, elapsed = run(mode, n_workers, tickers, latency, stagger)
+        print(f"{mode:7s}: appels amont {calls:4d} (min {2 * n_tickers}) | entrées stockées {entries:4d} "
+              f"| {elapsed:6.2f} s")
+    timings = hot_reads()
+    print(f"lecture d'un historique chaud : sqlite {timings['sqlite']:.0f} µs | "
+          f"sqlite + L1 {timings['sqlite + L1']:.1f} µs (x{timings['sqlite'] / timings['sqlite + L1']:.0f})")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 4, int(args[1]) if len(args) > 1 else 50,
+         float(args[2]) if len(args) > 2 else 20)
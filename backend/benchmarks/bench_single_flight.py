@@ -0,0 +1,141 @@
+"""Benchmark : 100 requêtes identiques simultanées -> un seul appel amont par type
+
+Un backend local simule la latence de Yahoo et compte les appels par type.
+Chaque scénario part d'un cache vide ; la référence désactive le regroupement.
+
+Usage (depuis backend/) : python -m benchmarks.bench_single_flight [n_requests] [latence_ms]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Stock d'historiques jetable, sans rafraîchissement en arrière-plan
+os.environ.setdefault("ATHAR_HISTORY_DIR", tempfile.mkdtemp(prefix="athar-bench-"))
+os.environ.setdefault("ATHAR_BACKGROUND_REFRESH", "0")
+
+from app import create_app  # noqa: E402
+from services import history_store  # noqa: E402
+from services.market_data import MarketDataProvider, set_provider  # noqa: E402
+from services.screening_service import HalalScreeningService  # noqa: E402
+
+INFO = {
+    "quoteType": "EQUITY", "longName": "Trending Corp", "sector": "Technology",
+    "industry": "Software", "longBusinessSummary": "Cloud software.", "marketCap": 3e12,
+    "totalDebt": 1e11, "totalCash": 6e10, "currentPrice": 420.0, "regularMarketPrice": 420.0,
+    "regularMarketPreviousClose": 415.0, "fiftyTwoWeekHigh": 450.0, "fiftyTwoWeekLow": 300.0,
+}
+
+
+def synthetic_history(n_days: int = 300, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=n_days)
+    close = 300 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days)))
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": 1e6, "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+
+
+class CountingBackend:
+    """Backend factice : latence fixe, appels comptés par type"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self.history = synthetic_history()
+
+    def _call(self, kind: str):
+        with self._lock:
+            self.calls[kind] += 1
+        time.sleep(self.latency)
+
+    def fetch_info(self, ticker: str) -> dict:
+        self._call("info")
+        return dict(INFO)
+
+    def fetch_history(self, ticker: str, **params):
+        self._call("history")
+        return self.history
+
+
+class _NoFlight:
+    """Regroupement désactivé (référence)"""
+
+    def do(self, key, fn):
+        return fn()
+
+    def stats(self) -> dict:
+        return {}
+
+
+def burst(n_requests: int, func) -> float:
+    """Lance n_requests appels func() en même temps ; renvoie la durée totale"""
+    barrier = threading.Barrier(n_requests)
+    failures = []
+
+    def run():
+        barrier.wait()
+        try:
+            func()
+        except Exception as e:
+            failures.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(n_requests)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if failures:
+        raise failures[0]
+    return time.perf_counter() - start
+
+
+def scenarios(app):
+    def post(url, body):
+        def call():
+            response = app.test_client().post(url, json=body)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return call
+
+    screening = HalalScreeningService()
+    return {
+        "/api/screening/analyze": post("/api/screening/analyze", {"tickers": "TRND"}),
+        "/api/chart/history": post("/api/chart/history", {"ticker": "TRND", "period": "1y"}),
+        "get_company_profile": lambda: screening.get_company_profile("TRND"),
+    }
+
+
+def main(n_requests: int = 100, latency_ms: float = 200):
+    app = create_app()
+    print(f"{n_requests} requêtes identiques simultanées, latence amont {latency_ms:.0f} ms")
+    ok = True
+    for label, func in scenarios(app).items():
+        for coalesce in (False, True):
+            backend = CountingBackend(latency_ms / 1000)
+            provider = MarketDataProvider(backend)
+            if not coalesce:
+                provider.flights = _NoFlight()
+            set_provider(provider)
+            # Le stock d'historiques ne doit pas servir un résultat du scénario précédent
+            with tempfile.TemporaryDirectory() as tmp:
+                history_store._store = history_store.HistoryStore(tmp)
+                elapsed = burst(n_requests, func)
+            calls = dict(sorted(backend.calls.items()))
+            mode = "regroupé    " if coalesce else "sans regroup."
+            print(f"{label:24s} {mode}: appels amont {calls} | {elapsed:6.2f} s")
+            if coalesce:
+                ok = ok and all(n == 1 for n in backend.calls.values())
+    print("✅ un seul appel amont par type" if ok else "❌ appels amont en double")
+    return ok
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    passed = main(int(args[0]) if args else 100, float(args[1]) if len(args) > 1 else 200)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,131 @@
+"""Benchmark : requêtes interactives pendant un job batch, face à un Yahoo qui limite
+
+Le backend simulé accepte `capacity` appels par seconde (au-delà : erreur 429)
+et tombe complètement en panne pendant une fenêtre. Un job batch analyse un
+grand univers en continu pendant que des clients appellent /api/screening/analyze
+sur des tickers populaires (TTL court pour forcer des appels amont).
+
+Référence : pas de budget, pas de disjoncteur, pas de repli sur la valeur périmée.
+
+Usage (depuis backend/) : python -m benchmarks.bench_upstream [durée_s] [clients]
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+os.environ.setdefault("ATHAR_BACKGROUND_REFRESH", "0")
+
+from app import create_app  # noqa: E402
+from services import market_data  # noqa: E402
+from services.concurrency import fan_out  # noqa: E402
+from services.market_data import MarketDataProvider, set_provider  # noqa: E402
+from services.upstream import (BATCH, CircuitBreaker, TokenBucket, UpstreamGate,  # noqa: E402
+                               upstream_priority)
+
+POPULAR = [f"POP{i}" for i in range(20)]
+UNIVERSE = [f"UNI{i}" for i in range(5000)]
+
+
+class ThrottlingBackend:
+    """Yahoo simulé : `capacity` appels/s, erreurs 429 au-delà, panne sur [outage_start, outage_end]"""
+
+    def __init__(self, capacity: float, latency: float, outage: tuple):
+        self.capacity = capacity
+        self.latency = latency
+        self.outage = outage
+        self.started = time.monotonic()
+        self._window = []
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+
+    def fetch_info(self, ticker: str) -> dict:
+        time.sleep(self.latency)
+        now = time.monotonic()
+        with self._lock:
+            self.calls += 1
+            self._window = [t for t in self._window if t > now - 1] + [now]
+            throttled = len(self._window) > self.capacity
+            elapsed = now - self.started
+            down = self.outage[0] <= elapsed < self.outage[1]
+            self.throttled += throttled or down
+        if down:
+            raise ConnectionError("Yahoo indisponible")
+        if throttled:
+            raise RuntimeError("429 Too Many Requests")
+        return {"longName": ticker, "sector": "Technology", "industry": "Software",
+                "marketCap": 2e9, "totalDebt": 3e8, "totalCash": 1e8, "currentPrice": 100.0}
+
+
+def run(gated: bool, duration: float, clients: int, capacity: float = 10, latency: float = 0.05):
+    backend = ThrottlingBackend(capacity, latency, outage=(duration * 0.4, duration * 0.6))
+    gate = None
+    if gated:
+        # Budget un peu sous la capacité réelle ; disjoncteur réactif pour la démo
+        gate = UpstreamGate(TokenBucket(rate=capacity * 0.8, burst=capacity),
+                            CircuitBreaker(threshold=5, window=5, cooldown=1))
+    provider = MarketDataProvider(backend, ttls={"info": 3}, gate=gate)
+    market_data.STALE_SECONDS = 3600 if gated else 0
+    set_provider(provider)
+    # Préchauffage sous la capacité : les tickers populaires ont une valeur connue
+    for ticker in POPULAR:
+        provider.get_info(ticker)
+        time.sleep(1.5 / capacity)
+    backend.started, backend.calls = time.monotonic(), 0
+
+    app = create_app()
+    stop = threading.Event()
+    latencies, statuses = [], []
+    lock = threading.Lock()
+
+    def batch_job():
+        with upstream_priority(BATCH):
+            for start in range(0, len(UNIVERSE), 50):
+                if stop.is_set():
+                    return
+                fan_out(provider.get_info, UNIVERSE[start:start + 50], timeout=30)
+
+    def client(seed: int):
+        rng = random.Random(seed)
+        http = app.test_client()
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            response = http.post("/api/screening/analyze", json={"tickers": rng.choice(POPULAR)})
+            with lock:
+                latencies.append(time.perf_counter() - t0)
+                statuses.append(response.status_code)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=batch_job)]
+    threads += [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    latencies = np.array(latencies) * 1000
+    errors = sum(s != 200 for s in statuses) / max(1, len(statuses))
+    return {
+        "requests": len(statuses), "p50": np.percentile(latencies, 50), "p99": np.percentile(latencies, 99),
+        "errors": errors, "upstream": backend.calls, "throttled": backend.throttled,
+    }
+
+
+def main(duration: float = 10, clients: int = 8):
+    print(f"{clients} clients interactifs + job batch, {duration:.0f} s, panne Yahoo de 40% à 60% du test")
+    for gated in (False, True):
+        r = run(gated, duration, clients)
+        label = "budget + disjoncteur" if gated else "référence          "
+        print(f"{label}: {r['requests']:5d} requêtes | p50 {r['p50']:7.1f} ms | p99 {r['p99']:7.1f} ms "
+              f"| erreurs {r['errors']:6.1%} | appels amont {r['upstream']} (rejetés {r['throttled']})")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(float(args[0]) if args else 10, int(args[1]) if len(args) > 1 else 8)
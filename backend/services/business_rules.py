@@ -0,0 +1,169 @@
+import functools
+import re
+import string
+from typing import NamedTuple
+
+# Version du référentiel : à incrémenter à chaque modification des règles
+RULESET_VERSION = "2026.1"
+
+# (terme canonique, catégorie, formes reconnues). La détection se fait sur
+# des mots entiers : "ham" ne détecte plus "Birmingham".
+BUSINESS_RULES = [
+    # Riba (intérêts) / finance conventionnelle
+    ('bank', 'riba', ('bank', 'banks', 'banking', 'banker', 'bankers')),
+    ('insurance', 'riba', ('insurance', 'insurances', 'insurer', 'insurers')),
+    ('reinsurance', 'riba', ('reinsurance', 'reinsurer', 'reinsurers')),
+    ('mortgage', 'riba', ('mortgage', 'mortgages')),
+    ('lending', 'riba', ('lending', 'lender', 'lenders')),
+    ('interest', 'riba', ('interest', 'interests')),
+    # Jeux de hasard
+    ('casino', 'gambling', ('casino', 'casinos')),
+    ('gambling', 'gambling', ('gambling', 'gamble', 'gambles', 'gambler', 'gamblers')),
+    ('betting', 'gambling', ('betting',)),
+    ('lottery', 'gambling', ('lottery', 'lotteries')),
+    # Contenus adultes et divertissement
+    ('adult entertainment', 'adult', ('adult entertainment', 'adult content', 'adult film', 'adult films')),
+    ('pornography', 'adult', ('porn', 'pornography', 'pornographic')),
+    ('music', 'entertainment', ('music', 'musical')),
+    ('cinema', 'entertainment', ('cinema', 'cinemas')),
+    ('entertainment', 'entertainment', ('entertainment',)),
+    ('hotel', 'entertainment', ('hotel', 'hotels')),
+    ('resort', 'entertainment', ('resort', 'resorts')),
+    # Alcool et tabac
+    ('alcohol', 'alcohol', ('alcohol', 'alcoholic')),
+    ('liquor', 'alcohol', ('liquor', 'liquors')),
+    ('brewery', 'alcohol', ('brewery', 'breweries', 'brewer', 'brewers', 'brewing')),
+    ('distillery', 'alcohol', ('distillery', 'distilleries', 'distiller', 'distillers')),
+    ('wine', 'alcohol', ('wine', 'wines', 'winery', 'wineries')),
+    ('tobacco', 'tobacco', ('tobacco',)),
+    ('cigarette', 'tobacco', ('cigarette', 'cigarettes')),
+    ('cigar', 'tobacco', ('cigar', 'cigars')),
+    # Porc
+    ('pork', 'pork', ('pork',)),
+    ('bacon', 'pork', ('bacon',)),
+    ('ham', 'pork', ('ham', 'hams')),
+    ('swine', 'pork', ('swine',)),
+    # Armement
+    ('defense', 'weapons', ('defense', 'defence')),
+    ('military', 'weapons', ('military',)),
+    ('weapon', 'weapons', ('weapon', 'weapons', 'weaponry')),
+    ('armament', 'weapons', ('armament', 'armaments')),
+    ('missile', 'weapons', ('missile', 'missiles')),
+]
+
+MANUAL_BLACKLIST = ['PLTR', 'LMT', 'RTX', 'BA', 'JPM', 'BAC']
+MANUAL_WHITELIST = ['SPUS', 'HLAL', 'ISDW.L', 'ISDU.L', 'GLDM', 'SPSK']
+
+# Textes distincts dont le résultat de scan() est mémorisé (résumés ~3 Ko)
+SCAN_CACHE_SIZE = 1024
+
+
+class RuleMatch(NamedTuple):
+    term: str
+    category: str
+    start: int
+    end: int
+
+
+# Pré-filtre : ponctuation ASCII -> espace et majuscules -> minuscules (octets)
+_FOLD = bytearray(range(256))
+for _c in string.punctuation:
+    _FOLD[ord(_c)] = ord(' ')
+for _c in string.ascii_uppercase:
+    _FOLD[ord(_c)] = ord(_c.lower())
+_FOLD = bytes(_FOLD)
+_UNICODE_PUNCT = [p.encode('utf-8') for p in '’‘“”«»–—…\u00a0']
+
+
+class BusinessRuleSet:
+    """Référentiel d'activités interdites compilé une fois pour toutes
+
+    scan() commence par une intersection d'ensembles entre les mots du texte
+    et le vocabulaire des règles : seuls les termes candidats sont ensuite
+    recherchés, chacun avec une regex à préfixe littéral. Une regex unique
+    (alternation de toutes les formes) est 6 à 25x plus lente avec `re`.
+    Les mêmes résumés d'entreprise revenant à chaque requête, les résultats
+    sont mémorisés par texte (LRU).
+    """
+
+    def __init__(self, rules: list, blacklist=(), whitelist=(), version: str = RULESET_VERSION,
+                 cache_size: int = SCAN_CACHE_SIZE):
+        self.version = version
+        self.rules = list(rules)
+        self.blacklist = frozenset(t.upper() for t in blacklist)
+        self.whitelist = frozenset(t.upper() for t in whitelist)
+
+        # Premier mot de chaque forme -> [(regex, terme, catégorie)]
+        self._forms = {}
+        for term, category, forms in self.rules:
+            for form in forms:
+                words = form.lower().split()
+                regex = re.compile(r'\s+'.join(map(re.escape, words)) + r'\b')
+                self._forms.setdefault(words[0].encode('utf-8'), []).append((regex, term, category))
+        self._vocabulary = frozenset(self._forms)
+
+        # Regex complète (insensible à la casse) pour les textes dont la mise
+        # en minuscules change la longueur (positions non transposables)
+        alternatives = '|'.join(
+            f'(?P<r{i}>' + '|'.join(r'\s+'.join(map(re.escape, f.split())) for f in forms) + ')'
+            for i, (_, _, forms) in enumerate(self.rules)
+        )
+        self._regex = re.compile(rf'\b(?:{alternatives})\b', re.IGNORECASE)
+        self._by_group = {f'r{i}': (term, category) for i, (term, category, _) in enumerate(self.rules)}
+        self._scan_cached = functools.lru_cache(maxsize=cache_size)(self._scan)
+
+    def _candidates(self, text: str) -> set:
+        data = text.encode('utf-8')
+        if not text.isascii():
+            for punct in _UNICODE_PUNCT:
+                data = data.replace(punct, b' ')
+        return self._vocabulary.intersection(data.translate(_FOLD).split())
+
+    def scan(self, text: str) -> list:
+        """Toutes les occurrences (terme, catégorie, début, fin) dans le texte"""
+        if not text:
+            return []
+        return list(self._scan_cached(text))
+
+    def _scan(self, text: str) -> tuple:
+        candidates = self._candidates(text)
+        if not candidates:
+            return ()
+
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            return tuple(
+                RuleMatch(*self._by_group[m.lastgroup], m.start(), m.end())
+                for m in self._regex.finditer(text)
+            )
+
+        matches = []
+        for token in candidates:
+            for regex, term, category in self._forms[token]:
+                for m in regex.finditer(lowered):
+                    start = m.start()
+                    # Limite de mot à gauche (le \b de droite est dans la regex)
+                    if start and (lowered[start - 1].isalnum() or lowered[start - 1] == '_'):
+                        continue
+                    matches.append(RuleMatch(term, category, start, m.end()))
+        # Comme une regex unique : pas de chevauchement, la forme la plus longue gagne
+        matches.sort(key=lambda m: (m.start, -m.end))
+        kept = []
+        for match in matches:
+            if not kept or match.start >= kept[-1].end:
+                kept.append(match)
+        return tuple(kept)
+
+    def found_terms(self, text: str) -> list:
+        """Termes distincts trouvés, dans l'ordre d'apparition"""
+        return list(dict.fromkeys(m.term for m in self.scan(text)))
+
+    def is_blacklisted(self, ticker: str) -> bool:
+        return ticker.upper() in self.blacklist
+
+    def is_whitelisted(self, ticker: str) -> bool:
+        return ticker.upper() in self.whitelist
+
+
+# Compilé une seule fois au chargement du module
+RULES = BusinessRuleSet(BUSINESS_RULES, MANUAL_BLACKLIST, MANUAL_WHITELIST)
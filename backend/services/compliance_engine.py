@@ -0,0 +1,219 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Seuils AAOIFI (en % de la capitalisation)
+DEBT_LIMIT = 33
+CASH_LIMIT = 33
+
+FUNDAMENTAL_COLUMNS = [
+    'marketCap', 'totalAssets', 'totalDebt', 'totalCash', 'cashAndCashEquivalents',
+    'returnOnEquity', 'profitMargins', 'pegRatio',
+]
+
+
+def build_frame(infos: dict) -> pd.DataFrame:
+    """Construit la table des fondamentaux à partir de {ticker: info}
+
+    Les valeurs absentes ou non numériques deviennent NaN. Conversion directe
+    colonne par colonne (from_dict + to_numeric coûtait plus que evaluate).
+    """
+    values = list(infos.values())
+    columns = {}
+    for name in FUNDAMENTAL_COLUMNS:
+        raw = [info.get(name) for info in values]
+        try:
+            columns[name] = np.array([np.nan if v is None else v for v in raw], dtype=float)
+        except (TypeError, ValueError):
+            # Colonne avec des valeurs non numériques ("N/A"...) : conversion une à une
+            columns[name] = np.array([_scalar(info, name) for info in values], dtype=float)
+    return pd.DataFrame(columns, index=list(infos), columns=FUNDAMENTAL_COLUMNS)
+
+
+def _column(frame: pd.DataFrame, name: str) -> np.ndarray:
+    if name in frame:
+        return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=float)
+    return np.full(len(frame), np.nan)
+
+
+def _flag(frame: pd.DataFrame, name: str, default: bool) -> np.ndarray:
+    if name in frame:
+        return frame[name].fillna(default).to_numpy(dtype=bool)
+    return np.full(len(frame), default)
+
+
+def _truthy(values: np.ndarray) -> np.ndarray:
+    """Équivalent vectoriel de `if value:` (None/NaN/0 -> False)"""
+    return ~np.isnan(values) & (values != 0)
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """Arrondi à 2 décimales identique au round() de Python
+
+    np.round peut différer de round() quand x*100 tombe sur un demi :
+    ces rares valeurs sont recalculées une à une.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ambiguous = np.isfinite(scaled) & (
+        (np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6) | (np.abs(scaled) > 1e9)
+    )
+    for i in np.flatnonzero(ambiguous):
+        rounded[i] = round(float(values[i]), 2)
+    return rounded
+
+
+def compute_ratios(frame: pd.DataFrame, method: str = 'profile'):
+    """Ratios dette / cash (en %) pour toute la table
+
+    - 'profile' : logique de get_company_profile (dénominateur marketCap puis
+      totalAssets, cash de secours cashAndCashEquivalents, ratios arrondis)
+    - 'analyze' : logique de /api/screening/analyze (marketCap seul, non arrondis)
+    """
+    market_cap = _column(frame, 'marketCap')
+    total_debt = _column(frame, 'totalDebt')
+    total_cash = _column(frame, 'totalCash')
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if method == 'analyze':
+            valid = market_cap > 0
+            debt_ratio = np.where(valid, np.nan_to_num(total_debt) / market_cap * 100, 0.0)
+            cash_ratio = np.where(valid, np.nan_to_num(total_cash) / market_cap * 100, 0.0)
+            return debt_ratio, cash_ratio
+
+        cash = np.where(_truthy(total_cash), total_cash, _column(frame, 'cashAndCashEquivalents'))
+        denominator = np.where(_truthy(market_cap), market_cap, _column(frame, 'totalAssets'))
+        valid = _truthy(denominator) & (denominator > 0)
+        debt_ratio = np.where(valid & _truthy(total_debt), total_debt / denominator * 100, 0.0)
+        cash_ratio = np.where(valid & _truthy(cash), cash / denominator * 100, 0.0)
+    return round2(debt_ratio), round2(cash_ratio)
+
+
+def evaluate(frame: pd.DataFrame) -> pd.DataFrame:
+    """Conformité AAOIFI, score Sharia et note pour toutes les lignes en une passe
+
+    Colonnes optionnelles : 'activity_halal' (défaut True) et 'whitelisted'
+    (défaut False), issues du filtre d'activité.
+    """
+    debt_ratio, cash_ratio = compute_ratios(frame, 'profile')
+    activity_halal = _flag(frame, 'activity_halal', True)
+    whitelisted = _flag(frame, 'whitelisted', False)
+
+    debt_ok = debt_ratio < DEBT_LIMIT
+    cash_ok = cash_ratio < CASH_LIMIT
+    is_halal = activity_halal & debt_ok & cash_ok
+
+    # Score : 40 pts activité + jusqu'à 30 pts par ratio sous le seuil
+    score = (
+        40
+        + np.where(debt_ok, 30 * (1 - debt_ratio / DEBT_LIMIT), 0)
+        + np.where(cash_ok, 30 * (1 - cash_ratio / CASH_LIMIT), 0)
+    )
+    score = np.where(whitelisted, 100, score)
+    score = np.where(activity_halal, score, 0)
+    sharia_score = np.rint(np.clip(score, 0, 100)).astype(int)
+
+    roe = _column(frame, 'returnOnEquity')
+    margin = _column(frame, 'profitMargins')
+    peg = _column(frame, 'pegRatio')
+    rating = (
+        1
+        + (roe > 0.15).astype(int)
+        + (margin > 0.15).astype(int)
+        + (_truthy(peg) & (peg < 1.5)).astype(int)
+        + is_halal.astype(int)
+    )
+    rating = np.where(whitelisted, 5, np.minimum(rating, 5))
+
+    return pd.DataFrame({
+        'debt_ratio': debt_ratio,
+        'cash_ratio': cash_ratio,
+        'debt_excessive': ~debt_ok,
+        'cash_excessive': ~cash_ok,
+        'activity_halal': activity_halal,
+        'is_halal': is_halal,
+        'sharia_score': sharia_score,
+        'rating': rating,
+    }, index=frame.index)
+
+
+def _scalar(info: dict, name: str) -> float:
+    """Valeur d'un champ comme dans build_frame (absente ou non numérique -> NaN)"""
+    try:
+        return float(info.get(name))
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _present(value: float) -> bool:
+    """Équivalent scalaire de _truthy"""
+    return value == value and value != 0
+
+
+def ratios_row(info: dict, method: str = 'profile') -> tuple:
+    """compute_ratios pour un seul ticker, sans passer par une table
+
+    Chemin des requêtes unitaires (un DataFrame d'une ligne coûte ~1000x plus) ;
+    résultats identiques à la version vectorielle.
+    """
+    market_cap = _scalar(info, 'marketCap')
+    total_debt = _scalar(info, 'totalDebt')
+    total_cash = _scalar(info, 'totalCash')
+
+    if method == 'analyze':
+        if not market_cap > 0:
+            return 0.0, 0.0
+        debt = total_debt if total_debt == total_debt else 0.0
+        cash = total_cash if total_cash == total_cash else 0.0
+        return debt / market_cap * 100, cash / market_cap * 100
+
+    cash = total_cash if _present(total_cash) else _scalar(info, 'cashAndCashEquivalents')
+    denominator = market_cap if _present(market_cap) else _scalar(info, 'totalAssets')
+    if not (_present(denominator) and denominator > 0):
+        return 0.0, 0.0
+    debt_ratio = round(total_debt / denominator * 100, 2) if _present(total_debt) else 0.0
+    cash_ratio = round(cash / denominator * 100, 2) if _present(cash) else 0.0
+    return debt_ratio, cash_ratio
+
+
+def evaluate_row(info: dict, activity_halal: bool = True, whitelisted: bool = False) -> dict:
+    """evaluate pour un seul ticker : mêmes clés, mêmes valeurs qu'une ligne de la table"""
+    debt_ratio, cash_ratio = ratios_row(info, 'profile')
+
+    debt_ok = debt_ratio < DEBT_LIMIT
+    cash_ok = cash_ratio < CASH_LIMIT
+    is_halal = activity_halal and debt_ok and cash_ok
+
+    score = (
+        40
+        + (30 * (1 - debt_ratio / DEBT_LIMIT) if debt_ok else 0)
+        + (30 * (1 - cash_ratio / CASH_LIMIT) if cash_ok else 0)
+    )
+    if whitelisted:
+        score = 100
+    if not activity_halal:
+        score = 0
+    # round() et np.rint arrondissent tous deux au pair le plus proche
+    sharia_score = round(min(100, max(0, score)))
+
+    peg = _scalar(info, 'pegRatio')
+    rating = (
+        1
+        + (_scalar(info, 'returnOnEquity') > 0.15)
+        + (_scalar(info, 'profitMargins') > 0.15)
+        + (_present(peg) and peg < 1.5)
+        + is_halal
+    )
+    rating = 5 if whitelisted else min(rating, 5)
+
+    return {
+        'debt_ratio': debt_ratio,
+        'cash_ratio': cash_ratio,
+        'debt_excessive': not debt_ok,
+        'cash_excessive': not cash_ok,
+        'activity_halal': activity_halal,
+        'is_halal': is_halal,
+        'sharia_score': sharia_score,
+        'rating': int(rating),
+    }
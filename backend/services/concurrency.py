@@ -0,0 +1,147 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Nombre maximal d'appels réseau simultanés par processus
+MAX_WORKERS = int(os.environ.get("ATHAR_IO_WORKERS", 16))
+DEFAULT_TIMEOUT = float(os.environ.get("ATHAR_IO_TIMEOUT", 10))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class FetchTimeout(Exception):
+    """Un élément n'a pas répondu dans le délai imparti"""
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool de threads partagé (borné) pour les appels vers l'amont"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="athar-io")
+    return _executor
+
+
+_pool_thread = threading.local()
+
+
+def fan_out(func, items, timeout: float = DEFAULT_TIMEOUT):
+    """Exécute func(item) en parallèle sur le pool partagé
+
+    `timeout` est un délai global pour tout l'appel, file d'attente comprise :
+    à échéance, les éléments pas encore démarrés sont annulés et ceux en
+    cours ne sont plus attendus (FetchTimeout). Appelé depuis un thread du
+    pool (fan_out imbriqué), les éléments s'exécutent en ligne : attendre le
+    pool depuis le pool peut l'épuiser et l'interbloquer. Les doublons sont
+    ignorés. Chaque appel s'exécute dans une copie du contexte de
+    l'appelant (contextvars : priorité amont, suivi des données périmées).
+    Renvoie (results, errors) : deux dicts indexés par élément, les erreurs
+    contenant l'exception levée (ou FetchTimeout).
+    """
+    items = list(dict.fromkeys(items))
+    results, errors = {}, {}
+    if not items:
+        return results, errors
+    deadline = time.monotonic() + timeout
+
+    if getattr(_pool_thread, "active", False):
+        for item in items:
+            if time.monotonic() >= deadline:
+                errors[item] = FetchTimeout(f"Délai dépassé ({timeout}s)")
+                continue
+            try:
+                results[item] = func(item)
+            except Exception as e:
+                errors[item] = e
+        return results, errors
+
+    def run(item):
+        _pool_thread.active = True
+        try:
+            return func(item)
+        finally:
+            _pool_thread.active = False
+
+    executor = get_executor()
+    futures = {executor.submit(contextvars.copy_context().run, run, item): item for item in items}
+    done, pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+
+    for future in done:
+        item = futures[future]
+        try:
+            results[item] = future.result()
+        except Exception as e:
+            errors[item] = e
+    for future in pending:
+        # Non démarré : retiré de la file ; en cours : le thread finira son appel sans être attendu
+        future.cancel()
+        errors[futures[future]] = FetchTimeout(f"Délai dépassé ({timeout}s)")
+
+    return results, errors
+
+
+class _Call:
+    """Appel en vol : résultat ou erreur partagés par tous les demandeurs"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Regroupe les appels concurrents identiques (même clé) en un seul
+
+    Le premier demandeur exécute fn ; ceux qui arrivent pendant l'appel
+    attendent et reçoivent le même résultat (ou la même exception).
+    Rien n'est mémorisé après la fin de l'appel : le cache reste l'affaire
+    de l'appelant.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
@@ -0,0 +1,195 @@
+"""Calendriers de dividendes par ticker et purification par événement
+
+Le calendrier d'un ticker (dates ex-dividende, montant par action) est
+extrait de la colonne Dividends de l'historique brut du HistoryStore
+(auto_adjust=False), puis gardé en mémoire et partagé par tous les
+portefeuilles / simulations qui détiennent ce ticker. Passé
+CALENDAR_REFRESH_SECONDS, seule la fin de l'historique est relue et les
+nouveaux événements sont ajoutés (mise à jour incrémentale).
+
+Les montants Yahoo sont ajustés des splits : ils s'appliquent au nombre
+d'actions actuel. Une action ouvre droit au dividende si elle est détenue
+avant la date ex-dividende.
+
+Les calculs sont vectorisés : les calendriers sont empilés en matrices
+(tickers x événements) complétées par des dates "jamais".
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.concurrency import SingleFlight, fan_out
+from services.history_store import TAIL_REFRESH_SECONDS, get_history_store
+from services.market_data import TTLCache
+
+# Relecture de la fin d'historique (au plus une fois par période et par ticker)
+CALENDAR_REFRESH_SECONDS = TAIL_REFRESH_SECONDS
+# Calendriers gardés en mémoire (LRU) et durée de vie maximale d'un calendrier
+MAX_CALENDARS = 4096
+CALENDAR_TTL = 24 * 3600
+# Fenêtre de la purification annuelle (12 mois glissants)
+TRAILING_DAYS = 365
+
+NEVER = np.iinfo(np.int64).max
+DAY_NS = 86400 * 10**9
+
+
+def _naive_ns(index: pd.DatetimeIndex) -> np.ndarray:
+    """Dates locales sans fuseau (minuit), en ns"""
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    ns = index.values.astype("datetime64[ns]").view("int64")
+    return ns - ns % DAY_NS
+
+
+def to_ns(date) -> int:
+    """Date (str, datetime, Timestamp) -> ns locaux sans fuseau"""
+    stamp = pd.Timestamp(date)
+    if stamp.tz is not None:
+        stamp = stamp.tz_localize(None)
+    return int(stamp.normalize().value)
+
+
+class DividendCalendar:
+    """Dates ex-dividende (ns locaux, croissantes) et montants par action d'un ticker"""
+
+    __slots__ = ("ticker", "ex_dates", "amounts", "covered_until", "checked_at")
+
+    def __init__(self, ticker: str, ex_dates: np.ndarray, amounts: np.ndarray, covered_until: int):
+        self.ticker = ticker
+        self.ex_dates = ex_dates
+        self.amounts = amounts
+        self.covered_until = covered_until
+        self.checked_at = time.monotonic()
+
+    @classmethod
+    def from_history(cls, ticker: str, history: pd.DataFrame) -> "DividendCalendar":
+        if history is None or history.empty:
+            return cls(ticker, np.empty(0, dtype=np.int64), np.empty(0), None)
+        divs = history["Dividends"].fillna(0) if "Dividends" in history else pd.Series(0.0, index=history.index)
+        events = divs[divs != 0]
+        return cls(ticker, _naive_ns(events.index), events.to_numpy(dtype=float),
+                   int(_naive_ns(history.index[-1:])[0]))
+
+    def merged(self, tail: "DividendCalendar", tail_start: int) -> "DividendCalendar":
+        """Événements connus avant tail_start + ceux de la fin relue"""
+        keep = self.ex_dates < tail_start
+        return DividendCalendar(
+            self.ticker,
+            np.concatenate([self.ex_dates[keep], tail.ex_dates]),
+            np.concatenate([self.amounts[keep], tail.amounts]),
+            tail.covered_until if tail.covered_until is not None else self.covered_until,
+        )
+
+    def __len__(self):
+        return len(self.ex_dates)
+
+
+class DividendEngine:
+    """Calendriers en cache et dividendes / purification vectorisés"""
+
+    def __init__(self, store=None, refresh_seconds: float = CALENDAR_REFRESH_SECONDS,
+                 max_calendars: int = MAX_CALENDARS):
+        self._store = store
+        self.refresh_seconds = refresh_seconds
+        self.cache = TTLCache(max_calendars)
+        self.flights = SingleFlight()
+        self.loads = 0
+        self.updates = 0
+
+    @property
+    def store(self):
+        return self._store or get_history_store()
+
+    def _load(self, ticker: str) -> DividendCalendar:
+        current = self.cache.peek(ticker, None)
+        if current is not None and time.monotonic() - current.checked_at < self.refresh_seconds:
+            return current
+        if current is None or current.covered_until is None:
+            history = self.store.get_history(ticker, period="max", auto_adjust=False)
+            calendar = DividendCalendar.from_history(ticker, history)
+            self.loads += 1
+        else:
+            # Mise à jour incrémentale : seule la fin de l'historique est relue
+            start = pd.Timestamp(current.covered_until).strftime("%Y-%m-%d")
+            tail = self.store.get_history(ticker, start=start, auto_adjust=False)
+            calendar = current.merged(DividendCalendar.from_history(ticker, tail), current.covered_until)
+            self.updates += 1
+        self.cache.set(ticker, calendar, CALENDAR_TTL)
+        return calendar
+
+    def calendar(self, ticker: str) -> DividendCalendar:
+        current = self.cache.get(ticker, None)
+        if current is not None and time.monotonic() - current.checked_at < self.refresh_seconds:
+            return current
+        # Un seul chargement par ticker, quel que soit le nombre de demandeurs
+        return self.flights.do(ticker, lambda: self._load(ticker))
+
+    def calendars(self, tickers: list) -> tuple:
+        """Calendriers en parallèle : (dict ticker -> calendrier, dict ticker -> erreur)"""
+        return fan_out(self.calendar, tickers)
+
+    @staticmethod
+    def event_matrix(calendars: list) -> tuple:
+        """(dates (T, E), montants (T, E)) complétées par NEVER / 0"""
+        width = max((len(c) for c in calendars), default=0)
+        ex_dates = np.full((len(calendars), width), NEVER, dtype=np.int64)
+        amounts = np.zeros((len(calendars), width))
+        for i, calendar in enumerate(calendars):
+            ex_dates[i, :len(calendar)] = calendar.ex_dates
+            amounts[i, :len(calendar)] = calendar.amounts
+        return ex_dates, amounts
+
+    def window_dividends(self, calendars: list, ticker_idx: np.ndarray, start_ns: np.ndarray,
+                         end_ns: int) -> np.ndarray:
+        """Dividendes par action de chaque position, ex-dates dans [start, end]
+
+        ticker_idx : calendrier de chaque position ; start_ns : début de
+        détention (ou de fenêtre) par position.
+        """
+        if not calendars:
+            return np.zeros(len(ticker_idx))
+        ex_dates, amounts = self.event_matrix(calendars)
+        ex_dates, amounts = ex_dates[ticker_idx], amounts[ticker_idx]
+        in_window = (ex_dates >= start_ns[:, None]) & (ex_dates <= end_ns)
+        return (amounts * in_window).sum(axis=1)
+
+    def monthly_dividends(self, calendars: dict, months: pd.DatetimeIndex) -> pd.DataFrame:
+        """Dividendes par action cumulés par mois d'ex-date (mois x tickers, fin de mois)
+
+        Avec un achat au dernier cours du mois, les actions détenues à une
+        ex-date du mois m sont exactement celles achetées jusqu'au mois m-1.
+        """
+        labels = _naive_ns(months)
+        first_day = to_ns(months[0].replace(day=1)) if len(months) else 0
+        columns = {}
+        for ticker, calendar in calendars.items():
+            # Mois de l'ex-date : premier libellé de fin de mois >= ex-date
+            month = np.searchsorted(labels, calendar.ex_dates, side="left")
+            valid = (month < len(labels)) & (calendar.ex_dates >= first_day)
+            columns[ticker] = np.bincount(month[valid], weights=calendar.amounts[valid], minlength=len(labels))
+        return pd.DataFrame(columns, index=months)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "loads": self.loads, "updates": self.updates,
+                "single_flight": self.flights.stats()}
+
+
+def trailing_start(now_ns: int, days: int = TRAILING_DAYS) -> int:
+    return now_ns - days * DAY_NS
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_dividend_engine() -> DividendEngine:
+    """Moteur partagé du processus (calendriers communs à tous les utilisateurs)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = DividendEngine()
+    return _engine
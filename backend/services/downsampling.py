@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices retenus par Largest-Triangle-Three-Buckets
+
+    Garde le premier et le dernier point ; dans chaque seau intermédiaire,
+    retient le point qui forme le plus grand triangle avec le point retenu
+    précédemment et la moyenne du seau suivant. Les seaux sont préparés en
+    une fois (matrice complétée par NaN) : seule la dépendance au point
+    précédent reste une boucle, vectorisée sur chaque seau.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bornes des n_out - 2 seaux intermédiaires (points 1 .. n-2)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    lengths = ends - starts
+    width = int(lengths.max())
+
+    # Matrices (seaux x largeur max) complétées par NaN
+    offsets = np.arange(width)
+    index = starts[:, None] + offsets
+    valid = offsets < lengths[:, None]
+    index = np.where(valid, index, 0)
+    bucket_x = np.where(valid, x[index], np.nan)
+    bucket_y = np.where(valid, y[index], np.nan)
+
+    # Moyenne du seau suivant (le dernier point pour le dernier seau)
+    with np.errstate(invalid='ignore'):
+        mean_x = np.nanmean(bucket_x, axis=1)
+        mean_y = np.nanmean(bucket_y, axis=1)
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    ax, ay = x[0], y[0]
+    for b in range(n_out - 2):
+        # Aire (x2) du triangle (point précédent, candidat, moyenne suivante)
+        area = np.abs((ax - next_x[b]) * (bucket_y[b] - ay) - (ax - bucket_x[b]) * (next_y[b] - ay))
+        best = int(np.nanargmax(area)) if valid[b].any() and not np.isnan(area).all() else 0
+        selected[b + 1] = index[b, best]
+        ax, ay = x[selected[b + 1]], y[selected[b + 1]]
+    return np.unique(selected)
+
+
+def ohlc_buckets(n: int, n_out: int) -> np.ndarray:
+    """Indices de début de n_out seaux contigus couvrant n barres"""
+    if n_out >= n:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n, n_out, endpoint=False).astype(np.int64))
+
+
+def aggregate_ohlc(starts: np.ndarray, open_, high, low, close, volume) -> tuple:
+    """Agrège des bougies par seau : premier open, plus haut, plus bas, dernier close, volume cumulé"""
+    last = np.append(starts[1:], len(close)) - 1
+    return (
+        np.asarray(open_)[starts],
+        np.maximum.reduceat(np.asarray(high), starts),
+        np.minimum.reduceat(np.asarray(low), starts),
+        np.asarray(close)[last],
+        np.add.reduceat(np.nan_to_num(np.asarray(volume, dtype=np.float64)), starts),
+    )
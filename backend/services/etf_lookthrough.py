@@ -0,0 +1,127 @@
+import threading
+
+from services.market_data import get_provider, TTLCache
+from services.concurrency import fan_out
+from services.screening_service import HalalScreeningService
+
+# Profils de conformité des lignes d'ETF : partagés entre ETF (les mêmes
+# grandes capitalisations reviennent dans la plupart des fonds)
+PROFILE_TTL = 3600
+MAX_PROFILES = 4096
+TOP_HOLDINGS = 10
+
+_UNSCREENED = object()
+
+
+def holding_rows(top_holdings, limit: int = TOP_HOLDINGS) -> list:
+    """[{"symbol", "name", "percent"}] depuis funds_data.top_holdings (index = Symbol)"""
+    rows = []
+    if top_holdings is None or top_holdings.empty:
+        return rows
+    for symbol, row in top_holdings.head(limit).iterrows():
+        symbol = str(row.get("Symbol", symbol) or "").strip().upper()
+        holding_name = row.get("Holding Name", row.get("Name", symbol or "Inconnu"))
+        percent = row.get("% Net Assets", row.get("Holding Percent", row.get("Weight", 0)))
+        if isinstance(percent, float) and percent < 1:
+            percent = percent * 100
+        rows.append({
+            "symbol": symbol,
+            "name": str(holding_name),
+            "percent": round(float(percent), 2)
+        })
+    return rows
+
+
+class ETFLookThroughService:
+    """Conformité "par transparence" : chaque ligne de l'ETF est passée au crible AAOIFI
+
+    Les lignes sont analysées par lot via get_company_profiles et les
+    profils sont mis en cache par ticker : analyser plusieurs ETF coûte
+    le nombre de lignes distinctes, pas la somme des lignes.
+    """
+
+    def __init__(self, screening: HalalScreeningService = None, ttl: float = PROFILE_TTL,
+                 max_profiles: int = MAX_PROFILES):
+        self.screening = screening or HalalScreeningService()
+        self.ttl = ttl
+        self.profiles = TTLCache(max_profiles)
+
+    def holdings(self, etf: str) -> list:
+        return holding_rows(get_provider().get_holdings(etf))
+
+    def screen_holdings(self, symbols: list) -> dict:
+        """{symbole: profil ou None} ; seuls les symboles absents du cache sont analysés"""
+        profiles, missing = {}, []
+        for symbol in dict.fromkeys(s for s in symbols if s):
+            profile = self.profiles.get(symbol, _UNSCREENED)
+            if profile is _UNSCREENED:
+                missing.append(symbol)
+            else:
+                profiles[symbol] = profile
+
+        results, errors = self.screening.get_company_profiles(missing)
+        for symbol, error in errors.items():
+            print(f"Erreur Look-through {symbol}: {error}")
+        for symbol in missing:
+            profiles[symbol] = results.get(symbol)
+            # Un symbole introuvable (None) est aussi mémorisé ; une erreur ou un délai dépassé non
+            if symbol in results:
+                self.profiles.set(symbol, profiles[symbol], self.ttl)
+        return profiles
+
+    def summarize(self, etf: str, holdings: list, profiles: dict) -> dict:
+        """Score pondéré par les poids et exposition non conforme (en % de l'actif net)"""
+        lines = []
+        compliant = non_compliant = unknown = weighted_score = 0.0
+        for holding in holdings:
+            profile = profiles.get(holding["symbol"])
+            weight = holding["percent"]
+            if profile is None:
+                unknown += weight
+                lines.append({**holding, "is_halal": None, "sharia_score": None, "reason": "Non analysé"})
+                continue
+            weighted_score += weight * profile["sharia_score"]
+            if profile["is_halal"]:
+                compliant += weight
+            else:
+                non_compliant += weight
+            lines.append({
+                **holding,
+                "is_halal": profile["is_halal"],
+                "sharia_score": profile["sharia_score"],
+                "reason": profile["reason"],
+            })
+
+        screened = compliant + non_compliant
+        return {
+            "ticker": etf,
+            "holdings": lines,
+            "weighted_score": round(weighted_score / screened, 1) if screened else None,
+            "compliant_weight": round(compliant, 2),
+            "non_compliant_exposure": round(non_compliant, 2),
+            "unscreened_weight": round(unknown, 2),
+            # Part des lignes analysées dont le statut est non conforme
+            "non_compliant_share": round(non_compliant / screened * 100, 2) if screened else None,
+        }
+
+    def analyze(self, etfs: list) -> tuple:
+        """(résumés par ETF, erreurs par ETF, nombre de lignes distinctes)"""
+        holdings, errors = fan_out(self.holdings, etfs)
+        symbols = [h["symbol"] for etf in etfs for h in holdings.get(etf, [])]
+        profiles = self.screen_holdings(symbols)
+        summaries = {etf: self.summarize(etf, holdings[etf], profiles) for etf in etfs if etf in holdings}
+        return summaries, errors, len(profiles)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_lookthrough_service() -> ETFLookThroughService:
+    """Service partagé (cache de profils commun à toutes les requêtes)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ETFLookThroughService()
+    return _service
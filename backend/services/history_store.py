@@ -0,0 +1,408 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import get_provider
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus (dev, un seul processus)
+    fcntl = None
+
+# Répertoire du stock local (un sous-dossier par ticker / intervalle)
+STORE_DIR = os.environ.get(
+    "ATHAR_HISTORY_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "history"),
+)
+# Délai minimal entre deux vérifications de la fin de série auprès de Yahoo
+TAIL_REFRESH_SECONDS = 15 * 60
+# Au-delà, les segments ajoutés sont fusionnés en un seul fichier
+MAX_SEGMENTS = 8
+# Seules les barres journalières sont conservées (l'intraday expire trop vite)
+STORED_INTERVALS = {"1d"}
+
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+
+def _to_ns(index) -> np.ndarray:
+    """Horodatages UTC en nanosecondes (int64)"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return index.tz_convert("UTC").tz_localize(None).values.astype("datetime64[ns]").view("int64")
+
+
+def _save_atomic(path: str, array: np.ndarray):
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+class _Series:
+    """État en mémoire d'une série : métadonnées + segments mappés"""
+
+    def __init__(self, meta: dict, segments: list, meta_mtime: int):
+        self.meta = meta
+        self.segments = segments          # [(ts memmap, values memmap)]
+        self.meta_mtime = meta_mtime
+        self.live_tail = None             # Barre(s) du jour, non persistées
+        self.checked_at = 0.0
+
+    @property
+    def last_ts(self):
+        for ts, _ in reversed(self.segments):
+            if len(ts):
+                return int(ts[-1])
+        return None
+
+    def read(self, start_ns=None):
+        """(ts, values) à partir de start_ns : vues sans copie s'il n'y a qu'un segment"""
+        parts = []
+        for ts, values in self.segments:
+            first = 0 if start_ns is None else int(np.searchsorted(ts, start_ns, side="left"))
+            if first < len(ts):
+                parts.append((ts[first:], values[first:]))
+        if not parts:
+            width = len(self.meta["columns"])
+            return np.empty(0, dtype=np.int64), np.empty((0, width))
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+class HistoryStore:
+    """Stock local d'historiques OHLCV (tableaux NumPy mappés en mémoire)
+
+    Chaque série (ticker, intervalle, ajustement) est une suite de segments
+    append-only `<id>.ts.npy` / `<id>.values.npy` décrits par `meta.json`.
+    Seules les barres clôturées sont persistées ; la barre du jour est
+    gardée en mémoire et rafraîchie au plus toutes les TAIL_REFRESH_SECONDS.
+
+    Le stock est partagé par tous les workers : chaque série a un fichier
+    `.lock` (flock). Les écritures (meta.json + suppression de segments)
+    prennent le verrou exclusif et relisent meta.json sous ce verrou ; la
+    lecture de meta.json et le chargement de ses segments prennent le
+    verrou partagé. Un segment remplacé n'est supprimé qu'après publication
+    du nouveau meta.json, sous le verrou exclusif.
+    """
+
+    def __init__(self, root: str = STORE_DIR, provider=None):
+        self.root = root
+        self._provider = provider
+        self._series = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def provider(self):
+        return self._provider if self._provider is not None else get_provider()
+
+    # --- Accès disque ---
+
+    def _dir(self, key) -> str:
+        ticker, interval, auto_adjust = key
+        safe = re.sub(r"[^A-Za-z0-9._=^-]", "_", ticker)
+        return os.path.join(self.root, safe, f"{interval}-{'adj' if auto_adjust else 'raw'}")
+
+    def _lock(self, key) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @contextmanager
+    def _file_lock(self, key, exclusive: bool = True):
+        """Verrou inter-processus d'une série (ne pas imbriquer : flock par descripteur)"""
+        directory = self._dir(key)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _open(self, key, locked: bool = False):
+        """Série courante (relit meta.json si un autre processus l'a modifié)
+
+        locked=True : l'appelant tient déjà le verrou exclusif ; meta.json est
+        alors toujours relu (le mtime peut être identique sur un FS peu précis).
+        """
+        meta_path = os.path.join(self._dir(key), "meta.json")
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            self._series.pop(key, None)
+            return None
+
+        series = self._series.get(key)
+        if not locked and series is not None and series.meta_mtime == mtime:
+            return series
+
+        if locked:
+            fresh = self._read_series(key)
+        else:
+            with self._file_lock(key, exclusive=False):
+                fresh = self._read_series(key)
+        if fresh is None:
+            self._series.pop(key, None)
+            return None
+        if series is not None:
+            fresh.live_tail, fresh.checked_at = series.live_tail, series.checked_at
+        self._series[key] = fresh
+        return fresh
+
+    def _read_series(self, key):
+        """meta.json et segments mappés (sous verrou : segments garantis présents)"""
+        meta_path = os.path.join(self._dir(key), "meta.json")
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        directory = self._dir(key)
+        segments = [
+            (
+                np.load(os.path.join(directory, f"{name}.ts.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, f"{name}.values.npy"), mmap_mode="r"),
+            )
+            for name in meta["segments"]
+        ]
+        return _Series(meta, segments, mtime)
+
+    def _write_segment(self, key, ts: np.ndarray, values: np.ndarray) -> str:
+        directory = self._dir(key)
+        os.makedirs(directory, exist_ok=True)
+        name = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        _save_atomic(os.path.join(directory, f"{name}.values.npy"), np.ascontiguousarray(values, dtype=np.float64))
+        _save_atomic(os.path.join(directory, f"{name}.ts.npy"), np.ascontiguousarray(ts, dtype=np.int64))
+        return name
+
+    def _write_meta(self, key, meta: dict):
+        directory = self._dir(key)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "meta.json")
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+        # Rechargement forcé : le mtime peut être identique sur un FS peu précis
+        self._series.pop(key, None)
+
+    def _remove_segments(self, key, names):
+        directory = self._dir(key)
+        for name in names:
+            for suffix in (".ts.npy", ".values.npy"):
+                try:
+                    os.remove(os.path.join(directory, name + suffix))
+                except OSError:
+                    pass
+
+    # --- Écriture ---
+
+    def _split_closed(self, frame: pd.DataFrame):
+        """Sépare les barres clôturées de la barre du jour (encore mobile)"""
+        tz = frame.index.tz or "UTC"
+        today = pd.Timestamp.now(tz=tz).normalize()
+        closed = frame.index < today
+        return frame[closed], frame[~closed]
+
+    def _replace(self, key, frame: pd.DataFrame, covered_from, head_complete: bool):
+        """Réécrit entièrement la série à partir d'un téléchargement complet"""
+        closed, live = self._split_closed(frame)
+        columns = [str(c) for c in frame.columns]
+
+        with self._file_lock(key):
+            # meta.json relu sous le verrou : segments réellement référencés à cet instant
+            old = self._open(key, locked=True)
+            name = self._write_segment(key, _to_ns(closed.index), closed.to_numpy(dtype=np.float64))
+            self._write_meta(key, {
+                "version": 1,
+                "columns": columns,
+                "tz": str(frame.index.tz or "UTC"),
+                "segments": [name],
+                "covered_from": covered_from,
+                "head_complete": head_complete,
+            })
+            # Suppression après publication du nouveau meta.json
+            if old is not None:
+                self._remove_segments(key, old.meta["segments"])
+            series = self._open(key, locked=True)
+
+        series.live_tail, series.checked_at = live, time.time()
+        return series
+
+    def _append(self, key, series: _Series, frame: pd.DataFrame):
+        """Ajoute les barres clôturées postérieures à la dernière barre stockée"""
+        closed, live = self._split_closed(frame)
+
+        with self._file_lock(key):
+            # Un autre worker a pu ajouter (ou remplacer) des segments depuis notre lecture
+            current = self._open(key, locked=True)
+            if current is not None:
+                series = current
+            last_ts = series.last_ts
+            ts = _to_ns(closed.index)
+            if last_ts is not None:
+                newer = ts > last_ts
+                closed, ts = closed[newer], ts[newer]
+
+            if len(closed) and current is not None:
+                values = closed.reindex(columns=series.meta["columns"]).to_numpy(dtype=np.float64)
+                name = self._write_segment(key, ts, values)
+                meta = dict(series.meta, segments=series.meta["segments"] + [name])
+                self._write_meta(key, meta)
+                series = self._open(key, locked=True)
+                if len(meta["segments"]) > MAX_SEGMENTS:
+                    series = self._compact_locked(key)
+
+        series.live_tail, series.checked_at = live, time.time()
+        return series
+
+    def _compact_locked(self, key):
+        series = self._open(key, locked=True)
+        if series is None or len(series.segments) <= 1:
+            return series
+        ts, values = series.read()
+        name = self._write_segment(key, ts, values)
+        old_segments = series.meta["segments"]
+        self._write_meta(key, dict(series.meta, segments=[name]))
+        self._remove_segments(key, old_segments)
+        return self._open(key, locked=True)
+
+    def compact(self, ticker: str, interval: str = "1d", auto_adjust: bool = True):
+        """Fusionne tous les segments d'une série en un seul"""
+        key = (ticker, interval, auto_adjust)
+        previous = self._series.get(key)
+        with self._file_lock(key):
+            compacted = self._compact_locked(key)
+        if compacted is not None and previous is not None:
+            compacted.live_tail, compacted.checked_at = previous.live_tail, previous.checked_at
+        return compacted
+
+    # --- Lecture ---
+
+    def _requested_start(self, start, period, tz):
+        if period == "max":
+            return None
+        now = pd.Timestamp.now(tz=tz).normalize()
+        if start is not None:
+            stamp = pd.Timestamp(start)
+            stamp = stamp.tz_localize(tz) if stamp.tz is None else stamp.tz_convert(tz)
+        elif period == "ytd":
+            stamp = now.replace(month=1, day=1)
+        else:
+            stamp = now - PERIOD_OFFSETS[period]
+        return int(_to_ns([stamp])[0])
+
+    def _to_frame(self, series: _Series, start_ns) -> pd.DataFrame:
+        ts, values = series.read(start_ns)
+        index = pd.DatetimeIndex(ts.view("datetime64[ns]")).tz_localize("UTC").tz_convert(series.meta["tz"])
+        index.name = "Date"
+        frame = pd.DataFrame(values, index=index, columns=series.meta["columns"], copy=False)
+
+        tail = series.live_tail
+        if tail is not None and not tail.empty:
+            tail = tail.reindex(columns=series.meta["columns"])
+            if start_ns is not None:
+                tail = tail[_to_ns(tail.index) >= start_ns]
+            if not tail.empty:
+                frame = pd.concat([frame, tail])
+        return frame
+
+    def get_history(self, ticker: str, start=None, period=None, interval: str = "1d", auto_adjust: bool = True):
+        """Historique OHLCV, lu localement et complété par la fin manquante
+
+        Même contrat que provider.get_history (DataFrame en lecture seule).
+        Les intervalles / périodes non gérés sont transmis tels quels au provider.
+        """
+        params = {"interval": interval, "auto_adjust": auto_adjust}
+        if start is not None:
+            params["start"] = start
+        else:
+            params["period"] = period or "1mo"
+            period = params["period"]
+
+        if interval not in STORED_INTERVALS or (start is None and period != "max"
+                                                and period != "ytd" and period not in PERIOD_OFFSETS):
+            return self.provider.get_history(ticker, **params)
+
+        key = (ticker, interval, auto_adjust)
+        with self._lock(key):
+            series = self._open(key)
+            tz = series.meta["tz"] if series is not None else "UTC"
+            start_ns = self._requested_start(start, period, tz)
+
+            need_head = series is None or (
+                not series.meta["head_complete"]
+                and (start_ns is None or series.meta["covered_from"] is None
+                     or start_ns < series.meta["covered_from"])
+            )
+
+            if need_head:
+                frame = self.provider.get_history(ticker, **params)
+                if frame is None or frame.empty:
+                    return frame
+                first_ns = int(_to_ns(frame.index[:1])[0])
+                # Premier cours bien après la date demandée : l'actif n'existait pas avant
+                head_complete = start_ns is None or first_ns - start_ns > 10 * 86400 * 10**9
+                series = self._replace(key, frame, start_ns if start_ns is not None else first_ns, head_complete)
+                start_ns = self._requested_start(start, period, series.meta["tz"])
+
+            elif time.time() - series.checked_at > TAIL_REFRESH_SECONDS:
+                last_ts = series.last_ts
+                if last_ts is None:
+                    tail_start = pd.Timestamp(series.meta["covered_from"], tz="UTC")
+                else:
+                    tail_start = pd.Timestamp(last_ts, tz="UTC")
+                tail_start = tail_start.tz_convert(series.meta["tz"]).strftime("%Y-%m-%d")
+                tail = self.provider.get_history(ticker, start=tail_start, interval=interval, auto_adjust=auto_adjust)
+
+                if tail is not None and not tail.empty:
+                    newer, _ = self._split_closed(tail[_to_ns(tail.index) > (last_ts if last_ts is not None else -1)])
+                    events = newer.get("Stock Splits", pd.Series(dtype=float)).fillna(0).ne(0).any()
+                    if auto_adjust:
+                        events = events or newer.get("Dividends", pd.Series(dtype=float)).fillna(0).ne(0).any()
+                    if events:
+                        # Split / dividende : tout l'historique ajusté change, on le retélécharge
+                        full = self.provider.get_history(
+                            ticker, period="max", interval=interval, auto_adjust=auto_adjust)
+                        if full is not None and not full.empty:
+                            series = self._replace(key, full, int(_to_ns(full.index[:1])[0]), True)
+                    else:
+                        series = self._append(key, series, tail)
+                else:
+                    series.checked_at = time.time()
+
+            return self._to_frame(series, start_ns)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> HistoryStore:
+    """Instance partagée du stock d'historiques"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore()
+    return _store
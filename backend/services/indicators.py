@@ -0,0 +1,273 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Paramètres par défaut des indicateurs
+RSI_PERIOD = 14
+SMA_WINDOW = 20
+EMA_SPAN = 20
+MACD_PARAMS = (12, 26, 9)
+BOLLINGER_PARAMS = (20, 2.0)
+POSITION_WINDOW = 252 # ~52 semaines de bourse
+
+INDICATORS = (
+    "sma", "ema", "rsi", "macd", "macd_signal", "macd_hist",
+    "bb_mid", "bb_upper", "bb_lower", "position_52w",
+)
+
+# Les matrices de prix sont (tickers x dates) : NaN avant la première
+# cotation d'un ticker, sans trou ensuite (voir calendar_groups).
+
+
+def calendar_groups(closes: dict) -> list:
+    """{ticker: Series de clôtures} -> [(tickers, dates, matrice tickers x dates)]
+
+    Un groupe par calendrier de cotation : les tickers d'une même bourse
+    partagent une matrice, sans alignement sur les séances des autres places
+    (une séance fermée n'est pas une barre à cours inchangé). Les trous propres
+    à un ticker sont comblés par sa dernière valeur connue.
+    """
+    groups = {}
+    for ticker, series in closes.items():
+        if series is None or not len(series):
+            continue
+        # Bourses de fuseaux différents : date locale de la barre
+        index = pd.DatetimeIndex(series.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        daily = pd.Series(series.to_numpy(dtype=np.float64), index=index.normalize()).sort_index()
+        daily = daily[~daily.index.duplicated(keep="last")].ffill()
+        if daily.isna().all():
+            continue
+        groups.setdefault(daily.index.asi8.tobytes(), []).append((ticker, daily))
+
+    return [([t for t, _ in members], members[0][1].index, np.vstack([s.to_numpy() for _, s in members]))
+            for members in groups.values()]
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> tuple:
+    """(sommes glissantes, fenêtre complète ?) le long des dates"""
+    valid = np.isfinite(values)
+    cum = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    count = np.cumsum(valid, axis=1)
+    sums = cum.copy()
+    sums[:, window:] -= cum[:, :-window]
+    counts = count.copy()
+    counts[:, window:] -= count[:, :-window]
+    return sums, counts == window
+
+
+def sma(prices: np.ndarray, window: int = SMA_WINDOW) -> np.ndarray:
+    sums, full = _rolling_sum(prices, window)
+    return np.where(full, sums / window, np.nan)
+
+
+def _ema_step(state: np.ndarray, value: np.ndarray, alpha: float) -> np.ndarray:
+    # Démarre sur la première valeur connue ; une valeur manquante conserve l'état
+    return np.where(np.isnan(state), value,
+                    np.where(np.isnan(value), state, state + alpha * (value - state)))
+
+
+def ema(prices: np.ndarray, span: int = EMA_SPAN) -> np.ndarray:
+    """Moyenne exponentielle (équivalent de ewm(span, adjust=False))"""
+    alpha = 2 / (span + 1)
+    out = np.empty_like(prices, dtype=np.float64)
+    state = np.full(prices.shape[0], np.nan)
+    for j in range(prices.shape[1]):
+        state = _ema_step(state, prices[:, j], alpha)
+        out[:, j] = state
+    return out
+
+
+def bollinger(prices: np.ndarray, window: int = BOLLINGER_PARAMS[0], k: float = BOLLINGER_PARAMS[1]) -> tuple:
+    """(milieu, bande haute, bande basse) : moyenne mobile +/- k écarts-types (population)"""
+    # Décalage par ticker pour limiter les pertes de précision de E[x²] - E[x]²
+    first = np.argmax(np.isfinite(prices), axis=1)
+    ref = prices[np.arange(len(prices)), first]
+    centered = prices - ref[:, None]
+    sums, full = _rolling_sum(centered, window)
+    squares, _ = _rolling_sum(centered ** 2, window)
+    mean = sums / window
+    std = np.sqrt(np.maximum(squares / window - mean ** 2, 0))
+    mid = np.where(full, mean + ref[:, None], np.nan)
+    return mid, mid + k * std, mid - k * std
+
+
+def _window_extrema(window_values: np.ndarray) -> tuple:
+    # Fenêtres entièrement vides (avant la première cotation) : NaN sans avertissement
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmin(window_values, axis=-1), np.nanmax(window_values, axis=-1)
+
+
+def _position(price: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Position du prix entre plus bas et plus haut (0 = au plus bas, 100 = au plus haut)"""
+    span = high - low
+    with np.errstate(invalid='ignore', divide='ignore'):
+        position = np.where(span > 0, (price - low) / span * 100, 50.0)
+    return np.where(np.isnan(price) | np.isnan(span), np.nan, position)
+
+
+def _rolling_extrema(prices: np.ndarray, window: int) -> tuple:
+    """(min, max) glissants sur `window` dates, fenêtre tronquée au début, NaN ignorés
+
+    Algorithme de van Herk / Gil-Werman : minima cumulés par blocs de `window`
+    dans les deux sens, O(dates) quel que soit la taille de la fenêtre.
+    """
+    n_tickers, n_dates = prices.shape
+    length = n_dates + window - 1
+    n_blocks = -(-length // window)
+    padded = np.full((n_tickers, n_blocks * window), np.nan)
+    padded[:, window - 1:length] = prices
+    blocks = padded.reshape(n_tickers, n_blocks, window)
+
+    extrema = []
+    for ufunc in (np.fmin, np.fmax):
+        prefix = ufunc.accumulate(blocks, axis=2).reshape(n_tickers, -1)
+        suffix = ufunc.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(n_tickers, -1)
+        extrema.append(ufunc(suffix[:, :n_dates], prefix[:, window - 1:window - 1 + n_dates]))
+    return tuple(extrema)
+
+
+def position_52w(prices: np.ndarray, window: int = POSITION_WINDOW) -> np.ndarray:
+    """Position dans le range des `window` dernières clôtures (fenêtre tronquée au début)"""
+    low, high = _rolling_extrema(prices, window)
+    return _position(prices, low, high)
+
+
+class IndicatorState:
+    """État des indicateurs pour un ensemble de tickers, avancé barre par barre
+
+    fit() calcule tout l'historique (récurrences vectorisées sur les tickers,
+    fenêtres glissantes en une passe) et conserve l'état ; update() ajoute une
+    barre sans recalculer l'historique : O(tickers x fenêtre max).
+    """
+
+    def __init__(self, n_tickers: int, rsi_period: int = RSI_PERIOD, sma_window: int = SMA_WINDOW,
+                 ema_span: int = EMA_SPAN, macd_params: tuple = MACD_PARAMS,
+                 bollinger_params: tuple = BOLLINGER_PARAMS, position_window: int = POSITION_WINDOW):
+        self.rsi_period = rsi_period
+        self.sma_window = sma_window
+        self.ema_span = ema_span
+        self.macd_params = tuple(macd_params)
+        self.bollinger_params = tuple(bollinger_params)
+        self.position_window = position_window
+
+        nan = lambda: np.full(n_tickers, np.nan)
+        self.prev = nan()
+        self.rsi_count = np.zeros(n_tickers, dtype=np.int64)
+        self.gain_sum = np.zeros(n_tickers)
+        self.loss_sum = np.zeros(n_tickers)
+        self.avg_gain = nan()
+        self.avg_loss = nan()
+        self.ema = nan()
+        self.ema_fast = nan()
+        self.ema_slow = nan()
+        self.ema_signal = nan()
+        # Dernières clôtures (plus récente en dernière colonne) pour les fenêtres
+        width = max(sma_window, bollinger_params[0], position_window)
+        self.window = np.full((n_tickers, width), np.nan)
+
+    # --- Récurrences (une barre, tous les tickers) ---
+    def _step_rsi(self, value: np.ndarray) -> np.ndarray:
+        period = self.rsi_period
+        delta = value - self.prev
+        valid = np.isfinite(delta)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+
+        # Amorçage : moyenne simple des `period` premières variations, puis lissage de Wilder
+        self.rsi_count += valid
+        seeding = valid & (self.rsi_count <= period)
+        self.gain_sum += np.where(seeding, gain, 0.0)
+        self.loss_sum += np.where(seeding, loss, 0.0)
+        seeded = valid & (self.rsi_count == period)
+        smoothing = valid & (self.rsi_count > period)
+        self.avg_gain = np.where(seeded, self.gain_sum / period,
+                                 np.where(smoothing, (self.avg_gain * (period - 1) + gain) / period, self.avg_gain))
+        self.avg_loss = np.where(seeded, self.loss_sum / period,
+                                 np.where(smoothing, (self.avg_loss * (period - 1) + loss) / period, self.avg_loss))
+        self.prev = np.where(np.isnan(value), self.prev, value)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        rsi = np.where(self.avg_loss == 0, np.where(self.avg_gain > 0, 100.0, 50.0), rsi)
+        return np.where(np.isnan(self.avg_gain) | np.isnan(value), np.nan, rsi)
+
+    def _step_ema(self, value: np.ndarray) -> tuple:
+        fast, slow, signal = self.macd_params
+        self.ema = _ema_step(self.ema, value, 2 / (self.ema_span + 1))
+        self.ema_fast = _ema_step(self.ema_fast, value, 2 / (fast + 1))
+        self.ema_slow = _ema_step(self.ema_slow, value, 2 / (slow + 1))
+        line = self.ema_fast - self.ema_slow
+        self.ema_signal = _ema_step(self.ema_signal, line, 2 / (signal + 1))
+        return self.ema, line, self.ema_signal
+
+    # --- Historique complet ---
+    def fit(self, prices: np.ndarray) -> dict:
+        """Indicateurs sur tout l'historique (matrices tickers x dates) ; l'état suit la dernière barre"""
+        prices = np.asarray(prices, dtype=np.float64)
+        n_dates = prices.shape[1]
+        out = {name: np.empty_like(prices) for name in ("rsi", "ema", "macd", "macd_signal")}
+        for j in range(n_dates):
+            value = prices[:, j]
+            out["rsi"][:, j] = self._step_rsi(value)
+            out["ema"][:, j], out["macd"][:, j], out["macd_signal"][:, j] = self._step_ema(value)
+        out["macd_hist"] = out["macd"] - out["macd_signal"]
+
+        out["sma"] = sma(prices, self.sma_window)
+        out["bb_mid"], out["bb_upper"], out["bb_lower"] = bollinger(prices, *self.bollinger_params)
+        out["position_52w"] = position_52w(prices, self.position_window)
+
+        width = self.window.shape[1]
+        tail = prices[:, -width:]
+        self.window[:, width - tail.shape[1]:] = tail
+        return out
+
+    # --- Mise à jour incrémentale ---
+    def update(self, closes: np.ndarray) -> dict:
+        """Ajoute une barre (une clôture par ticker, NaN si absente) et renvoie les indicateurs du jour"""
+        value = np.asarray(closes, dtype=np.float64)
+        self.window[:, :-1] = self.window[:, 1:]
+        self.window[:, -1] = np.where(np.isnan(value), self.window[:, -2], value)
+
+        latest = {"rsi": self._step_rsi(value)}
+        latest["ema"], latest["macd"], latest["macd_signal"] = (a.copy() for a in self._step_ema(value))
+        latest["macd_hist"] = latest["macd"] - latest["macd_signal"]
+
+        sma_tail = self.window[:, -self.sma_window:]
+        latest["sma"] = sma_tail.mean(axis=1)
+        bb_window, k = self.bollinger_params
+        bb_tail = self.window[:, -bb_window:]
+        latest["bb_mid"] = bb_tail.mean(axis=1)
+        std = bb_tail.std(axis=1)
+        latest["bb_upper"] = latest["bb_mid"] + k * std
+        latest["bb_lower"] = latest["bb_mid"] - k * std
+        low, high = _window_extrema(self.window[:, -self.position_window:])
+        latest["position_52w"] = _position(self.window[:, -1], low, high)
+        return latest
+
+
+def compute(prices: np.ndarray, names=None, **params) -> dict:
+    """Indicateurs demandés (tous par défaut) pour une matrice tickers x dates"""
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    out = IndicatorState(prices.shape[0], **params).fit(prices)
+    return {name: out[name] for name in (names or INDICATORS) if name in out}
+
+
+def rsi(prices: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """RSI de Wilder (matrice tickers x dates ou série 1-D)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    state = IndicatorState(np.atleast_2d(prices).shape[0], rsi_period=period)
+    out = np.empty_like(np.atleast_2d(prices))
+    for j, value in enumerate(np.atleast_2d(prices).T):
+        out[:, j] = state._step_rsi(value)
+    return out.reshape(prices.shape)
+
+
+def macd(prices: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple:
+    """(ligne MACD, signal, histogramme)"""
+    line = ema(prices, fast) - ema(prices, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
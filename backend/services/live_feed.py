@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+
+from services.market_data import get_provider
+from services.concurrency import fan_out
+from services.refresh_scheduler import get_scheduler
+
+# Sélection Sharia Compliant affichée sur l'accueil (par défaut)
+DEFAULT_LIVE_ASSETS = {
+    "SGLD.L": "Or Physique",
+    "SSLV.L": "Argent Phys.",
+    "ISDW.L": "World Islamic",
+}
+
+# Période de rafraîchissement du poller (secondes)
+POLL_INTERVAL = float(os.environ.get("ATHAR_LIVE_INTERVAL", 30))
+# Sans client depuis ce délai, plus aucun appel Yahoo (les flux SSE relancent
+# live_prices() à chaque keep-alive : ils comptent comme clients)
+LIVE_IDLE_SECONDS = max(2 * POLL_INTERVAL, 60)
+
+
+def parse_assets(spec: str) -> dict:
+    """"SGLD.L=Or Physique;ISDW.L=World Islamic" -> {symbole: nom}
+
+    Le nom est optionnel ("SGLD.L;ISDW.L") : le symbole sert alors de nom.
+    """
+    assets = {}
+    for entry in (spec or "").split(";"):
+        symbol, _, name = entry.partition("=")
+        symbol = symbol.strip().upper()
+        if symbol:
+            assets[symbol] = name.strip() or symbol
+    return assets
+
+
+def configured_assets() -> dict:
+    """Liste des symboles suivis : variable ATHAR_LIVE_ASSETS, sinon la sélection par défaut"""
+    return parse_assets(os.environ.get("ATHAR_LIVE_ASSETS", "")) or dict(DEFAULT_LIVE_ASSETS)
+
+
+def build_quote(provider, symbol: str, name: str, refresh: bool = False) -> dict:
+    quote = provider.get_quote(symbol, refresh=refresh) # Clôtures sur 2 jours pour la variation
+
+    if quote["previous_close"]:
+        price = quote["price"]
+        prev_price = quote["previous_close"]
+        change = ((price - prev_price) / prev_price) * 100
+    else:
+        price = provider.get_info(symbol).get('regularMarketPrice', 0)
+        change = 0
+
+    return {
+        "symbol": symbol,
+        "name": name,
+        "price": round(price, 2),
+        "change": round(change, 2),
+        "currency": "USD" if "L" in symbol else "$"
+    }
+
+
+class LivePricePoller:
+    """Snapshot des prix live partagé par tous les clients
+
+    fetch est appelé par l'ordonnanceur de rafraîchissement, seulement tant
+    que des clients demandent les prix, et dans un seul worker par cache
+    partagé (bail) : le nombre d'appels vers Yahoo ne dépend ni du nombre de
+    clients ni du nombre de workers. Les autres workers reçoivent le snapshot
+    publié via publish. Chaque snapshot porte un numéro de version : les flux
+    SSE attendent la version suivante sur une Condition partagée.
+    """
+
+    def __init__(self, assets: dict = None, interval: float = POLL_INTERVAL, provider=None):
+        self.assets = assets or configured_assets()
+        self.interval = interval
+        self._provider = provider
+        self._cond = threading.Condition()
+        self._version = 0
+        self._snapshot = []
+        self._updated_at = None
+
+    @property
+    def provider(self):
+        return self._provider or get_provider()
+
+    def fetch(self) -> list:
+        """Rafraîchit tous les symboles (en parallèle) ; un symbole en erreur garde sa dernière valeur"""
+        provider = self.provider
+        results, errors = fan_out(
+            lambda symbol: build_quote(provider, symbol, self.assets[symbol], refresh=True),
+            list(self.assets),
+        )
+        for symbol, error in errors.items():
+            print(f"Erreur Live Feed {symbol}: {error}")
+        if not results:
+            raise RuntimeError("aucun prix live disponible")
+
+        with self._cond:
+            previous = {row["symbol"]: row for row in self._snapshot}
+        snapshot = [results.get(s) or previous.get(s) for s in self.assets]
+        return [row for row in snapshot if row is not None]
+
+    def publish(self, rows: list, updated_at: float = None) -> list:
+        """Publie un nouveau snapshot et réveille les flux SSE"""
+        with self._cond:
+            self._snapshot = rows
+            self._updated_at = updated_at or time.time()
+            self._version += 1
+            self._cond.notify_all()
+            return self._snapshot
+
+    def poll_once(self) -> list:
+        return self.publish(self.fetch())
+
+    def snapshot(self) -> tuple:
+        """(version, horodatage, lignes) du dernier snapshot publié"""
+        with self._cond:
+            return self._version, self._updated_at, self._snapshot
+
+    def wait_for_update(self, last_version: int, timeout: float) -> tuple:
+        """Bloque jusqu'à un snapshot plus récent que last_version (ou timeout)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > last_version, timeout=timeout)
+            return self._version, self._updated_at, self._snapshot
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_live_poller() -> LivePricePoller:
+    """Poller partagé du processus"""
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = LivePricePoller()
+    return _poller
+
+
+def live_prices() -> list:
+    """Dernier snapshot, servi immédiatement (rechargé en arrière-plan à expiration)"""
+    return get_scheduler().get("live_prices")
+
+
+get_scheduler().register(
+    "live_prices", lambda: get_live_poller().fetch(), POLL_INTERVAL, idle=LIVE_IDLE_SECONDS, shared=True,
+    on_update=lambda rows, updated_at: get_live_poller().publish(rows, updated_at),
+)
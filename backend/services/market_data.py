@@ -0,0 +1,365 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.concurrency import SingleFlight, fan_out
+from services.metrics import UPSTREAM_ERRORS, UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY
+from services.upstream import CircuitOpen, RateLimited, UpstreamGate, mark_stale
+
+# Durées de vie (secondes) par type de donnée
+DEFAULT_TTLS = {
+    "quote": 60,             # Dernier cours / clôture précédente
+    "info": 15 * 60,         # Fondamentaux (stock.info)
+    "history": 10 * 60,      # Historique OHLCV
+    "holdings": 6 * 3600,    # Composition des fonds (funds_data)
+    "news": 5 * 60,          # Actualités
+}
+
+# Type d'appel Yahoo (métriques) derrière chaque type de donnée du cache
+UPSTREAM_KINDS = {"quote": "history", "holdings": "funds_data"}
+
+# Tickers par appel groupé de cours (yf.download)
+QUOTE_BATCH_SIZE = 200
+# Une valeur expirée reste en cache ce délai de plus : elle est servie (marquée
+# périmée) si Yahoo échoue, est limité ou si le disjoncteur est ouvert
+STALE_SECONDS = int(os.environ.get("ATHAR_STALE_SECONDS", 6 * 3600))
+
+_MISSING = object()
+
+
+def quote_from_closes(closes) -> dict:
+    """Dernière clôture et clôture précédente d'une série (None si indisponibles)"""
+    quote = {"price": None, "previous_close": None}
+    if closes is None:
+        return quote
+    closes = closes.dropna()
+    if len(closes):
+        quote["price"] = float(closes.iloc[-1])
+        if len(closes) >= 2:
+            quote["previous_close"] = float(closes.iloc[-2])
+    return quote
+
+
+class TTLCache:
+    """Cache LRU borné avec expiration par entrée (thread-safe)"""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=_MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key, default=_MISSING):
+        """Comme get, sans compter de hit / miss ni toucher à l'ordre LRU"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return default
+            return entry[1]
+
+    def acquire(self, name: str, ttl: float, owner: str = None) -> bool:
+        """Bail exclusif (voir shared_cache) : un cache du processus n'a qu'un détenteur possible"""
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0,
+        }
+
+
+class YahooBackend:
+    """Accès direct à Yahoo Finance via yfinance"""
+
+    def __init__(self):
+        # Import différé : les backends de test n'ont pas besoin de yfinance
+        import yfinance as yf
+        self._yf = yf
+
+    def fetch_info(self, ticker: str) -> dict:
+        return self._yf.Ticker(ticker).info or {}
+
+    def fetch_history(self, ticker: str, **params):
+        return self._yf.Ticker(ticker).history(**params)
+
+    def fetch_quotes(self, tickers: list) -> dict:
+        """Cours de plusieurs tickers en un seul téléchargement"""
+        data = self._yf.download(
+            tickers, period="5d", auto_adjust=True, group_by="column", progress=False, threads=True
+        )
+        closes = None if data is None or data.empty else data["Close"]
+        if closes is not None and closes.ndim == 1:
+            closes = closes.to_frame(tickers[0])
+        return {
+            t: quote_from_closes(closes[t] if closes is not None and t in closes else None)
+            for t in tickers
+        }
+
+    def fetch_holdings(self, ticker: str):
+        funds_data = self._yf.Ticker(ticker).funds_data
+        return funds_data.top_holdings if funds_data else None
+
+    def fetch_news(self, ticker: str) -> list:
+        return self._yf.Ticker(ticker).news or []
+
+
+class FixtureBackend:
+    """Backend hors-ligne qui rejoue des données enregistrées (tests)
+
+    `fixtures` : {ticker: {"info": {...}, "history": DataFrame ou
+    {params_key: DataFrame}, "holdings": DataFrame, "news": [...]}}
+    """
+
+    def __init__(self, fixtures: dict = None):
+        self.fixtures = fixtures or {}
+        self.calls = 0
+
+    def _lookup(self, ticker: str, kind: str):
+        self.calls += 1
+        try:
+            return self.fixtures[ticker][kind]
+        except KeyError:
+            raise KeyError(f"Aucune fixture '{kind}' pour {ticker}")
+
+    def fetch_info(self, ticker: str) -> dict:
+        return self._lookup(ticker, "info")
+
+    def fetch_history(self, ticker: str, **params):
+        history = self._lookup(ticker, "history")
+        if isinstance(history, dict):
+            key = params_key(params)
+            return history[key] if key in history else history["default"]
+        return history
+
+    def fetch_quotes(self, tickers: list) -> dict:
+        self.calls += 1
+        quotes = {}
+        for t in tickers:
+            history = self.fixtures.get(t, {}).get("history")
+            if isinstance(history, dict):
+                history = history.get("default")
+            quotes[t] = quote_from_closes(history['Close'] if history is not None else None)
+        return quotes
+
+    def fetch_holdings(self, ticker: str):
+        return self._lookup(ticker, "holdings")
+
+    def fetch_news(self, ticker: str) -> list:
+        return self._lookup(ticker, "news")
+
+
+def params_key(params: dict) -> tuple:
+    """Clé hashable et stable pour des paramètres de requête"""
+    return tuple(sorted((k, str(v)) for k, v in params.items() if v is not None))
+
+
+class MarketDataProvider:
+    """Point d'accès unique aux données de marché, avec cache TTL/LRU
+
+    Les appels identiques concurrents (même type, ticker et paramètres) sont
+    regroupés : un seul appel amont, dont le résultat ou l'erreur est partagé.
+    Avec une UpstreamGate, les appels amont respectent le budget / disjoncteur
+    et un échec est remplacé par la dernière valeur connue (voir mark_stale).
+    Les objets renvoyés (dict, DataFrame) sont partagés entre requêtes :
+    les appelants doivent les traiter en lecture seule.
+    """
+
+    def __init__(self, backend=None, ttls: dict = None, max_entries: int = 2048, cache=None,
+                 gate: UpstreamGate = None):
+        self.backend = backend if backend is not None else YahooBackend()
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        # cache : TTLCache (défaut, propre au processus) ou cache partagé (services.shared_cache)
+        self.cache = cache if cache is not None else TTLCache(max_entries)
+        self._counters = {kind: {"hits": 0, "misses": 0} for kind in self.ttls}
+        self._counters_lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.gate = gate
+
+    def _fresh(self, kind: str, entry) -> bool:
+        # Entrées du cache : (date de récupération, valeur)
+        return entry is not _MISSING and time.time() - entry[0] < self.ttls[kind]
+
+    def _store(self, kind: str, cache_key: tuple, value):
+        self.cache.set(cache_key, (time.time(), value), self.ttls[kind] + STALE_SECONDS)
+
+    def _upstream(self, kind: str, fetch):
+        """Appel amont (budget / disjoncteur éventuels), mesuré par type d'appel Yahoo"""
+        outcome = "ok"
+        start = time.perf_counter()
+        try:
+            with UPSTREAM_IN_FLIGHT.track(kind=kind):
+                return fetch() if self.gate is None else self.gate.call(fetch)
+        except Exception as e:
+            outcome = "rejected" if isinstance(e, (RateLimited, CircuitOpen)) else "error"
+            UPSTREAM_ERRORS.inc(kind=kind, error=type(e).__name__)
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - start, kind=kind, outcome=outcome)
+
+    def _cached(self, kind: str, key: tuple, loader, refresh: bool = False):
+        cache_key = (kind,) + key
+        entry = _MISSING if refresh else self.cache.get(cache_key)
+        hit = self._fresh(kind, entry)
+        with self._counters_lock:
+            self._counters[kind]["hits" if hit else "misses"] += 1
+        if hit:
+            return entry[1]
+
+        def load():
+            # Un appel tout juste terminé a pu remplir le cache entre-temps
+            current = self.cache.peek(cache_key)
+            if not refresh and self._fresh(kind, current):
+                return current[1], False
+            try:
+                value = self._upstream(UPSTREAM_KINDS.get(kind, kind), loader)
+            except Exception as e:
+                if current is _MISSING:
+                    raise
+                if not isinstance(e, (RateLimited, CircuitOpen)):
+                    print(f"Erreur Yahoo ({kind} {key[0]}), dernière valeur servie : {e}")
+                return current[1], not self._fresh(kind, current)
+            self._store(kind, cache_key, value)
+            return value, False
+
+        value, stale = self.flights.do(cache_key, load)
+        if stale:
+            mark_stale(kind, key)
+        return value
+
+    def get_info(self, ticker: str) -> dict:
+        return self._cached("info", (ticker,), lambda: self.backend.fetch_info(ticker))
+
+    def get_history(self, ticker: str, **params):
+        return self._cached(
+            "history", (ticker, params_key(params)),
+            lambda: self.backend.fetch_history(ticker, **params),
+        )
+
+    def get_quote(self, ticker: str, refresh: bool = False) -> dict:
+        """Dernière clôture et clôture précédente (None si indisponibles)
+
+        refresh=True ignore le cache et le remet à jour (poller de prix).
+        """
+        def load():
+            hist = self.backend.fetch_history(ticker, period="2d")
+            return quote_from_closes(hist['Close'] if hist is not None and not hist.empty else None)
+        return self._cached("quote", (ticker,), load, refresh)
+
+    def get_quotes(self, tickers: list, refresh: bool = False) -> dict:
+        """Cours de nombreux tickers : les absents du cache sont téléchargés par lots
+
+        Un lot en échec donne le dernier cours connu (marqué périmé) ou des
+        cours None (non mis en cache) pour ses tickers.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        quotes, missing = {}, []
+        for ticker in tickers:
+            entry = _MISSING if refresh else self.cache.get(("quote", ticker))
+            if self._fresh("quote", entry):
+                quotes[ticker] = entry[1]
+            else:
+                missing.append(ticker)
+        with self._counters_lock:
+            self._counters["quote"]["hits"] += len(quotes)
+            self._counters["quote"]["misses"] += len(missing)
+
+        batches = [tuple(missing[i:i + QUOTE_BATCH_SIZE]) for i in range(0, len(missing), QUOTE_BATCH_SIZE)]
+        results, errors = fan_out(
+            lambda batch: self.flights.do(
+                ("quotes",) + batch, lambda: self._upstream("download", lambda: self.backend.fetch_quotes(list(batch)))),
+            batches,
+        )
+        for batch, error in errors.items():
+            print(f"Erreur cours groupés ({len(batch)} tickers): {error}")
+        empty = {"price": None, "previous_close": None}
+        for batch in batches:
+            fetched = results.get(batch)
+            for ticker in batch:
+                if fetched is not None:
+                    quotes[ticker] = fetched.get(ticker) or dict(empty)
+                    self._store("quote", ("quote", ticker), quotes[ticker])
+                    continue
+                entry = self.cache.peek(("quote", ticker))
+                if entry is _MISSING:
+                    quotes[ticker] = dict(empty)
+                    continue
+                quotes[ticker] = entry[1]
+                if not self._fresh("quote", entry):
+                    mark_stale("quote", (ticker,))
+        return {ticker: quotes[ticker] for ticker in tickers}
+
+    def get_holdings(self, ticker: str):
+        return self._cached("holdings", (ticker,), lambda: self.backend.fetch_holdings(ticker))
+
+    def get_news(self, ticker: str, refresh: bool = False) -> list:
+        return self._cached("news", (ticker,), lambda: self.backend.fetch_news(ticker), refresh)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            by_kind = {kind: dict(c) for kind, c in self._counters.items()}
+        stats = {"cache": self.cache.stats(), "by_kind": by_kind, "single_flight": self.flights.stats()}
+        if self.gate is not None:
+            stats["upstream"] = self.gate.stats()
+        return stats
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> MarketDataProvider:
+    """Instance partagée du provider (créée au premier appel, cache selon ATHAR_CACHE_URL)"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                # Import différé : shared_cache dépend de ce module
+                from services.shared_cache import make_cache
+                _provider = MarketDataProvider(cache=make_cache(), gate=UpstreamGate())
+    return _provider
+
+
+def set_provider(provider: MarketDataProvider):
+    """Remplace le provider partagé (ex: FixtureBackend dans les tests)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,213 @@
+"""Métriques applicatives au format texte Prometheus (sans dépendance)
+
+Histogrammes de latence (routes, appels Yahoo, fonctions décorées par
+@timed), compteurs d'erreurs et jauges d'appels en cours. Les valeurs
+dérivées d'autres composants (cache, disjoncteur...) sont lues au moment
+du scrape par des collecteurs (register_collector).
+
+Chaque worker gunicorn a son propre registre : /metrics décrit le worker
+qui répond, et toutes les séries portent son label `pid`. Sans ce label,
+les scrapes successifs (servis par des workers différents) feraient
+reculer les compteurs ; côté Prometheus, agréger avec sum by (...)
+(rate(...)).
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+INF_LABEL = 'le="+Inf"'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, *extra: str) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(e for e in extra if e)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self, const: str = "") -> list:
+        """Lignes d'exposition ; const : labels communs à toutes les séries (ex: pid="42")"""
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k, const)} {_number(v)}" for k, v in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Jauge incrémentée pendant le bloc (appels en cours)"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self, const: str = "") -> list:
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, const, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, const, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key, const)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key, const)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def register_collector(self, collect):
+        """collect() -> liste de métriques (Counter / Gauge) recalculées à chaque scrape"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        # Lu au scrape (et non à l'import) : le registre peut être créé avant le fork des workers
+        const = f'pid="{os.getpid()}"'
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render(const))
+        for collect in collectors:
+            try:
+                for metric in collect():
+                    lines.extend(metric.render(const))
+            except Exception as e:
+                print(f"Erreur collecteur de métriques: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "athar_http_request_duration_seconds", "Durée des requêtes HTTP par route", ("route", "method", "status"))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "athar_http_requests_in_flight", "Requêtes HTTP en cours par route", ("route",))
+HTTP_ERRORS = REGISTRY.counter(
+    "athar_http_exceptions_total", "Exceptions non gérées par route", ("route", "error"))
+
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "athar_upstream_duration_seconds", "Durée des appels Yahoo par type", ("kind", "outcome"))
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    "athar_upstream_in_flight", "Appels Yahoo en cours par type", ("kind",))
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "athar_upstream_errors_total", "Erreurs des appels Yahoo par type", ("kind", "error"))
+
+FUNCTION_LATENCY = REGISTRY.histogram(
+    "athar_function_duration_seconds", "Durée des traitements décorés par @timed", ("name",))
+
+
+def timed(name: str):
+    """Décorateur : latence de la fonction dans athar_function_duration_seconds{name=...}"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with FUNCTION_LATENCY.time(name=name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,151 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+# Trajectoires par graine dérivée : une trajectoire ne dépend que de son rang,
+# donc ni du découpage en tâches ni du nombre de processus
+SEED_PATHS = 256
+# Trajectoires par tâche (multiple de SEED_PATHS)
+CHUNK_PATHS = 2048
+MAX_WORKERS = int(os.environ.get("ATHAR_MC_WORKERS", os.cpu_count() or 1))
+PURIFICATION_RATE = 0.05
+PERCENTILES = (5, 25, 50, 75, 95)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de processus persistant ("spawn" : sûr dans un worker gunicorn multi-thread)"""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+
+def _block_starts(seeds, n_paths: int, n_months: int, n_blocks: int) -> np.ndarray:
+    """Débuts de blocs tirés graine par graine (SEED_PATHS trajectoires chacune)"""
+    if not isinstance(seeds, (list, tuple)):
+        return np.random.default_rng(seeds).integers(0, n_months, size=(n_paths, n_blocks))
+    return np.vstack([
+        np.random.default_rng(s).integers(0, n_months, size=(min(SEED_PATHS, n_paths - i * SEED_PATHS), n_blocks))
+        for i, s in enumerate(seeds)
+    ])
+
+
+def simulate_chunk(returns, yields, amounts, horizon: int, block: int, n_paths: int, seed) -> np.ndarray:
+    """Simule n_paths plans DCA par block bootstrap des mois historiques
+
+    returns / yields : (mois, tickers) rendements et rendements de dividende
+    mensuels. Les blocs de `block` mois consécutifs (circulaires) conservent
+    l'autocorrélation et la corrélation entre tickers. `seed` : une graine, ou
+    une liste de graines de SEED_PATHS trajectoires chacune. Renvoie
+    (n_paths, 3) : valeur finale, purification cumulée, drawdown maximal.
+    """
+    n_months, n_tickers = returns.shape
+    n_blocks = -(-horizon // block)
+    starts = _block_starts(seed, n_paths, n_months, n_blocks)
+    months = ((starts[:, :, None] + np.arange(block)) % n_months).reshape(n_paths, -1)[:, :horizon]
+
+    value = np.zeros((n_paths, n_tickers))
+    purification = np.zeros(n_paths)
+    growth = np.ones(n_paths)
+    peak = np.ones(n_paths)
+    max_drawdown = np.zeros(n_paths)
+
+    for m in range(horizon):
+        r = returns[months[:, m]]
+        y = yields[months[:, m]]
+
+        # Indice de performance (hors versements) pour mesurer le drawdown
+        total = value.sum(axis=1, keepdims=True)
+        weights = np.where(total > 0, value / np.where(total > 0, total, 1), 1 / n_tickers)
+        growth *= 1 + (weights * r).sum(axis=1)
+        np.maximum(peak, growth, out=peak)
+        np.maximum(max_drawdown, 1 - growth / peak, out=max_drawdown)
+
+        purification += (value * y).sum(axis=1) * PURIFICATION_RATE
+        value = value * (1 + r) + amounts
+
+    return np.column_stack([value.sum(axis=1), purification, max_drawdown])
+
+
+def _attach(name: str, shape: tuple):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+
+def _run_task(task):
+    """Exécuté dans un processus du pool : lit et écrit en mémoire partagée"""
+    in_name, in_shape, out_name, out_shape, offset, n_paths, seed, amounts, horizon, block = task
+    shm_in, data = _attach(in_name, in_shape)
+    shm_out, out = _attach(out_name, out_shape)
+    try:
+        n_tickers = in_shape[1] // 2
+        out[offset:offset + n_paths] = simulate_chunk(
+            data[:, :n_tickers], data[:, n_tickers:], amounts, horizon, block, n_paths, seed)
+    finally:
+        del data, out
+        shm_in.close()
+        shm_out.close()
+
+
+def project(returns, yields, amounts, horizon: int, n_paths: int, block: int = 12,
+            seed=None, workers: int = None) -> dict:
+    """Projette n_paths trajectoires, réparties sur un pool de processus
+
+    Les matrices de rendements (entrée) et de résultats (sortie) sont en
+    mémoire partagée : rien n'est sérialisé hormis les paramètres des tâches.
+    """
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    yields = np.ascontiguousarray(yields, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+
+    seed_seq = np.random.SeedSequence(seed)
+    path_seeds = seed_seq.spawn(-(-n_paths // SEED_PATHS))
+    chunk = max(SEED_PATHS, CHUNK_PATHS // SEED_PATHS * SEED_PATHS)
+    offsets = list(range(0, n_paths, chunk))
+    sizes = [min(chunk, n_paths - offset) for offset in offsets]
+    seeds = [path_seeds[offset // SEED_PATHS:(offset + size + SEED_PATHS - 1) // SEED_PATHS]
+             for offset, size in zip(offsets, sizes)]
+    workers = max(1, min(workers or MAX_WORKERS, len(sizes)))
+
+    if workers == 1:
+        out = np.vstack([
+            simulate_chunk(returns, yields, amounts, horizon, block, size, s)
+            for size, s in zip(sizes, seeds)
+        ])
+    else:
+        data = np.hstack([returns, yields])
+        shm_in = shared_memory.SharedMemory(create=True, size=data.nbytes)
+        shm_out = shared_memory.SharedMemory(create=True, size=n_paths * 3 * 8)
+        try:
+            np.ndarray(data.shape, dtype=np.float64, buffer=shm_in.buf)[:] = data
+            tasks = [
+                (shm_in.name, data.shape, shm_out.name, (n_paths, 3), offset, size, s, amounts, horizon, block)
+                for offset, size, s in zip(offsets, sizes, seeds)
+            ]
+            list(_get_pool(workers).map(_run_task, tasks))
+            out = np.ndarray((n_paths, 3), dtype=np.float64, buffer=shm_out.buf).copy()
+        finally:
+            shm_in.close()
+            shm_in.unlink()
+            shm_out.close()
+            shm_out.unlink()
+
+    return {
+        "final_value": out[:, 0],
+        "purification": out[:, 1],
+        "max_drawdown": out[:, 2],
+        "seed": seed_seq.entropy,
+    }
+
+
+def percentile_bands(values: np.ndarray, scale: float = 1.0) -> dict:
+    bands = np.percentile(values, PERCENTILES) * scale
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, bands)}
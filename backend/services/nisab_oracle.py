@@ -0,0 +1,206 @@
+"""Oracle du nisab : cours de l'or et de l'argent au gramme, taux de change
+
+Les cours Yahoo sont chargés en arrière-plan par le RefreshScheduler (métaux
+toutes les 10 min, change toutes les heures, un téléchargement groupé
+chacun). L'oracle en garde un instantané avec provenance (source,
+horodatage, âge) : un calcul de zakat ne déclenche jamais d'appel amont ni
+d'attente, il lit l'instantané puis fait de l'arithmétique.
+
+L'instantané est reconstruit dès que l'ordonnanceur publie de nouveaux
+cours (lecture non bloquante, RefreshScheduler.peek). Tant qu'aucun cours
+n'a pu être chargé (démarrage, Yahoo indisponible), les valeurs de secours
+sont servies (source "backup").
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from services.market_data import get_provider
+from services.refresh_scheduler import get_scheduler
+
+# Rafraîchissement en arrière-plan (secondes)
+METALS_REFRESH_SECONDS = 10 * 60
+FX_REFRESH_SECONDS = 60 * 60
+TROY_OUNCE_GRAMS = 31.1035
+NISAB_GOLD_GRAMS = 85
+NISAB_SILVER_GRAMS = 595
+
+# Tickers : XAUEUR=X (Or/Euro), XAGEUR=X (Argent/Euro)
+METAL_TICKERS = {"gold": "XAUEUR=X", "silver": "XAGEUR=X"}
+
+# VALEURS PAR DÉFAUT (Mises à jour janv 2026 selon vos chiffres)
+# Si le scraping échoue, on utilise ces valeurs réelles
+BACKUP_METAL_PRICES = {
+    "gold_gram": 136.0,   # ~136€ le gramme
+    "silver_gram": 2.82,  # ~2.82€ le gramme
+    "source": "backup"    # Indique qu'on est sur les valeurs de secours
+}
+
+# Unités de devise pour 1 EUR (janv 2026), utilisées si Yahoo ne répond pas
+BACKUP_FX_RATES = {
+    "EUR": 1.0, "USD": 1.17, "GBP": 0.87, "CHF": 0.93, "CAD": 1.62,
+    "MAD": 10.75, "DZD": 152.0, "TND": 3.42, "SAR": 4.39, "AED": 4.30, "TRY": 50.3,
+}
+CURRENCIES = tuple(BACKUP_FX_RATES)
+# Un taux live hors de [secours / 3, secours x 3] est considéré incohérent
+FX_SANITY_FACTOR = 3
+
+
+def fetch_metal_prices():
+    """Prix live de l'or et de l'argent en EUR (lève une erreur si l'or est indisponible)"""
+    prices = dict(BACKUP_METAL_PRICES)
+
+    print("🏆 Tentative de connexion Yahoo Finance...")
+    # Un seul téléchargement pour les deux métaux ; Yahoo donne le prix de l'ONCE (Troy Ounce)
+    quotes = get_provider().get_quotes(list(METAL_TICKERS.values()), refresh=True)
+
+    # OR (Gold) - XAU
+    oz_price = quotes[METAL_TICKERS["gold"]]["price"]
+    # On vérifie que la donnée est cohérente (> 50€) sinon on garde le backup
+    if oz_price is not None and oz_price / TROY_OUNCE_GRAMS > 50:
+        prices["gold_gram"] = oz_price / TROY_OUNCE_GRAMS
+        prices["source"] = "live"
+
+    # ARGENT (Silver) - XAG
+    oz_price = quotes[METAL_TICKERS["silver"]]["price"]
+    prices["silver_source"] = "backup"
+    if oz_price is not None and oz_price / TROY_OUNCE_GRAMS > 0.5:
+        prices["silver_gram"] = oz_price / TROY_OUNCE_GRAMS
+        prices["silver_source"] = "live"
+
+    # Sans cours de l'or, on garde la dernière valeur live connue
+    if prices["source"] != "live":
+        raise ValueError("cours de l'or indisponible ou incohérent")
+    prices["fetched_at"] = time.time()
+    return prices
+
+
+def fetch_fx_rates():
+    """Unités de chaque devise pour 1 EUR (EURUSD=X, ...), secours par devise absente"""
+    others = [c for c in CURRENCIES if c != "EUR"]
+    quotes = get_provider().get_quotes([f"EUR{c}=X" for c in others], refresh=True)
+    rates, backup = {"EUR": 1.0}, []
+    for currency in others:
+        price = quotes[f"EUR{currency}=X"]["price"]
+        reference = BACKUP_FX_RATES[currency]
+        if price is not None and reference / FX_SANITY_FACTOR < price < reference * FX_SANITY_FACTOR:
+            rates[currency] = price
+        else:
+            rates[currency] = reference
+            backup.append(currency)
+
+    if len(backup) == len(others):
+        raise ValueError("taux de change indisponibles")
+    return {"rates": rates, "backup": backup, "fetched_at": time.time()}
+
+
+get_scheduler().register("metal_prices", fetch_metal_prices, METALS_REFRESH_SECONDS)
+get_scheduler().register("fx_rates", fetch_fx_rates, FX_REFRESH_SECONDS)
+
+
+def _iso(timestamp) -> str:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+class NisabOracle:
+    """Instantané des cours des métaux (EUR/g) et de la matrice de change"""
+
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler or get_scheduler()
+        self._snapshot = None
+        self._inputs = None
+        self._lock = threading.Lock()
+
+    def _latest(self) -> tuple:
+        """Derniers cours publiés (None si jamais chargés) ; relance un chargement expiré sans l'attendre"""
+        return self.scheduler.peek("metal_prices"), self.scheduler.peek("fx_rates")
+
+    def _build(self, metals, fx) -> dict:
+        for name, value in (("metal_prices", metals), ("fx_rates", fx)):
+            if value is None:
+                print(f"⚠️ Oracle nisab : {name} indisponible, valeurs de secours")
+        rates = fx["rates"] if fx else BACKUP_FX_RATES
+        return {
+            "gold_gram": (metals or BACKUP_METAL_PRICES)["gold_gram"],
+            "silver_gram": (metals or BACKUP_METAL_PRICES)["silver_gram"],
+            "source": metals["source"] if metals else "backup",
+            "silver_source": metals.get("silver_source", "live") if metals else "backup",
+            "fetched_at": metals.get("fetched_at") if metals else None,
+            "currencies": CURRENCIES,
+            # Unités de devise pour 1 EUR, dans l'ordre de CURRENCIES
+            "fx": np.array([rates.get(c, BACKUP_FX_RATES[c]) for c in CURRENCIES]),
+            "fx_source": ("live" if not fx["backup"] else "partial") if fx else "backup",
+            "fx_backup": list(fx["backup"]) if fx else list(CURRENCIES[1:]),
+            "fx_fetched_at": fx.get("fetched_at") if fx else None,
+        }
+
+    def _stale(self, inputs: tuple) -> bool:
+        return self._inputs is None or any(new is not old for new, old in zip(inputs, self._inputs))
+
+    def snapshot(self) -> dict:
+        """Instantané courant (reconstruit si les cours publiés ont changé, jamais bloquant)"""
+        if self._stale(self._latest()):
+            with self._lock:
+                inputs = self._latest()
+                if self._stale(inputs):
+                    self._snapshot, self._inputs = self._build(*inputs), inputs
+        return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._inputs = None
+
+    def currency_index(self, currency: str) -> int:
+        currency = (currency or "EUR").upper()
+        if currency not in CURRENCIES:
+            raise ValueError(f"Devise non prise en charge : {currency} ({', '.join(CURRENCIES)})")
+        return CURRENCIES.index(currency)
+
+    def fx_matrix(self) -> dict:
+        """Taux croisés : rates[i][j] = unités de j pour 1 unité de i"""
+        fx = self.snapshot()["fx"]
+        return {"currencies": list(CURRENCIES), "rates": np.round(fx[None, :] / fx[:, None], 6).tolist()}
+
+    def convert(self, amount: float, source: str, target: str) -> float:
+        fx = self.snapshot()["fx"]
+        return amount * fx[self.currency_index(target)] / fx[self.currency_index(source)]
+
+    def quote(self, currency: str = "EUR") -> dict:
+        """Prix au gramme, seuils du nisab et provenance dans une devise"""
+        snap = self.snapshot()
+        currency = (currency or "EUR").upper()
+        rate = float(snap["fx"][self.currency_index(currency)])
+        gold_gram = snap["gold_gram"] * rate
+        silver_gram = snap["silver_gram"] * rate
+        return {
+            "currency": currency,
+            "gold_price_g": gold_gram,
+            "silver_price_g": silver_gram,
+            "gold_threshold": gold_gram * NISAB_GOLD_GRAMS,
+            "silver_threshold": silver_gram * NISAB_SILVER_GRAMS,
+            "fx_rate": rate,
+            "source": snap["source"],
+            "silver_source": snap["silver_source"],
+            "as_of": _iso(snap["fetched_at"]),
+            "age": round(time.time() - snap["fetched_at"], 1) if snap["fetched_at"] else None,
+            "fx_source": "backup" if currency in snap["fx_backup"] else "live",
+            "fx_as_of": _iso(snap["fx_fetched_at"]),
+        }
+
+
+_oracle = None
+_oracle_lock = threading.Lock()
+
+
+def get_nisab_oracle() -> NisabOracle:
+    """Oracle partagé du processus"""
+    global _oracle
+    if _oracle is None:
+        with _oracle_lock:
+            if _oracle is None:
+                _oracle = NisabOracle()
+    return _oracle
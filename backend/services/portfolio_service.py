@@ -1,83 +1,414 @@
-import yfinance as yf
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import get_provider, TTLCache
+from services.shared_cache import CACHE_URL, make_cache
+from services.compliance_engine import round2
+from services.dividend_calendar import get_dividend_engine, to_ns, trailing_start
+from services.metrics import timed
+
+# Taux de purification des dividendes par type d'actif
+# - stock : règle standard, on purifie ~5% des dividendes perçus
+# - etf_islamic : les ETF Sharia (SPUS, HLAL) font souvent le ménage en interne
+# - sukuk : dette halal, pas d'intérêts illicites => 0 purification
+PURIFICATION_RATES = {'stock': 0.05, 'etf_islamic': 0.0, 'sukuk': 0.0}
+
+# Sessions de valorisation incrémentale : durée de vie et nombre max (cache "memory")
+SESSION_TTL = 30 * 60
+MAX_SESSIONS = 512
+# Liste d'actifs d'une session, gardée plus longtemps : une session expirée
+# donne une valorisation complète plutôt qu'une erreur
+SESSION_ASSETS_TTL = 24 * 3600
+
+
+def content_hash(payload) -> str:
+    """Empreinte stable d'une structure JSON (clés triées)"""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _same_calendar(a, b) -> bool:
+    """Même calendrier, y compris relu depuis le cache partagé (autre objet, même contenu)"""
+    return a is b or (a is not None and b is not None
+                      and a.covered_until == b.covered_until and len(a) == len(b))
+
+
+def _yield(trailing: np.ndarray, current_price: np.ndarray) -> np.ndarray:
+    """Rendement sur 12 mois au cours actuel (0 sans cours)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(current_price > 0, trailing / current_price, 0.0)
+
 
 class PortfolioService:
     """Service de valorisation et purification de portefeuille"""
 
-    def analyze_portfolio(self, assets: list) -> dict:
-        total_value = 0
-        total_purification = 0
-        enriched_assets = []
+    def _parse_positions(self, assets: list) -> tuple:
+        """(lignes valides, index des lignes invalides) : ticker, quantité, prix moyen, type, date d'achat"""
+        rows, invalid = [], []
+        for i, asset in enumerate(assets):
+            try:
+                rows.append((
+                    i,
+                    asset.get('ticker').upper().strip(),
+                    float(asset.get('qty', 0)),
+                    float(asset.get('avg_price', 0)),
+                    asset.get('type', 'stock'), # 'stock', 'etf_islamic', 'sukuk'
+                    # Date d'achat optionnelle : seuls les dividendes perçus depuis comptent
+                    to_ns(asset['since']) if asset.get('since') else None,
+                ))
+            except Exception as e:
+                print(f"⚠️ Erreur sur {asset.get('ticker')}: {e}")
+                invalid.append(i)
+        return rows, invalid
 
+    def _dividend_calendars(self, tickers: list) -> tuple:
+        """Calendriers de dividendes partagés (en parallèle, un par ticker distinct)"""
+        calendars, errors = get_dividend_engine().calendars(tickers)
+        for ticker, error in errors.items():
+            print(f"⚠️ Erreur sur {ticker}: {error}")
+        return calendars, errors
+
+    def _inputs(self, assets: list) -> dict:
+        """Colonnes d'entrée de toutes les positions (NaN / ok=False pour les lignes en erreur)"""
+        rows, _ = self._parse_positions(assets)
+        tickers = list(dict.fromkeys(row[1] for row in rows))
+
+        # Cours : un téléchargement groupé ; calendriers : en parallèle, dédoublonnés
+        quotes = get_provider().get_quotes(tickers)
+        calendars, calendar_errors = self._dividend_calendars(tickers)
+
+        n = len(assets)
+        qty = np.full(n, np.nan)
+        avg_price = np.full(n, np.nan)
+        last = np.full(n, np.nan)
+        types = [None] * n
+        row_tickers = [None] * n
+        row_calendars = [None] * n
+        ok = np.zeros(n, dtype=bool)
+        since = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+        for i, ticker, q, avg, asset_type, bought in rows:
+            # En cas d'erreur, on renverra l'actif tel quel pour ne pas perdre la ligne
+            if ticker in calendar_errors:
+                continue
+            qty[i], avg_price[i], types[i], ok[i] = q, avg, asset_type, True
+            row_tickers[i], row_calendars[i] = ticker, calendars[ticker]
+            price = quotes[ticker]["price"]
+            last[i] = np.nan if price is None else price
+            if bought is not None:
+                since[i] = bought
+
+        today = to_ns(pd.Timestamp.now())
+        trailing, held = self._dividends(row_calendars, since, np.arange(n), today)
+        # Si Yahoo échoue, on garde le prix d'achat pour ne pas casser le tableau
+        current_price = np.where(np.isnan(last), avg_price, last)
+        rate = np.array([PURIFICATION_RATES.get(t, 0.0) for t in types], dtype=float)
+        return {
+            "qty": qty, "avg_price": avg_price, "types": types, "ok": ok, "rate": rate,
+            "tickers": row_tickers, "calendars": row_calendars, "since": since, "day": today,
+            "trailing": trailing, "current_price": current_price,
+            "dividend_yield": _yield(trailing, current_price), "dividends_held": held,
+        }
+
+    @staticmethod
+    def _dividends(row_calendars: list, since: np.ndarray, idx: np.ndarray, today: int) -> tuple:
+        """(dividendes par action sur 12 mois, dont perçus depuis l'achat) des positions idx
+
+        Ex-dates réelles, en une passe ; NaN pour les positions sans calendrier.
+        """
+        engine = get_dividend_engine()
+        unique, position = [], {}
+        ticker_idx = np.zeros(len(idx), dtype=np.int64)
+        for k, i in enumerate(idx.tolist()):
+            calendar = row_calendars[i]
+            if calendar is not None:
+                if id(calendar) not in position:
+                    position[id(calendar)] = len(unique)
+                    unique.append(calendar)
+                ticker_idx[k] = position[id(calendar)]
+        window = trailing_start(today)
+        trailing = engine.window_dividends(unique, ticker_idx, np.full(len(idx), window), today)
+        held = engine.window_dividends(unique, ticker_idx, np.maximum(since[idx], window), today)
+        missing = np.array([row_calendars[i] is None for i in idx.tolist()], dtype=bool)
+        trailing[missing] = np.nan
+        held[missing] = np.nan
+        return trailing, held
+
+    def _valuate(self, inputs: dict, idx: np.ndarray) -> dict:
+        """Valeurs, plus-values et purification des positions idx (calcul par colonnes)"""
+        qty, avg_price = inputs["qty"][idx], inputs["avg_price"][idx]
+        current_price = inputs["current_price"][idx]
+        current_value = current_price * qty
+        cost = avg_price * qty
+        gain = current_value - cost
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain_percent = np.where((avg_price > 0) & (cost != 0), gain / cost * 100, 0.0)
+        # Dividendes réellement perçus (actions détenues à chaque ex-date) x taux de purification
+        dividends = qty * inputs["dividends_held"][idx]
+        purification_amount = dividends * inputs["rate"][idx]
+        return {
+            "current_price": current_price, "current_value": current_value, "gain": gain,
+            "gain_percent": gain_percent, "dividends": dividends, "purification_amount": purification_amount,
+        }
+
+    def _rows(self, assets: list, inputs: dict, idx: np.ndarray, values: dict) -> list:
+        """Lignes de réponse des positions idx (l'actif brut pour les lignes en erreur)"""
+        columns = zip(
+            idx.tolist(),
+            round2(values["current_price"]).tolist(), round2(values["current_value"]).tolist(),
+            round2(values["gain"]).tolist(), round2(values["gain_percent"]).tolist(),
+            round2(inputs["dividend_yield"][idx] * 100).tolist(),
+            round2(values["dividends"]).tolist(),
+            round2(values["purification_amount"]).tolist(),
+        )
+        rows = []
+        for i, price, value, g, g_pct, dy, divs, purif in columns:
+            if not inputs["ok"][i]:
+                rows.append(assets[i])
+                continue
+            rows.append({
+                **assets[i], # On garde les infos de base
+                "current_price": price,
+                "current_value": value,
+                "gain": g,
+                "gain_percent": g_pct,
+                "dividend_yield_percent": dy,
+                "dividends_received": divs,
+                "purification_amount": purif,
+                "purification_note": "5% des dividendes" if inputs["types"][i] == 'stock' else "Exonéré (Déjà purifié/Halal)"
+            })
+        return rows
+
+    @timed("portfolio.analyze")
+    def analyze_portfolio(self, assets: list) -> dict:
         print(f"💼 Analyse de {len(assets)} actifs...")
+        inputs = self._inputs(assets)
+        idx = np.arange(len(assets))
+        values = self._valuate(inputs, idx)
+        ok = inputs["ok"]
 
-        for asset in assets:
-            ticker = asset.get('ticker').upper().strip()
-            qty = float(asset.get('qty', 0))
-            asset_type = asset.get('type', 'stock') # 'stock', 'etf_islamic', 'sukuk'
-            
-            try:
-                # Récupération données Yahoo
-                stock = yf.Ticker(ticker)
-                
-                # Prix actuel (avec fallback)
-                history = stock.history(period="1d")
-                if not history.empty:
-                    current_price = history['Close'].iloc[-1]
-                else:
-                    # Si Yahoo échoue, on garde le prix d'achat pour ne pas casser le tableau
-                    current_price = float(asset.get('avg_price', 0))
-
-                # Calcul Valeur
-                current_value = current_price * qty
-                avg_price = float(asset.get('avg_price', 0))
-                gain = current_value - (avg_price * qty)
-                gain_percent = (gain / (avg_price * qty) * 100) if avg_price > 0 else 0
-
-                # --- LOGIQUE DE PURIFICATION ---
-                dividend_yield = stock.info.get('dividendYield', 0) or 0
-                estimated_annual_dividends = current_value * dividend_yield
-                
-                purification_amount = 0
-                purification_rate = 0
-
-                if asset_type == 'stock':
-                    # Règle standard : On purifie ~5% des dividendes perçus
-                    purification_rate = 0.05 
-                    purification_amount = estimated_annual_dividends * purification_rate
-                    
-                elif asset_type == 'etf_islamic':
-                    # Les ETF Sharia (SPUS, HLAL) font souvent le ménage en interne.
-                    # Par sécurité, certains purifient encore une infime partie, mais souvent 0.
-                    purification_rate = 0.0
-                    purification_amount = 0
-                    
-                elif asset_type == 'sukuk':
-                    # Sukuk = Dette Halal = Pas d'intérêts illicites = 0 purification
-                    purification_rate = 0.0
-                    purification_amount = 0
-
-                # Ajout à la liste finale
-                enriched_assets.append({
-                    **asset, # On garde les infos de base
-                    "current_price": round(current_price, 2),
-                    "current_value": round(current_value, 2),
-                    "gain": round(gain, 2),
-                    "gain_percent": round(gain_percent, 2),
-                    "dividend_yield_percent": round(dividend_yield * 100, 2),
-                    "purification_amount": round(purification_amount, 2),
-                    "purification_note": "5% des dividendes" if asset_type == 'stock' else "Exonéré (Déjà purifié/Halal)"
-                })
-
-                total_value += current_value
-                total_purification += purification_amount
+        return {
+            "total_value": round(sum(values["current_value"][ok].tolist()), 2),
+            "total_purification_annual": round(sum(values["purification_amount"][ok].tolist()), 2),
+            "assets": self._rows(assets, inputs, idx, values)
+        }
 
-            except Exception as e:
-                print(f"⚠️ Erreur sur {ticker}: {e}")
-                # En cas d'erreur, on renvoie l'actif tel quel pour ne pas perdre la ligne
-                enriched_assets.append(asset)
 
+class PortfolioSession:
+    """Dernière valorisation d'un portefeuille (colonnes non arrondies et lignes formatées)"""
+
+    def __init__(self, assets: list, fingerprints: list, inputs: dict, values: dict, rows: list,
+                 total_value: float, total_purification: float):
+        self.assets = assets
+        self.fingerprints = fingerprints
+        self.inputs = inputs
+        self.values = values
+        self.rows = rows
+        self.total_value = total_value
+        self.total_purification = total_purification
+
+
+def _same(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+
+class PortfolioSessionService(PortfolioService):
+    """Revalorisation incrémentale : seules les positions modifiées sont recalculées
+
+    Une session est identifiée par l'empreinte du contenu du portefeuille.
+    Le client renvoie l'identifiant de sa dernière session avec la nouvelle
+    liste d'actifs (ou sans liste pour un simple rafraîchissement des cours) ;
+    la réponse ne contient que les lignes dont les entrées, le cours ou les
+    dividendes ont changé, et les totaux mis à jour par différence.
+
+    Les sessions sont dans le cache partagé (ATHAR_CACHE_URL) : n'importe quel
+    worker poursuit la session d'un autre. Une session inconnue ou expirée
+    donne une valorisation complète (full = true).
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS, cache=None):
+        self.ttl = ttl
+        if cache is None:
+            cache = TTLCache(max_sessions) if CACHE_URL in ("", "memory") else make_cache()
+        self.sessions = cache
+
+    def _store(self, session: PortfolioSession) -> str:
+        # Empreinte du portefeuille et des données de marché utilisées : deux
+        # clients au même état partagent la session, sans se voler de deltas
+        market = hashlib.blake2b(digest_size=8)
+        for key in ("ok", "current_price", "dividend_yield", "dividends_held"):
+            market.update(session.inputs[key].tobytes())
+        assets_hash = content_hash(session.assets)
+        session_id = f"{assets_hash}-{market.hexdigest()}"
+        self.sessions.set(("portfolio_session", session_id), session, self.ttl)
+        self.sessions.set(("portfolio_assets", assets_hash), session.assets, SESSION_ASSETS_TTL)
+        return session_id
+
+    def _full(self, assets: list) -> tuple:
+        inputs = self._inputs(assets)
+        idx = np.arange(len(assets))
+        values = self._valuate(inputs, idx)
+        rows = self._rows(assets, inputs, idx, values)
+        ok = inputs["ok"]
+        session = PortfolioSession(
+            assets, [content_hash(a) for a in assets], inputs, values, rows,
+            sum(values["current_value"][ok].tolist()), sum(values["purification_amount"][ok].tolist()),
+        )
+        return session, idx
+
+    @staticmethod
+    def _match(previous: PortfolioSession, fingerprints: list) -> np.ndarray:
+        """Ancienne position de chaque ligne de même contenu (ticker et champs), -1 sinon
+
+        Appariement par contenu et non par rang : une insertion en milieu de
+        liste ne marque pas toutes les lignes suivantes comme modifiées.
+        """
+        available = {}
+        for j, fingerprint in enumerate(previous.fingerprints):
+            available.setdefault(fingerprint, []).append(j)
+        source = np.full(len(fingerprints), -1, dtype=np.int64)
+        for i, fingerprint in enumerate(fingerprints):
+            positions = available.get(fingerprint)
+            if positions:
+                source[i] = positions.pop(0)
+        return source
+
+    def _carry_inputs(self, previous: PortfolioSession, assets: list, source: np.ndarray) -> dict:
+        """Entrées des lignes connues reprises de la session, calculées pour les seules nouvelles lignes"""
+        old = previous.inputs
+        kept = np.maximum(source, 0)
+        inputs = {
+            key: ([value[j] for j in kept.tolist()] if isinstance(value, list) else value[kept])
+            for key, value in old.items() if key != "day"
+        }
+        inputs["day"] = old["day"]
+        fresh = np.flatnonzero(source < 0)
+        if len(fresh):
+            added = self._inputs([assets[i] for i in fresh.tolist()])
+            for key, value in inputs.items():
+                if isinstance(value, list):
+                    for k, i in enumerate(fresh.tolist()):
+                        value[i] = added[key][k]
+                elif key != "day":
+                    value[fresh] = added[key]
+        return inputs
+
+    def _refresh_known(self, inputs: dict, known: np.ndarray):
+        """Cours (un téléchargement groupé) et dividendes des lignes reprises de la session"""
+        if not len(known):
+            return
+        tickers = list(dict.fromkeys(inputs["tickers"][i] for i in known.tolist()))
+        quotes = get_provider().get_quotes(tickers)
+        # Calendriers en cache : ne relisent la fin d'historique qu'à échéance
+        calendars, _ = self._dividend_calendars(tickers)
+
+        today = to_ns(pd.Timestamp.now())
+        row_calendars = inputs["calendars"]
+        stale = []
+        for i in known.tolist():
+            calendar = calendars.get(inputs["tickers"][i], row_calendars[i])
+            if not _same_calendar(calendar, row_calendars[i]) or today != inputs["day"]:
+                row_calendars[i] = calendar
+                stale.append(i)
+        if stale:
+            stale = np.array(stale, dtype=np.int64)
+            inputs["trailing"][stale], inputs["dividends_held"][stale] = self._dividends(
+                row_calendars, inputs["since"], stale, today)
+        inputs["day"] = today
+
+        last = np.array([quotes[inputs["tickers"][i]]["price"] for i in known.tolist()], dtype=float)
+        inputs["current_price"][known] = np.where(np.isnan(last), inputs["avg_price"][known], last)
+        inputs["dividend_yield"][known] = _yield(inputs["trailing"][known], inputs["current_price"][known])
+
+    def _incremental(self, previous: PortfolioSession, assets: list) -> tuple:
+        fingerprints = [content_hash(a) for a in assets]
+        n, n_old = len(assets), len(previous.assets)
+        if not n_old:
+            session, idx = self._full(assets)
+            return session, idx, np.full(n, -1, dtype=np.int64)
+        source = self._match(previous, fingerprints)
+        matched = source >= 0
+        inputs = self._carry_inputs(previous, assets, source)
+        self._refresh_known(inputs, np.flatnonzero(matched & inputs["ok"]))
+
+        # Position modifiée : nouvelle ligne, ou cours, dividendes ou statut différents
+        old = previous.inputs
+        kept = np.maximum(source, 0)
+        changed = ~(
+            matched
+            & (inputs["ok"] == old["ok"][kept])
+            & _same(inputs["current_price"], old["current_price"][kept])
+            & _same(inputs["dividend_yield"], old["dividend_yield"][kept])
+            & _same(inputs["dividends_held"], old["dividends_held"][kept])
+        )
+        idx = np.flatnonzero(changed)
+        values = self._valuate(inputs, idx)
+        new_rows = self._rows(assets, inputs, idx, values)
+
+        # Colonnes complètes : anciennes valeurs (à leur ancienne position), remplacées sur les positions modifiées
+        merged = {}
+        for key, column in values.items():
+            full = previous.values[key][kept]
+            full[idx] = column
+            merged[key] = full
+        rows = [previous.rows[j] if j >= 0 else None for j in source.tolist()]
+        for i, row in zip(idx.tolist(), new_rows):
+            rows[i] = row
+
+        # Totaux par différence : retire la contribution des anciennes lignes non conservées telles quelles
+        def contribution(session_values, session_ok, positions):
+            positions = positions[session_ok[positions]]
+            return (sum(session_values["current_value"][positions].tolist()),
+                    sum(session_values["purification_amount"][positions].tolist()))
+
+        dropped = np.setdiff1d(np.arange(n_old), source[~changed])
+        removed_value, removed_purif = contribution(previous.values, old["ok"], dropped)
+        added_value, added_purif = contribution(merged, inputs["ok"], idx)
+
+        session = PortfolioSession(
+            assets, fingerprints, inputs, merged, rows,
+            previous.total_value - removed_value + added_value,
+            previous.total_purification - removed_purif + added_purif,
+        )
+        return session, idx, source
+
+    def analyze_delta(self, assets: list = None, session_id: str = None) -> dict:
+        """Valorisation complète (sans session connue) ou différentielle
+
+        Renvoie session_id, les totaux, `changed` (lignes recalculées avec leur
+        index), `moved` (lignes inchangées déplacées : nouvel index et ancien
+        index `from`), `removed` (anciens index absents de la nouvelle liste)
+        et `full`.
+        """
+        previous = self.sessions.get(("portfolio_session", session_id), None) if session_id else None
+        if assets is None:
+            if previous is not None:
+                assets = previous.assets
+            elif session_id:
+                # Session expirée : liste d'actifs retrouvée par son empreinte (préfixe de l'id)
+                assets = self.sessions.get(("portfolio_assets", session_id.split("-")[0]), None)
+            if assets is None:
+                raise KeyError("Session inconnue ou expirée")
+
+        if previous is None:
+            session, idx = self._full(assets)
+            moved, removed = [], []
+        else:
+            session, idx, source = self._incremental(previous, assets)
+            changed = set(idx.tolist())
+            moved = [{"index": i, "from": j} for i, j in enumerate(source.tolist())
+                     if j >= 0 and j != i and i not in changed]
+            removed = np.setdiff1d(np.arange(len(previous.assets)), source).tolist()
+
+        new_id = self._store(session)
         return {
-            "total_value": round(total_value, 2),
-            "total_purification_annual": round(total_purification, 2),
-            "assets": enriched_assets
-        }
\ No newline at end of file
+            "session_id": new_id,
+            "full": previous is None,
+            "total_value": round(session.total_value, 2),
+            "total_purification_annual": round(session.total_purification, 2),
+            "changed": [{"index": i, **session.rows[i]} for i in idx.tolist()],
+            "moved": moved,
+            "removed": removed,
+        }
@@ -0,0 +1,90 @@
+"""Profilage par échantillonnage des requêtes lentes (flamegraph)
+
+Activé par ATHAR_PROFILE_THRESHOLD_MS : la pile du thread de chaque requête
+est relevée toutes les ATHAR_PROFILE_INTERVAL_MS ; si la requête dépasse le
+seuil, ses piles sont écrites au format "folded" (une ligne par pile, racine
+à gauche) dans ATHAR_PROFILE_DIR, lisible par flamegraph.pl, inferno ou
+speedscope :
+
+    flamegraph.pl data/profiles/<fichier>.folded > requete.svg
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+_threshold = os.environ.get("ATHAR_PROFILE_THRESHOLD_MS")
+PROFILE_THRESHOLD_MS = float(_threshold) if _threshold else None
+PROFILE_INTERVAL_MS = float(os.environ.get("ATHAR_PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.environ.get("ATHAR_PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+
+
+def fold(frame) -> str:
+    """Pile d'un frame au format folded : racine;...;feuille"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Un thread unique échantillonne les piles de tous les threads suivis"""
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._targets = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, thread_id: int):
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="athar-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, stacks in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[fold(frame)] += 1
+            time.sleep(self.interval)
+
+
+def dump_folded(stacks: Counter, label: str, duration_ms: float, directory: str = PROFILE_DIR) -> str:
+    """Écrit les piles échantillonnées ; renvoie le chemin du fichier"""
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", label).strip("_") or "root"
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{duration_ms:.0f}ms.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> StackSampler:
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = StackSampler()
+    return _sampler
@@ -0,0 +1,232 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.concurrency import DEFAULT_TIMEOUT, FetchTimeout
+from services.upstream import REFRESH, upstream_priority
+
+# Écart aléatoire relatif appliqué aux intervalles (évite les rafraîchissements synchronisés)
+DEFAULT_JITTER = 0.1
+# Délai avant nouvel essai après un échec (borné par l'intervalle du dataset)
+RETRY_SECONDS = 30
+REFRESH_WORKERS = int(os.environ.get("ATHAR_REFRESH_WORKERS", 4))
+# Sans get() / peek() depuis ce délai (secondes), un dataset n'est plus rechargé en fond
+IDLE_SECONDS = float(os.environ.get("ATHAR_REFRESH_IDLE", 1800))
+# Datasets partagés : un worker sans le bail relit la publication à ce rythme (secondes)
+FOLLOW_SECONDS = 5
+# Marge du bail au-delà de l'intervalle (un rechargement un peu tardif le garde)
+LEASE_MARGIN = 10
+# Durée de vie d'une publication partagée, en intervalles (reprise si le détenteur disparaît)
+SHARED_TTL_INTERVALS = 4
+
+_MISSING = object()
+
+
+class _Dataset:
+    def __init__(self, name: str, loader, interval: float, jitter: float, idle: float = None,
+                 shared: bool = False, on_update=None):
+        self.name = name
+        self.loader = loader
+        self.interval = interval
+        self.jitter = jitter
+        self.idle = idle
+        self.shared = shared
+        self.on_update = on_update
+        self.value = _MISSING
+        self.updated_at = None
+        self.next_refresh = 0.0
+        self.refreshing = False
+        self.error = None
+        self.leader = False
+        self.accessed = time.monotonic()
+        self.loaded = threading.Event()
+
+    def is_idle(self, now: float) -> bool:
+        return self.idle is not None and self.value is not _MISSING and now - self.accessed > self.idle
+
+
+class RefreshScheduler:
+    """Datasets "chauds" servis depuis la dernière valeur connue (stale-while-revalidate)
+
+    Chaque dataset est rechargé en arrière-plan à intervalle régulier (avec
+    jitter). Un seul rechargement à la fois par dataset, quel que soit le
+    nombre d'appelants ; un échec conserve la dernière bonne valeur. Seul le
+    tout premier chargement est synchrone.
+
+    `idle` (défaut IDLE_SECONDS, None : jamais) : sans get() / peek() depuis ce
+    délai, le thread de fond ne recharge plus le dataset (le prochain appel
+    sert la dernière valeur et relance).
+    `shared` (défaut) : un seul worker (détenteur du bail dans le cache
+    partagé) exécute le loader et publie la valeur ; les autres relisent la
+    publication. Avec ATHAR_CACHE_URL=memory, chaque processus recharge seul.
+    `on_update(valeur, horodatage)` est appelé à chaque nouvelle valeur.
+    """
+
+    def __init__(self, workers: int = REFRESH_WORKERS, cache=None):
+        self._cache = cache
+        self._datasets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        # Pool dédié : les loaders utilisent eux-mêmes le pool d'E/S partagé
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="athar-refresh")
+
+    @property
+    def cache(self):
+        """Cache partagé des datasets `shared` (ATHAR_CACHE_URL, créé au premier besoin)"""
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    # Import différé : shared_cache dépend de market_data
+                    from services.shared_cache import make_cache
+                    self._cache = make_cache()
+        return self._cache
+
+    def register(self, name: str, loader, interval: float, jitter: float = DEFAULT_JITTER,
+                 idle: float = IDLE_SECONDS, shared: bool = True, on_update=None):
+        """Déclare un dataset (sans le charger) ; un nom déjà enregistré est ignoré"""
+        with self._lock:
+            if name not in self._datasets:
+                self._datasets[name] = _Dataset(name, loader, interval, jitter, idle, shared, on_update)
+        self._wake.set()
+
+    def get(self, name: str, timeout: float = DEFAULT_TIMEOUT):
+        """Dernière valeur connue ; déclenche un rechargement en arrière-plan si elle a expiré"""
+        ds = self._datasets[name]
+        ds.accessed = time.monotonic()
+        if ds.value is _MISSING:
+            self._trigger(ds)
+            if not ds.loaded.wait(timeout):
+                raise FetchTimeout(f"{name} : premier chargement trop long")
+            if ds.value is _MISSING:
+                raise ds.error or RuntimeError(f"{name} indisponible")
+        elif time.monotonic() >= ds.next_refresh:
+            self._trigger(ds)
+        return ds.value
+
+    def peek(self, name: str, default=None):
+        """Dernière valeur connue sans jamais attendre (default si aucune) ; relance le chargement s'il a expiré"""
+        ds = self._datasets[name]
+        ds.accessed = time.monotonic()
+        if ds.value is _MISSING or time.monotonic() >= ds.next_refresh:
+            self._trigger(ds)
+        return default if ds.value is _MISSING else ds.value
+
+    def refresh(self, name: str) -> bool:
+        """Force un rechargement (ignoré si un rechargement est déjà en cours)"""
+        return self._trigger(self._datasets[name])
+
+    def _trigger(self, ds: _Dataset) -> bool:
+        with self._lock:
+            if ds.refreshing:
+                return False
+            ds.refreshing = True
+            if ds.value is _MISSING:
+                ds.loaded.clear()
+        try:
+            self._executor.submit(self._refresh, ds)
+        except RuntimeError:
+            # Arrêt de l'interpréteur : le pool n'accepte plus de tâches
+            with self._lock:
+                ds.refreshing = False
+            return False
+        return True
+
+    def _refresh(self, ds: _Dataset):
+        delay = ds.interval
+        try:
+            ds.leader = not ds.shared or self.cache.acquire(
+                f"refresh:{ds.name}", ds.interval * (1 + ds.jitter) + LEASE_MARGIN)
+            if not ds.leader:
+                # Un autre worker recharge : on reprend sa dernière publication
+                delay = min(ds.interval, FOLLOW_SECONDS)
+                published = self.cache.peek(("refresh", ds.name), None)
+                if published is not None:
+                    if ds.updated_at is None or published[0] > ds.updated_at:
+                        self._publish_local(ds, published[1], published[0])
+                    return
+                if ds.value is not _MISSING and time.time() - ds.updated_at < ds.interval * SHARED_TTL_INTERVALS:
+                    return
+                # Rien de publié (premier chargement, valeur trop grosse pour le cache) : chargement local
+
+            # Les rafraîchissements passent après les requêtes interactives
+            with upstream_priority(REFRESH):
+                value = ds.loader()
+            updated_at = time.time()
+            if ds.shared and ds.leader:
+                self.cache.set(("refresh", ds.name), (updated_at, value), ds.interval * SHARED_TTL_INTERVALS)
+            self._publish_local(ds, value, updated_at)
+        except Exception as e:
+            print(f"Erreur rafraîchissement {ds.name}: {e}")
+            ds.error = e
+            delay = min(ds.interval, RETRY_SECONDS)
+        finally:
+            ds.next_refresh = time.monotonic() + delay * (1 + random.uniform(-ds.jitter, ds.jitter))
+            with self._lock:
+                ds.refreshing = False
+            ds.loaded.set()
+            self._wake.set()
+
+    def _publish_local(self, ds: _Dataset, value, updated_at: float):
+        ds.value, ds.updated_at, ds.error = value, updated_at, None
+        if ds.on_update:
+            ds.on_update(value, updated_at)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.monotonic()
+            next_due = now + 60
+            for ds in list(self._datasets.values()):
+                if ds.is_idle(now):
+                    continue
+                if ds.next_refresh <= now:
+                    self._trigger(ds)
+                else:
+                    next_due = min(next_due, ds.next_refresh)
+            self._wake.wait(max(0.05, next_due - time.monotonic()))
+
+    def start(self):
+        """Thread de fond : recharge chaque dataset à échéance tant qu'il est demandé"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="athar-scheduler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def status(self) -> dict:
+        now = time.time()
+        mono = time.monotonic()
+        return {
+            ds.name: {
+                "interval": ds.interval,
+                "age": round(now - ds.updated_at, 1) if ds.updated_at else None,
+                "refreshing": ds.refreshing,
+                "idle": ds.is_idle(mono),
+                "leader": ds.leader,
+                "error": str(ds.error) if ds.error else None,
+            }
+            for ds in list(self._datasets.values())
+        }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RefreshScheduler:
+    """Ordonnanceur partagé du processus"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RefreshScheduler()
+    return _scheduler
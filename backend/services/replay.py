@@ -0,0 +1,214 @@
+"""Enregistrement et rejeu des réponses Yahoo (benchmarks, tests hors-ligne)
+
+RecordingBackend enveloppe un backend réel et capture info, history,
+funds_data (holdings) et news au format de FixtureBackend ; ReplayBackend
+les rejoue sans réseau, avec une latence simulée optionnelle.
+synthetic_fixtures() fournit un jeu déterministe quand aucun
+enregistrement n'est disponible.
+
+Enregistrement (depuis backend/, réseau requis) :
+    python -m services.replay AAPL,MSFT,SPUS [fichier]
+"""
+import os
+import pickle
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.market_data import FixtureBackend, MarketDataProvider, params_key
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+FIXTURES_PATH = os.environ.get("ATHAR_FIXTURES", os.path.join(DATA_DIR, "fixtures", "yahoo.pkl"))
+
+# Historiques capturés par symbole à l'enregistrement (paramètres des routes)
+RECORD_HISTORY = [
+    {"period": "2d"},
+    {"period": "3mo"},
+    {"period": "1y", "interval": "1d", "auto_adjust": True},
+    {"period": "max", "interval": "1d", "auto_adjust": True},
+    {"period": "max", "interval": "1d", "auto_adjust": False},
+]
+
+# Univers par défaut : actions, ETF islamiques, métaux, crypto et indices des routes
+DEFAULT_SYMBOLS = [
+    "AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "TSLA", "JNJ", "PG", "XOM", "JPM",
+    "SPUS", "HLAL", "ISDW.L", "SGLD.L", "SSLV.L", "XAUEUR=X", "XAGEUR=X",
+    "GC=F", "SI=F", "BTC-USD", "ETH-USD", "^GSPC", "EURUSD=X", "EURGBP=X", "EURMAD=X",
+]
+ETFS = {"SPUS", "HLAL", "ISDW.L", "SGLD.L", "SSLV.L"}
+# Niveaux de prix réalistes là où les routes les vérifient (once d'or / d'argent en EUR, change)
+SYNTHETIC_PRICES = {"XAUEUR=X": 4000.0, "XAGEUR=X": 85.0, "GC=F": 4300.0, "SI=F": 90.0, "BTC-USD": 90000.0,
+                    "EURUSD=X": 1.17, "EURGBP=X": 0.87, "EURMAD=X": 10.75}
+
+
+class RecordingBackend:
+    """Transmet les appels au backend réel et garde chaque réponse"""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.fixtures = {}
+        self._lock = threading.Lock()
+
+    def _record(self, ticker: str, kind: str, value, key=None):
+        with self._lock:
+            entry = self.fixtures.setdefault(ticker, {})
+            if kind != "history":
+                entry[kind] = value
+                return
+            history = entry.setdefault("history", {})
+            history[key] = value
+            # Historique par défaut du rejeu (paramètres non enregistrés) : le plus long
+            if value is not None and len(value) >= len(history.get("default", ())):
+                history["default"] = value
+
+    def fetch_info(self, ticker: str) -> dict:
+        info = self.inner.fetch_info(ticker)
+        self._record(ticker, "info", info)
+        return info
+
+    def fetch_history(self, ticker: str, **params):
+        history = self.inner.fetch_history(ticker, **params)
+        self._record(ticker, "history", history, params_key(params))
+        return history
+
+    def fetch_quotes(self, tickers: list) -> dict:
+        # Le rejeu reconstitue les cours depuis l'historique par défaut
+        return self.inner.fetch_quotes(tickers)
+
+    def fetch_holdings(self, ticker: str):
+        holdings = self.inner.fetch_holdings(ticker)
+        self._record(ticker, "holdings", holdings)
+        return holdings
+
+    def fetch_news(self, ticker: str) -> list:
+        news = self.inner.fetch_news(ticker)
+        self._record(ticker, "news", news)
+        return news
+
+
+class ReplayBackend(FixtureBackend):
+    """FixtureBackend avec latence simulée par appel (0 : code applicatif seul)"""
+
+    def __init__(self, fixtures: dict, latency: float = 0.0):
+        super().__init__(fixtures)
+        self.latency = latency
+
+    def _lookup(self, ticker: str, kind: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return super()._lookup(ticker, kind)
+
+    def fetch_quotes(self, tickers: list) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        return super().fetch_quotes(tickers)
+
+
+def save_fixtures(fixtures: dict, path: str = FIXTURES_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(fixtures, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_fixtures(path: str = FIXTURES_PATH) -> dict:
+    """Fixtures enregistrées (fichier local de confiance : pickle)"""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def record(symbols: list, path: str = FIXTURES_PATH, backend=None) -> dict:
+    """Capture les réponses Yahoo nécessaires aux routes pour chaque symbole"""
+    if backend is None:
+        from services.market_data import YahooBackend
+        backend = YahooBackend()
+    recorder = RecordingBackend(backend)
+    provider = MarketDataProvider(recorder)
+    for symbol in symbols:
+        steps = [("info", lambda: provider.get_info(symbol)), ("news", lambda: provider.get_news(symbol))]
+        steps += [("history", lambda p=p: provider.get_history(symbol, **p)) for p in RECORD_HISTORY]
+        if symbol in ETFS:
+            steps.append(("holdings", lambda: provider.get_holdings(symbol)))
+        for kind, step in steps:
+            try:
+                step()
+            except Exception as e:
+                print(f"Erreur enregistrement {symbol} ({kind}): {e}")
+        print(f"🎞️ {symbol} enregistré")
+    save_fixtures(recorder.fixtures, path)
+    return recorder.fixtures
+
+
+def _synthetic_history(rng, years: int, dividend: float, last_price: float = None) -> pd.DataFrame:
+    end = pd.Timestamp("2025-12-31", tz="America/New_York")
+    index = pd.bdate_range(end=end, periods=years * 252, tz="America/New_York")
+    close = rng.uniform(20, 400) * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(index))))
+    if last_price:
+        close *= last_price / close[-1]
+    dividends = np.zeros(len(index))
+    if dividend:
+        dividends[::63] = close[::63] * dividend / 4
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.003, len(index))),
+        "High": close * 1.01, "Low": close * 0.99, "Close": close,
+        "Volume": rng.integers(1e5, 1e7, len(index)).astype(float),
+        "Dividends": dividends, "Stock Splits": 0.0,
+    }, index=index)
+
+
+def synthetic_fixtures(symbols: list = None, years: int = 10, seed: int = 21) -> dict:
+    """Jeu de données déterministe couvrant toutes les routes (aucun réseau)"""
+    symbols = symbols or DEFAULT_SYMBOLS
+    rng = np.random.default_rng(seed)
+    stocks = [s for s in symbols if s not in ETFS]
+    sectors = ["Technology", "Healthcare", "Energy", "Consumer Defensive", "Financial Services"]
+    fixtures = {}
+    for i, symbol in enumerate(symbols):
+        dividend = float(rng.uniform(0, 0.04))
+        history = _synthetic_history(rng, years, dividend, SYNTHETIC_PRICES.get(symbol))
+        price = float(history["Close"].iloc[-1])
+        is_etf = symbol in ETFS
+        info = {
+            "quoteType": "ETF" if is_etf else ("CRYPTOCURRENCY" if symbol.endswith("-USD") else "EQUITY"),
+            "longName": f"{symbol} Holdings", "shortName": symbol, "sector": sectors[i % len(sectors)],
+            "industry": "Software" if i % 5 == 0 else "Diversified",
+            "longBusinessSummary": f"{symbol} designs and sells products worldwide.",
+            "marketCap": float(rng.uniform(1e9, 3e12)), "totalDebt": float(rng.uniform(0, 3e11)),
+            "totalCash": float(rng.uniform(1e8, 1e11)), "totalRevenue": float(rng.uniform(1e9, 4e11)),
+            "currentPrice": price, "regularMarketPrice": price,
+            "regularMarketPreviousClose": float(history["Close"].iloc[-2]),
+            "regularMarketChangePercent": float(rng.normal(0, 1.5)),
+            "fiftyTwoWeekHigh": float(history["Close"].iloc[-252:].max()),
+            "fiftyTwoWeekLow": float(history["Close"].iloc[-252:].min()),
+            "dividendYield": dividend, "trailingPE": float(rng.uniform(8, 60)),
+            "returnOnEquity": float(rng.uniform(-0.1, 0.5)), "profitMargins": float(rng.uniform(0, 0.4)),
+            "currency": "USD",
+        }
+        entry = {"info": info, "history": history}
+        if is_etf:
+            info["category"] = "Islamic Equity"
+            info["sectorWeightings"] = [{"technology": 0.4}, {"healthcare": 0.3}, {"energy": 0.3}]
+            members = list(rng.choice(stocks, size=min(8, len(stocks)), replace=False))
+            weights = rng.dirichlet(np.ones(len(members))) * 0.9
+            entry["holdings"] = pd.DataFrame(
+                {"Name": [f"{m} Holdings" for m in members], "Holding Percent": weights},
+                index=pd.Index(members, name="Symbol"))
+        entry["news"] = [
+            {"title": f"{symbol} : actualité {k}", "publisher": "Athar Wire",
+             "link": f"https://example.com/{symbol}/{k}", "providerPublishTime": 1767000000 - k * 3600 - i * 60,
+             "summary": "Résumé."}
+            for k in range(10)
+        ]
+        fixtures[symbol] = entry
+    return fixtures
+
+
+if __name__ == "__main__":
+    wanted = sys.argv[1].split(",") if len(sys.argv) > 1 else DEFAULT_SYMBOLS
+    target = sys.argv[2] if len(sys.argv) > 2 else FIXTURES_PATH
+    recorded = record([s.strip().upper() for s in wanted if s.strip()], target)
+    print(f"✅ {len(recorded)} symboles enregistrés dans {target}")
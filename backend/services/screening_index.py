@@ -0,0 +1,261 @@
+"""Index de screening précalculé (SQLite)
+
+Un job batch passe un univers de symboles au crible de get_company_profiles
+et stocke les profils dans une table indexée ; /api/screening/query filtre
+et trie cette table sans jamais appeler Yahoo.
+
+Construction (depuis backend/) :
+    python -m services.screening_index [fichier_univers] [chemin_index]
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from services.screening_service import HalalScreeningService
+from services.upstream import BATCH, upstream_priority
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+INDEX_PATH = os.environ.get("ATHAR_SCREENING_INDEX", os.path.join(DATA_DIR, "screening_index.sqlite"))
+# Fichier texte : un symbole par ligne (ou séparés par des virgules), "#" pour les commentaires
+UNIVERSE_PATH = os.environ.get("ATHAR_UNIVERSE", os.path.join(DATA_DIR, "universe.txt"))
+
+# Symboles analysés puis écrits par transaction pendant la construction
+BUILD_CHUNK = 200
+# Délai global du chargement d'un lot : passe en priorité BATCH dans le budget Yahoo
+BUILD_CHUNK_TIMEOUT = 600
+MAX_PAGE_SIZE = 200
+DEFAULT_PAGE_SIZE = 50
+
+# Colonnes filtrables par intervalle (paramètres min_<nom> / max_<nom>) et triables
+RANGE_FILTERS = {
+    "score": "sharia_score",
+    "debt": "debt_ratio",
+    "cash": "cash_ratio",
+    "rsi": "rsi",
+    "rating": "rating",
+    "position_52w": "position_52w",
+    "price": "current_price",
+}
+SORT_COLUMNS = {
+    "ticker", "name", "sector", "sharia_score", "debt_ratio", "cash_ratio",
+    "rsi", "rating", "position_52w", "current_price",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    ticker TEXT PRIMARY KEY,
+    name TEXT,
+    sector TEXT,
+    type TEXT,
+    is_halal INTEGER,
+    sharia_score INTEGER,
+    debt_ratio REAL,
+    cash_ratio REAL,
+    rsi REAL,
+    position_52w REAL,
+    current_price REAL,
+    rating INTEGER,
+    reason TEXT,
+    profile TEXT,
+    screened_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_sector ON profiles (sector, sharia_score);
+CREATE INDEX IF NOT EXISTS idx_profiles_score ON profiles (sharia_score);
+CREATE INDEX IF NOT EXISTS idx_profiles_debt ON profiles (debt_ratio);
+CREATE INDEX IF NOT EXISTS idx_profiles_cash ON profiles (cash_ratio);
+CREATE INDEX IF NOT EXISTS idx_profiles_rsi ON profiles (rsi);
+CREATE INDEX IF NOT EXISTS idx_profiles_rating ON profiles (rating);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_COLUMNS = (
+    "ticker", "name", "sector", "type", "is_halal", "sharia_score", "debt_ratio", "cash_ratio",
+    "rsi", "position_52w", "current_price", "rating", "reason", "profile", "screened_at",
+)
+
+
+def load_universe(path: str = UNIVERSE_PATH) -> list:
+    """Symboles uniques (en majuscules) d'un fichier d'univers"""
+    symbols = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            symbols.extend(s.strip().upper() for s in line.replace(";", ",").split(","))
+    return list(dict.fromkeys(s for s in symbols if s))
+
+
+def _number(value):
+    """Nombre fini ou None ("N/A", NaN...)"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value and value not in (float("inf"), float("-inf")) else None
+
+
+def profile_row(profile: dict, screened_at: float) -> tuple:
+    technicals = profile.get("technicals") or {}
+    ratios = profile.get("ratios") or {}
+    return (
+        profile["ticker"], profile.get("name"), profile.get("sector"), profile.get("type"),
+        int(bool(profile.get("is_halal"))), profile.get("sharia_score"),
+        _number(ratios.get("debt")), _number(ratios.get("cash")),
+        _number(technicals.get("rsi")), _number(technicals.get("position_52w")),
+        _number(technicals.get("current_price")), profile.get("rating"), profile.get("reason"),
+        json.dumps(profile, default=str), screened_at,
+    )
+
+
+class ScreeningIndex:
+    """Table SQLite des profils de screening (lectures concurrentes, mode WAL)"""
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par thread (sqlite3 n'autorise pas le partage par défaut)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def upsert(self, profiles: list, screened_at: float = None):
+        screened_at = screened_at or time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO profiles ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [profile_row(p, screened_at) for p in profiles],
+            )
+
+    def set_meta(self, **values):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in values.items()],
+            )
+
+    def meta(self) -> dict:
+        rows = self._connect().execute("SELECT key, value FROM meta").fetchall()
+        return {row["key"]: json.loads(row["value"]) for row in rows}
+
+    def build(self, symbols: list, screening: HalalScreeningService = None, chunk: int = BUILD_CHUNK) -> dict:
+        """Analyse les symboles par lots et les indexe
+
+        Dans chaque lot, les données Yahoo sont chargées en parallèle puis la
+        conformité est évaluée en une seule passe vectorielle.
+
+        Les profils déjà présents restent consultables pendant la construction.
+        """
+        screening = screening or HalalScreeningService()
+        started = time.time()
+        indexed, failed = 0, []
+        for start in range(0, len(symbols), chunk):
+            batch = symbols[start:start + chunk]
+            # Job batch : passe après les requêtes interactives dans le budget Yahoo
+            with upstream_priority(BATCH):
+                results, errors = screening.get_company_profiles(batch, timeout=BUILD_CHUNK_TIMEOUT)
+            profiles = [results[s] for s in batch if results.get(s)]
+            failed.extend(s for s in batch if not results.get(s))
+            self.upsert(profiles)
+            indexed += len(profiles)
+            print(f"📇 Index screening : {min(start + chunk, len(symbols))}/{len(symbols)}")
+
+        summary = {"symbols": len(symbols), "indexed": indexed, "failed": len(failed),
+                   "built_at": started, "duration": round(time.time() - started, 1)}
+        self.set_meta(**summary)
+        return {**summary, "failed_symbols": failed}
+
+    def query(self, filters: dict = None, sort: str = "sharia_score", order: str = "desc",
+              limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> dict:
+        """Filtre / trie / pagine l'index (requête paramétrée, colonnes en liste blanche)
+
+        filters : sector (str ou liste), type, is_halal, q (préfixe ticker ou nom),
+        min_<x> / max_<x> pour x dans RANGE_FILTERS.
+        """
+        filters = filters or {}
+        clauses, params = [], []
+
+        sectors = filters.get("sector")
+        if sectors:
+            sectors = [sectors] if isinstance(sectors, str) else list(sectors)
+            clauses.append(f"sector IN ({', '.join('?' * len(sectors))})")
+            params.extend(sectors)
+        if filters.get("type"):
+            clauses.append("type = ?")
+            params.append(str(filters["type"]).upper())
+        if filters.get("is_halal") is not None:
+            clauses.append("is_halal = ?")
+            params.append(int(bool(filters["is_halal"])))
+        if filters.get("q"):
+            clauses.append("(ticker LIKE ? OR name LIKE ?)")
+            params.extend([f"{str(filters['q']).upper()}%", f"{filters['q']}%"])
+        for name, column in RANGE_FILTERS.items():
+            for prefix, op in (("min_", ">="), ("max_", "<=")):
+                value = filters.get(prefix + name)
+                if value is not None:
+                    clauses.append(f"{column} {op} ?")
+                    params.append(float(value))
+
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Tri invalide : {sort}")
+        direction = "ASC" if str(order).lower() == "asc" else "DESC"
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        offset = max(0, int(offset))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self._connect()
+        total = conn.execute(f"SELECT COUNT(*) FROM profiles {where}", params).fetchone()[0]
+        # Valeurs NULL en dernier quel que soit le sens (le tri reste servi par l'index
+        # de la colonne) ; ticker pour un ordre stable
+        rows = conn.execute(
+            f"SELECT ticker, name, sector, type, is_halal, sharia_score, debt_ratio, cash_ratio, "
+            f"rsi, position_52w, current_price, rating, reason FROM profiles {where} "
+            f"ORDER BY {sort} {direction} NULLS LAST, ticker LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+
+        results = []
+        for row in rows:
+            item = dict(row)
+            item["is_halal"] = bool(item["is_halal"])
+            results.append(item)
+        return {"total": total, "limit": limit, "offset": offset, "results": results}
+
+    def get_profile(self, ticker: str):
+        row = self._connect().execute(
+            "SELECT profile FROM profiles WHERE ticker = ?", (ticker.upper(),)).fetchone()
+        return json.loads(row["profile"]) if row else None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_screening_index() -> ScreeningIndex:
+    """Index partagé du processus"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ScreeningIndex()
+    return _index
+
+
+if __name__ == "__main__":
+    universe = sys.argv[1] if len(sys.argv) > 1 else UNIVERSE_PATH
+    index = ScreeningIndex(sys.argv[2]) if len(sys.argv) > 2 else get_screening_index()
+    report = index.build(load_universe(universe))
+    print(f"✅ {report['indexed']}/{report['symbols']} profils indexés en {report['duration']} s "
+          f"({report['failed']} échecs)")
@@ -0,0 +1,407 @@
+"""Caches partagés entre workers gunicorn (même interface que TTLCache)
+
+Avec `gunicorn -w N`, un cache en mémoire est dupliqué N fois et chaque
+worker se réchauffe seul après un déploiement. Ces backends stockent les
+valeurs (sérialisées) hors du processus :
+
+- SQLiteCache : fichier local en mode WAL, partagé par les workers d'un hôte
+- RedisCache : tout client compatible Redis (redis-py ou LocalRedis en test)
+
+Choix par ATHAR_CACHE_URL :
+    memory                       -> TTLCache (un cache par processus)
+    sqlite:///chemin/cache.db    -> SQLiteCache (défaut : data/market_cache.sqlite)
+    redis://hote:6379/0          -> RedisCache (nécessite le paquet redis)
+
+Devant un backend partagé, make_cache place un cache L1 par processus
+(TieredCache) de quelques secondes : une lecture répétée ne redésérialise
+pas la valeur (un DataFrame d'historique coûte des millisecondes à
+dépickler). Les écritures passent toujours par le backend partagé
+(write-through) : ce qu'un worker charge ou rafraîchit (refresh=True des
+pollers et de l'ordonnanceur) est aussitôt visible des autres. Un autre
+worker peut servir sa copie L1 au plus L1_SECONDS de plus.
+
+acquire(nom, ttl) pose un bail exclusif (un seul processus détenteur par
+cache partagé) : un seul worker recharge un dataset de fond et le publie,
+les autres relisent sa publication.
+
+Les valeurs sont sérialisées avec pickle : le fichier / serveur de cache ne
+doit être accessible qu'à l'application.
+
+Déploiement : dans l'image docker/Dockerfile.backend, data/ est
+/app/backend/data. Avec docker-compose (./backend monté sur /app/backend),
+le fichier SQLite est sur l'hôte et survit aux redémarrages ; sans volume,
+il vit dans la couche du conteneur : partagé par ses workers, perdu à
+chaque recréation et jamais partagé entre conteneurs (utiliser redis://).
+
+Restent par processus (mémoire x nombre de workers) : les calendriers de
+dividendes (DividendEngine) et les profils du look-through ETF
+(ETFLookThroughService), qui gardent des objets vivants en TTLCache.
+"""
+import fnmatch
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from services.market_data import TTLCache, _MISSING
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CACHE_URL = os.environ.get("ATHAR_CACHE_URL", "sqlite:///" + os.path.join(DATA_DIR, "market_cache.sqlite"))
+MAX_BYTES = int(float(os.environ.get("ATHAR_CACHE_MAX_MB", 256)) * 1024 * 1024)
+MAX_ENTRIES = int(os.environ.get("ATHAR_CACHE_MAX_ENTRIES", 20000))
+# Une valeur plus grosse n'est pas mise en cache (ex: historique "max" en 1m)
+MAX_VALUE_BYTES = int(float(os.environ.get("ATHAR_CACHE_MAX_VALUE_MB", 8)) * 1024 * 1024)
+
+# Cache L1 par processus devant le backend partagé (0 : désactivé)
+L1_SECONDS = float(os.environ.get("ATHAR_CACHE_L1_SECONDS", 2))
+L1_ENTRIES = int(os.environ.get("ATHAR_CACHE_L1_ENTRIES", 1024))
+
+# Éviction vérifiée toutes les EVICT_EVERY écritures (par processus)
+EVICT_EVERY = 64
+# Après éviction, le cache redescend à cette fraction des limites
+EVICT_TARGET = 0.9
+# Précision de la date de dernier accès (évite une écriture à chaque lecture)
+ACCESS_RESOLUTION = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries (expires);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+def cache_key(key) -> str:
+    """Clé texte stable (les clés du provider sont des tuples de str)"""
+    return repr(key)
+
+
+def lease_owner() -> str:
+    """Détenteur d'un bail : hôte et pid (évalué à l'appel, après un fork gunicorn)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class _Stats:
+    """Compteurs hits / misses / évictions du processus courant"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _ratio(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 4) if total else 0
+
+
+class SQLiteCache(_Stats):
+    """Cache TTL/LRU borné (entrées et octets) dans un fichier SQLite partagé"""
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES, max_entries: int = MAX_ENTRIES,
+                 max_value_bytes: int = MAX_VALUE_BYTES):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.max_value_bytes = max_value_bytes
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par thread (et donc par worker)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _read(self, key, touch: bool):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, accessed FROM entries WHERE key = ? AND expires > ?", (cache_key(key), now)
+        ).fetchone()
+        if row is None:
+            return _MISSING
+        if touch and now - row[1] > ACCESS_RESOLUTION:
+            with conn:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, cache_key(key)))
+        return pickle.loads(row[0])
+
+    def get(self, key, default=_MISSING):
+        value = self._read(key, touch=True)
+        self._count(value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def peek(self, key, default=_MISSING):
+        value = self._read(key, touch=False)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl: float):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_value_bytes:
+            return
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(key), blob, len(blob), now + ttl, now),
+            )
+        with self._stats_lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Supprime les entrées expirées puis, au-delà des limites, les moins récemment lues"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            if count <= self.max_entries and size <= self.max_bytes:
+                return
+            keep_count = int(self.max_entries * EVICT_TARGET)
+            keep_bytes = int(self.max_bytes * EVICT_TARGET)
+            victims = []
+            for key, entry_size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                if count <= keep_count and size <= keep_bytes:
+                    break
+                victims.append((key,))
+                count -= 1
+                size -= entry_size
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        with self._stats_lock:
+            self.evictions += len(victims)
+
+    def acquire(self, name: str, ttl: float, owner: str = None) -> bool:
+        """Prend ou prolonge le bail `name` ; False s'il est détenu par un autre processus"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE leases.owner = excluded.owner OR leases.expires <= ?",
+                (name, owner or lease_owner(), now + ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM entries")
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM entries WHERE expires > ?", (time.time(),)).fetchone()[0]
+
+    def stats(self) -> dict:
+        count, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "backend": "sqlite",
+            "entries": count,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self._ratio(),
+        }
+
+
+class RedisCache(_Stats):
+    """Cache dans un serveur compatible Redis (expiration native via PX)
+
+    Les limites de taille et l'éviction LRU relèvent du serveur
+    (maxmemory + maxmemory-policy allkeys-lru) ; seule la taille par valeur
+    est bornée ici.
+    """
+
+    def __init__(self, client, prefix: str = "athar:", max_value_bytes: int = MAX_VALUE_BYTES):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.max_value_bytes = max_value_bytes
+
+    def _name(self, key) -> str:
+        return self.prefix + cache_key(key)
+
+    def peek(self, key, default=_MISSING):
+        raw = self.client.get(self._name(key))
+        return default if raw is None else pickle.loads(raw)
+
+    def get(self, key, default=_MISSING):
+        value = self.peek(key)
+        self._count(value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl: float):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) <= self.max_value_bytes:
+            self.client.set(self._name(key), blob, px=max(1, int(ttl * 1000)))
+
+    def acquire(self, name: str, ttl: float, owner: str = None) -> bool:
+        """Prend ou prolonge le bail `name` (SET NX) ; False s'il est détenu par un autre processus"""
+        lease, owner, px = f"{self.prefix}lease:{name}", owner or lease_owner(), max(1, int(ttl * 1000))
+        if self.client.set(lease, owner, nx=True, px=px):
+            return True
+        current = self.client.get(lease)
+        if current in (owner, owner.encode()):
+            self.client.set(lease, owner, px=px)
+            return True
+        return False
+
+    def _names(self) -> list:
+        return list(self.client.scan_iter(match=self.prefix + "*"))
+
+    def clear(self):
+        names = self._names()
+        if names:
+            self.client.delete(*names)
+
+    def __len__(self):
+        return len(self._names())
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self._ratio(),
+        }
+
+
+class TieredCache:
+    """Cache L1 du processus (TTLCache, durée courte) devant un cache partagé
+
+    Lectures : L1 puis backend partagé (la valeur lue remplit le L1).
+    Écritures : backend partagé puis L1, jamais le L1 seul.
+    """
+
+    def __init__(self, shared, l1_seconds: float = L1_SECONDS, l1_entries: int = L1_ENTRIES):
+        self.shared = shared
+        self.l1_seconds = l1_seconds
+        self.l1 = TTLCache(l1_entries)
+
+    def get(self, key, default=_MISSING):
+        value = self.l1.get(key)
+        if value is _MISSING:
+            value = self.shared.get(key)
+            if value is not _MISSING:
+                self.l1.set(key, value, self.l1_seconds)
+        return default if value is _MISSING else value
+
+    def peek(self, key, default=_MISSING):
+        value = self.l1.peek(key)
+        if value is _MISSING:
+            value = self.shared.peek(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl: float):
+        self.shared.set(key, value, ttl)
+        self.l1.set(key, value, min(ttl, self.l1_seconds))
+
+    def acquire(self, name: str, ttl: float, owner: str = None) -> bool:
+        return self.shared.acquire(name, ttl, owner)
+
+    def clear(self):
+        self.shared.clear()
+        self.l1.clear()
+
+    def __len__(self):
+        return len(self.shared)
+
+    def stats(self) -> dict:
+        return {**self.shared.stats(), "l1": self.l1.stats()}
+
+
+class LocalRedis:
+    """Serveur Redis minimal en mémoire (get / set PX NX / delete / scan_iter)
+
+    Remplaçant local pour les tests et benchmarks ; `maxkeys` imite
+    maxmemory-policy allkeys-lru.
+    """
+
+    def __init__(self, maxkeys: int = MAX_ENTRIES):
+        self.maxkeys = maxkeys
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= time.monotonic():
+                del self._data[name]
+                return None
+            self._data.move_to_end(name)
+            return entry[1]
+
+    def set(self, name, value, px: int = None, nx: bool = False):
+        expires = time.monotonic() + px / 1000 if px else None
+        with self._lock:
+            if nx:
+                entry = self._data.get(name)
+                if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                    return None
+            self._data[name] = (expires, value)
+            self._data.move_to_end(name)
+            while len(self._data) > self.maxkeys:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, *names) -> int:
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def scan_iter(self, match: str = "*"):
+        now = time.monotonic()
+        with self._lock:
+            names = [n for n, (exp, _) in self._data.items() if (exp is None or exp > now)]
+        return [n for n in names if fnmatch.fnmatchcase(n, match)]
+
+
+def make_cache(url: str = CACHE_URL):
+    """Cache décrit par une URL (voir l'en-tête du module)"""
+    if not url or url == "memory":
+        return TTLCache(MAX_ENTRIES)
+    if url.startswith("sqlite:///"):
+        shared = SQLiteCache(url[len("sqlite:///"):])
+    elif url.startswith(("redis://", "rediss://", "unix://")):
+        # Dépendance optionnelle : seulement si un serveur Redis est configuré
+        import redis
+        shared = RedisCache(redis.Redis.from_url(url))
+    else:
+        raise ValueError(f"ATHAR_CACHE_URL non reconnue : {url}")
+    return TieredCache(shared) if L1_SECONDS > 0 else shared
@@ -1,93 +1,276 @@
-import yfinance as yf
+import itertools
+
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from services.dividend_calendar import get_dividend_engine
+from services.history_store import get_history_store
+from services.monte_carlo import project, percentile_bands
+from services.metrics import timed
+
+# Garde-fou du mode grille (nombre de combinaisons évaluées par requête)
+MAX_GRID_SCENARIOS = 500
+MAX_PROJECTION_PATHS = 200_000
+PURIFICATION_RATE = 0.05
+
+
+def parse_tickers(tickers_str) -> list:
+    """"AAPL, MSFT" (ou liste) -> ["AAPL", "MSFT"]"""
+    if isinstance(tickers_str, str):
+        tickers_str = tickers_str.split(',')
+    return [t.strip().upper() for t in tickers_str if t and t.strip()]
+
 
 class SimulationService:
     """Service de simulation DCA (Investissement Mensuel)"""
 
+    def _load_monthly(self, tickers: list, start_year: int):
+        """Clôtures et dividendes mensuels (mois x tickers), un seul téléchargement par ticker
+
+        Les dividendes viennent des calendriers partagés (ex-dates réelles),
+        regroupés par mois d'ex-date.
+        """
+        store = get_history_store()
+        start_date = f"{start_year}-01-01"
+        closes = {}
+
+        for ticker in tickers:
+            try:
+                # Historique brut (auto_adjust=False), comme les calendriers de dividendes
+                history = store.get_history(ticker, start=start_date, auto_adjust=False)
+                if history is None or history.empty:
+                    continue
+
+                # On convertit les données en "Mensuel" (Fin de mois)
+                close = history['Close'].resample('ME').last()
+                if close.index.tz is not None:
+                    close.index = close.index.tz_localize(None)
+                closes[ticker] = close
+            except Exception as e:
+                print(f"Erreur sur {ticker}: {e}")
+
+        if not closes:
+            return None, None
+        prices = pd.DataFrame(closes).sort_index()
+        engine = get_dividend_engine()
+        calendars, errors = engine.calendars(list(prices.columns))
+        for ticker, error in errors.items():
+            print(f"Erreur dividendes {ticker}: {error}")
+        dividends = engine.monthly_dividends(calendars, prices.index)
+        dividends = dividends.reindex(index=prices.index, columns=prices.columns).fillna(0)
+        return prices, dividends
+
+    def _dca(self, prices: pd.DataFrame, dividends: pd.DataFrame, amounts: np.ndarray) -> dict:
+        """Achats mensuels vectorisés pour une ou plusieurs mises par ticker
+
+        `amounts` : mises mensuelles par ticker, forme (A,) -> résultats (A, mois, tickers).
+        """
+        price = prices.to_numpy(dtype=float)
+        valid = np.isfinite(price) & (price > 0)
+        amounts = np.asarray(amounts, dtype=float).reshape(-1, 1, 1)
+
+        # On achète pour 'amount' chaque mois où un prix existe
+        bought = np.where(valid, amounts / np.where(valid, price, 1.0), 0.0)
+        shares = np.cumsum(bought, axis=1)
+        invested = np.cumsum(valid * amounts, axis=1)
+
+        # Dividende du mois : versé aux parts achetées les mois précédents, soit
+        # exactement celles détenues à l'ex-date (achat au dernier cours du mois)
+        held = np.concatenate([np.zeros_like(shares[:, :1]), shares[:, :-1]], axis=1)
+        received = np.cumsum(dividends.to_numpy(dtype=float) * held, axis=1)
+
+        # Valorisation au dernier cours connu
+        last_price = prices.ffill().fillna(0).to_numpy(dtype=float)
+        value = shares * last_price
+
+        return {"shares": shares, "invested": invested, "dividends": received, "value": value}
+
+    def _summary(self, invested: float, value: float, dividends: float) -> dict:
+        purification = dividends * PURIFICATION_RATE # 5% de sadaqah sur dividendes
+        total_gain = (value + dividends) - invested
+        total_return = (total_gain / invested) * 100 if invested > 0 else 0
+        return {
+            "total_invested": round(invested, 2),
+            "final_value": round(value, 2),
+            "dividends": round(dividends, 2),
+            "purification": round(purification, 2),
+            "total_gain": round(total_gain, 2),
+            "total_return": round(total_return, 2),
+        }
+
+    @timed("simulation.dca")
     def simulate_dca(self, tickers_str: str, monthly_amount: float, start_year: int) -> dict:
-        # Nettoyage des tickers (ex: "AAPL, MSFT" -> ["AAPL", "MSFT"])
-        tickers = [t.strip().upper() for t in tickers_str.split(',') if t.strip()]
-        
+        tickers = parse_tickers(tickers_str)
+
         if not tickers:
             return None
 
         # On divise le budget mensuel par le nombre d'actions
         # Ex: 100€ sur 2 actions = 50€ chacune par mois
         amount_per_ticker = monthly_amount / len(tickers)
-        
-        total_invested = 0
-        total_current_value = 0
-        total_dividends = 0
-        portfolio_breakdown = []
 
         print(f"💰 Simulation DCA depuis {start_year} sur {tickers}...")
+        prices, dividends = self._load_monthly(tickers, start_year)
 
-        for ticker in tickers:
-            try:
-                stock = yf.Ticker(ticker)
-                
-                # On récupère l'historique depuis le début de l'année choisie
-                start_date = f"{start_year}-01-01"
-                history = stock.history(start=start_date, auto_adjust=False)
-                
-                if history.empty:
-                    continue
+        if prices is None:
+            return {
+                "strategy": "DCA Mensuel",
+                "start_year": start_year,
+                "monthly_investment": monthly_amount,
+                **self._summary(0, 0, 0),
+                "breakdown": [],
+                "equity_curve": [],
+                "purification_by_year": []
+            }
 
-                # On convertit les données en "Mensuel" (Fin de mois)
-                # On prend le prix de clôture de chaque mois
-                monthly_data = history['Close'].resample('ME').last()
-                
-                # Simulation de l'achat mensuel
-                shares_owned = 0
-                cash_invested_in_stock = 0
-                
-                for date, price in monthly_data.items():
-                    # On achète pour 'amount_per_ticker'
-                    if pd.notna(price) and price > 0:
-                        shares_bought = amount_per_ticker / price
-                        shares_owned += shares_bought
-                        cash_invested_in_stock += amount_per_ticker
-
-                # Valeur actuelle de cette position
-                current_price = history['Close'].iloc[-1]
-                final_value = shares_owned * current_price
-                
-                # Calcul des dividendes (Approximation sur la période)
-                # On additionne tous les dividendes versés par action * nombre d'actions moyen
-                dividends_per_share = stock.history(start=start_date)['Dividends'].sum()
-                dividends_received = dividends_per_share * shares_owned # Simplifié
-
-                # Ajout aux totaux globaux
-                total_invested += cash_invested_in_stock
-                total_current_value += final_value
-                total_dividends += dividends_received
-                
-                portfolio_breakdown.append({
-                    "ticker": ticker,
-                    "shares": round(shares_owned, 2),
-                    "value": round(final_value, 2),
-                    "gain_percent": round(((final_value - cash_invested_in_stock) / cash_invested_in_stock) * 100, 2)
-                })
+        run = {k: v[0] for k, v in self._dca(prices, dividends, [amount_per_ticker]).items()}
+        invested = run["invested"][-1]
+        value = run["value"][-1]
+        received = run["dividends"][-1]
 
-            except Exception as e:
-                print(f"Erreur sur {ticker}: {e}")
-                continue
+        portfolio_breakdown = [
+            {
+                "ticker": ticker,
+                "shares": round(float(run["shares"][-1, i]), 2),
+                "value": round(float(value[i]), 2),
+                "dividends": round(float(received[i]), 2),
+                "gain_percent": round(float((value[i] - invested[i]) / invested[i] * 100), 2)
+            }
+            for i, ticker in enumerate(prices.columns) if invested[i] > 0
+        ]
 
-        # Calculs finaux
-        purification = total_dividends * 0.05 # 5% de sadaqah sur dividendes
-        total_gain = (total_current_value + total_dividends) - total_invested
-        total_return = (total_gain / total_invested) * 100 if total_invested > 0 else 0
+        # Courbe mois par mois (tous tickers confondus)
+        curve_invested = run["invested"].sum(axis=1)
+        curve_value = run["value"].sum(axis=1)
+        curve_dividends = run["dividends"].sum(axis=1)
+        equity_curve = [
+            {
+                "date": date.strftime('%Y-%m'),
+                "invested": round(float(curve_invested[m]), 2),
+                "value": round(float(curve_value[m]), 2),
+                "dividends": round(float(curve_dividends[m]), 2)
+            }
+            for m, date in enumerate(prices.index)
+        ]
+
+        # Purification par année : dividendes perçus à chaque ex-date de l'année
+        monthly_dividends = np.diff(curve_dividends, prepend=0.0)
+        by_year = pd.Series(monthly_dividends, index=prices.index.year).groupby(level=0).sum()
+        purification_by_year = [
+            {
+                "year": int(year),
+                "dividends": round(float(total), 2),
+                "purification": round(float(total) * PURIFICATION_RATE, 2)
+            }
+            for year, total in by_year.items() if total > 0
+        ]
 
         return {
             "strategy": "DCA Mensuel",
             "start_year": start_year,
             "monthly_investment": monthly_amount,
-            "total_invested": round(total_invested, 2),
-            "final_value": round(total_current_value, 2),
-            "dividends": round(total_dividends, 2),
-            "purification": round(purification, 2),
-            "total_gain": round(total_gain, 2),
-            "total_return": round(total_return, 2),
-            "breakdown": portfolio_breakdown
-        }
\ No newline at end of file
+            **self._summary(float(invested.sum()), float(value.sum()), float(received.sum())),
+            "breakdown": portfolio_breakdown,
+            "equity_curve": equity_curve,
+            "purification_by_year": purification_by_year
+        }
+
+    def simulate_grid(self, ticker_sets: list, monthly_amounts: list, start_years: list) -> dict:
+        """Évalue toutes les combinaisons (tickers, mise, année) en une requête
+
+        Chaque ticker n'est téléchargé qu'une fois (depuis la plus ancienne
+        année) ; les mises sont évaluées ensemble par broadcasting.
+        """
+        ticker_sets = [parse_tickers(s) for s in ticker_sets]
+        ticker_sets = [s for s in ticker_sets if s]
+        monthly_amounts = [float(a) for a in monthly_amounts]
+        start_years = sorted({int(y) for y in start_years})
+
+        n_scenarios = len(ticker_sets) * len(monthly_amounts) * len(start_years)
+        if not n_scenarios:
+            return None
+        if n_scenarios > MAX_GRID_SCENARIOS:
+            raise ValueError(f"Trop de combinaisons ({n_scenarios} > {MAX_GRID_SCENARIOS})")
+
+        universe = list(dict.fromkeys(t for s in ticker_sets for t in s))
+        prices, dividends = self._load_monthly(universe, start_years[0])
+
+        scenarios = []
+        for tickers, start_year in itertools.product(ticker_sets, start_years):
+            available = [t for t in tickers if prices is not None and t in prices.columns]
+            months = prices.index >= pd.Timestamp(f"{start_year}-01-01") if available else None
+            if available and months.any():
+                run = self._dca(
+                    prices.loc[months, available], dividends.loc[months, available],
+                    np.array(monthly_amounts) / len(tickers),
+                )
+                finals = {k: v[:, -1, :].sum(axis=1) for k, v in run.items() if k != "shares"}
+            else:
+                finals = {k: np.zeros(len(monthly_amounts)) for k in ("invested", "value", "dividends")}
+
+            for a, amount in enumerate(monthly_amounts):
+                scenarios.append({
+                    "tickers": tickers,
+                    "monthly_amount": amount,
+                    "start_year": start_year,
+                    **self._summary(
+                        float(finals["invested"][a]), float(finals["value"][a]), float(finals["dividends"][a])
+                    )
+                })
+
+        best = max(scenarios, key=lambda s: s["total_return"])
+        return {"strategy": "DCA Mensuel (grille)", "count": len(scenarios), "best": best, "scenarios": scenarios}
+
+    def project_dca(self, tickers_str: str, monthly_amount: float, horizon_years: int = 10,
+                    history_start_year: int = 2010, n_paths: int = 10_000, block_months: int = 12,
+                    seed=None, workers: int = None) -> dict:
+        """Projection Monte Carlo d'un plan DCA (block bootstrap des mois historiques)"""
+        horizon_years, n_paths, block_months = int(horizon_years), int(n_paths), int(block_months)
+        if horizon_years < 1:
+            raise ValueError("'horizon_years' doit être >= 1")
+        if not 1 <= n_paths <= MAX_PROJECTION_PATHS:
+            raise ValueError(f"'n_paths' doit être entre 1 et {MAX_PROJECTION_PATHS}")
+        if block_months < 1:
+            raise ValueError("'block_months' doit être >= 1")
+
+        tickers = parse_tickers(tickers_str)
+        if not tickers:
+            return None
+
+        prices, dividends = self._load_monthly(tickers, history_start_year)
+        if prices is None:
+            return None
+
+        # Mois communs à tous les tickers : rendements et rendements de dividende
+        previous = prices.shift(1)
+        returns = (prices / previous - 1).iloc[1:]
+        yields = (dividends / previous).iloc[1:]
+        common = returns.notna().all(axis=1) & np.isfinite(returns).all(axis=1)
+        returns, yields = returns[common], yields[common].fillna(0)
+        if len(returns) < 2 * block_months:
+            raise ValueError(
+                f"Historique insuffisant ({len(returns)} mois communs pour des blocs de {block_months} mois)")
+
+        horizon = horizon_years * 12
+        amount_per_ticker = monthly_amount / len(tickers)
+        amounts = np.full(returns.shape[1], amount_per_ticker)
+
+        print(f"🎲 Projection Monte Carlo ({n_paths} trajectoires, {horizon} mois) sur {list(returns.columns)}...")
+        paths = project(returns.to_numpy(), yields.to_numpy(), amounts, horizon, n_paths,
+                        block=block_months, seed=seed, workers=workers)
+
+        invested = amount_per_ticker * returns.shape[1] * horizon
+        return {
+            "strategy": "DCA Mensuel (projection)",
+            "tickers": list(returns.columns),
+            "monthly_investment": monthly_amount,
+            "horizon_months": horizon,
+            "history_months": len(returns),
+            "n_paths": n_paths,
+            "block_months": block_months,
+            "seed": str(paths["seed"]),
+            "total_invested": round(invested, 2),
+            "final_value": percentile_bands(paths["final_value"]),
+            "purification": percentile_bands(paths["purification"]),
+            "max_drawdown_percent": percentile_bands(paths["max_drawdown"], 100),
+            "probability_of_loss": round(float((paths["final_value"] < invested).mean()) * 100, 2)
+        }
@@ -0,0 +1,281 @@
+"""Accès à Yahoo : budget de requêtes, priorités et disjoncteur
+
+Tous les appels amont du provider passent par une UpstreamGate :
+- un seau à jetons (débit moyen + rafale) borne le trafic vers Yahoo ;
+  ATHAR_UPSTREAM_RATE / _BURST sont le budget de l'hôte, partagé à parts
+  égales entre les ATHAR_UPSTREAM_WORKERS workers gunicorn (défaut :
+  WEB_CONCURRENCY, comme gunicorn) ;
+- les requêtes interactives passent devant les jobs batch et les
+  rafraîchissements, qui laissent en plus une réserve de jetons ; un gros
+  lot interactif passe en priorité batch avec un délai à sa mesure
+  (voir batch_budget) ;
+- un disjoncteur s'ouvre sur une rafale de pannes (réseau, 429, 5xx) et
+  rejette les appels sans attendre pendant COOLDOWN secondes (puis un appel
+  d'essai). Un ticker inconnu ou des données vides ne sont pas des pannes.
+
+La priorité courante, l'échéance et les marqueurs "données périmées" sont
+des contextvars : fan_out les propage aux threads du pool.
+"""
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from services.concurrency import DEFAULT_TIMEOUT
+
+# Classes de priorité (plus petit = plus prioritaire)
+INTERACTIVE = 0
+BATCH = 1
+REFRESH = 2
+
+HOST_RATE = float(os.environ.get("ATHAR_UPSTREAM_RATE", 5))      # jetons / seconde, pour l'hôte
+HOST_BURST = float(os.environ.get("ATHAR_UPSTREAM_BURST", 20))   # capacité du seau, pour l'hôte
+# Workers gunicorn de l'hôte : chacun a son seau, à 1/WORKERS du budget
+WORKERS = max(1, int(os.environ.get("ATHAR_UPSTREAM_WORKERS", os.environ.get("WEB_CONCURRENCY", 1))))
+RATE = HOST_RATE / WORKERS
+BURST = max(1.0, HOST_BURST / WORKERS)
+# Attente maximale d'un jeton selon la priorité (au-delà : RateLimited)
+MAX_WAIT = {INTERACTIVE: 5.0, BATCH: 120.0, REFRESH: 30.0}
+# Part du seau que les priorités basses ne peuvent pas consommer
+RESERVE = {INTERACTIVE: 0.0, BATCH: 0.25, REFRESH: 0.25}
+
+# Disjoncteur : FAILURE_THRESHOLD erreurs (et au moins FAILURE_RATIO des appels)
+# sur WINDOW secondes -> ouvert pendant COOLDOWN secondes
+FAILURE_THRESHOLD = 5
+FAILURE_RATIO = 0.5
+WINDOW = 30.0
+COOLDOWN = 30.0
+
+# Statuts HTTP qui signalent un Yahoo en difficulté (les autres sont des réponses)
+FAILURE_STATUSES = {429} | set(range(500, 600))
+
+_priority = contextvars.ContextVar("athar_upstream_priority", default=INTERACTIVE)
+_deadline = contextvars.ContextVar("athar_upstream_deadline", default=None)
+_stale = contextvars.ContextVar("athar_stale_sources", default=None)
+
+
+class RateLimited(Exception):
+    """Budget amont épuisé : pas de jeton dans le délai imparti"""
+
+
+class CircuitOpen(Exception):
+    """Disjoncteur ouvert : Yahoo est considéré indisponible"""
+
+
+@contextmanager
+def upstream_priority(level: int):
+    """Priorité des appels amont faits dans ce bloc (et dans ses fan_out)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def upstream_deadline(seconds: float):
+    """Aucune attente de jeton au-delà de `seconds` pour les appels de ce bloc"""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def batch_budget(calls: int) -> tuple:
+    """(priorité, délai) d'une requête interactive d'au plus `calls` appels amont
+
+    Un lot qui tient dans la rafale du worker reste interactif avec le délai
+    par défaut. Au-delà, il passe en priorité BATCH (les requêtes unitaires
+    restent servies d'abord) avec un délai couvrant le débit du worker,
+    borné par MAX_WAIT[BATCH] : il attend ses jetons au lieu d'échouer en
+    partie au bout de MAX_WAIT[INTERACTIVE].
+    """
+    if calls <= BURST:
+        return INTERACTIVE, DEFAULT_TIMEOUT
+    usable = BURST * (1 - RESERVE[BATCH])
+    return BATCH, min(DEFAULT_TIMEOUT + max(calls - usable, 0) / RATE, MAX_WAIT[BATCH])
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Panne côté Yahoo (réseau, délai, 429, 5xx) et non erreur propre à la requête"""
+    if isinstance(error, (RateLimited, CircuitOpen)):
+        return False
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if status is not None:
+        return int(status) in FAILURE_STATUSES
+    name, message = type(error).__name__, str(error)
+    if "RateLimit" in name or "429" in message or "Too Many Requests" in message:
+        return True
+    # requests / urllib : exceptions réseau dérivées d'OSError
+    return isinstance(error, OSError) or "Timeout" in name or "Connection" in name
+
+
+def track_stale():
+    """Démarre le suivi des données périmées servies (début de requête HTTP)"""
+    _stale.set([])
+
+
+def mark_stale(kind: str, key):
+    sources = _stale.get()
+    if sources is not None:
+        sources.append((kind, key))
+
+
+def stale_sources() -> list:
+    """(type, clé) servis depuis une valeur périmée depuis track_stale()"""
+    return list(_stale.get() or [])
+
+
+class TokenBucket:
+    """Seau à jetons avec file d'attente par priorité (thread-safe)"""
+
+    def __init__(self, rate: float = RATE, burst: float = BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._stamp = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: float = None) -> bool:
+        """Prend un jeton ; False si aucun n'est attribué avant `timeout`"""
+        timeout = MAX_WAIT.get(priority, 30.0) if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if _deadline.get() is not None:
+            deadline = min(deadline, _deadline.get())
+        reserve = self.burst * RESERVE.get(priority, 0.0)
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    # Seul le premier de la file (priorité, puis arrivée) peut se servir
+                    if self._waiters[0] == entry and self._tokens >= 1 + reserve:
+                        self._tokens -= 1
+                        return True
+                    if now >= deadline:
+                        return False
+                    needed = max(1 + reserve - self._tokens, 0) / self.rate
+                    self._cond.wait(min(deadline - now, max(needed, 0.001)))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {"tokens": round(self._tokens, 2), "rate": self.rate, "burst": self.burst,
+                    "waiting": len(self._waiters)}
+
+
+class CircuitBreaker:
+    """Disjoncteur fermé / ouvert / semi-ouvert sur une fenêtre glissante"""
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, ratio: float = FAILURE_RATIO,
+                 window: float = WINDOW, cooldown: float = COOLDOWN):
+        self.threshold = threshold
+        self.ratio = ratio
+        self.window = window
+        self.cooldown = cooldown
+        self._events = deque()
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    def _prune(self, now: float):
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "open" if time.monotonic() - self._opened_at < self.cooldown else "half_open"
+
+    def allow(self) -> bool:
+        """True si l'appel peut partir (un seul appel d'essai en semi-ouvert)"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        with self._lock:
+            if self._opened_at is not None:
+                if not self._probing:
+                    return # Appel parti avant l'ouverture : ignoré
+                # Résultat de l'appel d'essai : on referme ou on repart pour un délai
+                self._probing = False
+                self._opened_at = None if ok else now
+                self._events.clear()
+                return
+            self._events.append((now, ok))
+            self._prune(now)
+            failures = sum(1 for _, success in self._events if not success)
+            if failures >= self.threshold and failures >= self.ratio * len(self._events):
+                self._opened_at = now
+                self.trips += 1
+                print(f"⚡ Disjoncteur Yahoo ouvert ({failures} erreurs en {self.window:.0f}s)")
+
+    def stats(self) -> dict:
+        return {"state": self.state, "trips": self.trips}
+
+
+class UpstreamGate:
+    """Point de passage unique des appels amont (budget + disjoncteur)"""
+
+    def __init__(self, bucket: TokenBucket = None, breaker: CircuitBreaker = None):
+        self.bucket = bucket or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _reject(self, error: Exception):
+        with self._lock:
+            self.rejected += 1
+        raise error
+
+    def call(self, fn):
+        """fn() sous budget et disjoncteur ; lève RateLimited / CircuitOpen sans appeler"""
+        # Disjoncteur ouvert : rejet immédiat, sans consommer ni attendre de jeton
+        if self.breaker.state == "open":
+            self._reject(CircuitOpen("Yahoo Finance indisponible (disjoncteur ouvert)"))
+        if not self.bucket.acquire(current_priority()):
+            self._reject(RateLimited("Budget de requêtes Yahoo épuisé"))
+        if not self.breaker.allow():
+            self._reject(CircuitOpen("Yahoo Finance indisponible (disjoncteur ouvert)"))
+        try:
+            result = fn()
+        except Exception as e:
+            # Ticker inconnu, données vides... : Yahoo a répondu, ce n'est pas une panne
+            self.breaker.record(not is_upstream_failure(e))
+            raise
+        self.breaker.record(True)
+        return result
+
+    def stats(self) -> dict:
+        return {"bucket": self.bucket.stats(), "breaker": self.breaker.stats(), "rejected": self.rejected}
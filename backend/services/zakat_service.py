@@ -1,91 +1,162 @@
-import yfinance as yf
+import numpy as np
+
+from services.nisab_oracle import CURRENCIES, NISAB_GOLD_GRAMS, NISAB_SILVER_GRAMS, get_nisab_oracle
+from services.metrics import timed
+
+# Taux de la Zakat (2.5%) et avoirs pris en compte, dans l'ordre des colonnes
+ZAKAT_RATE = 0.025
+ASSET_FIELDS = ('cash', 'savings', 'stocks', 'crypto', 'gold')
+# Taille maximale d'un lot (/api/zakat/batch)
+MAX_BATCH_HOUSEHOLDS = 50_000
+# Nisab qui rend la Zakat due : argent (595 g) par défaut, le seuil le plus bas
+# (avis le plus favorable aux bénéficiaires) ; "gold" (85 g) sur demande
+NISAB_BASES = ("silver", "gold")
+DEFAULT_NISAB = "silver"
+
+
+def nisab_basis(value) -> str:
+    basis = str(value or DEFAULT_NISAB).lower()
+    if basis not in NISAB_BASES:
+        raise ValueError(f"Nisab inconnu : {value} ({', '.join(NISAB_BASES)})")
+    return basis
+
+
+def zakat_arrays(assets: np.ndarray, debts: np.ndarray, gold_threshold: np.ndarray,
+                 silver_threshold: np.ndarray, basis: str = DEFAULT_NISAB) -> dict:
+    """Zakat de n foyers en une passe (montants et seuils dans la devise de chaque foyer)
+
+    La Zakat n'est due (2.5 % du patrimoine net) qu'au-dessus du nisab `basis`.
+    """
+    net_wealth = assets.sum(axis=1) - debts
+    above_gold = net_wealth >= gold_threshold
+    above_silver = net_wealth >= silver_threshold
+    eligible = above_gold if basis == "gold" else above_silver
+    return {
+        "net_wealth": net_wealth,
+        "zakat_payable": np.where(eligible, np.maximum(net_wealth * ZAKAT_RATE, 0), 0.0),
+        "eligible": eligible,
+        "above_gold_nisab": above_gold,
+        "above_silver_nisab": above_silver,
+    }
+
 
 class ZakatService:
     """Service de calcul de la Zakat avec double Nisab (Or & Argent)"""
 
-    def get_metal_prices(self):
-        """Récupère les prix Or et Argent en EUR"""
-        # VALEURS PAR DÉFAUT (Mises à jour janv 2026 selon vos chiffres)
-        # Si le scraping échoue, on utilise ces valeurs réelles
-        prices = {
-            "gold_gram": 136.0,   # ~136€ le gramme
-            "silver_gram": 2.82,  # ~2.82€ le gramme
-            "source": "backup"    # Indique qu'on est sur les valeurs de secours
-        }
-        
-        try:
-            print("🏆 Tentative de connexion Yahoo Finance...")
-            # Tickers : XAUEUR=X (Or/Euro), XAGEUR=X (Argent/Euro)
-            tickers = yf.Tickers("XAUEUR=X XAGEUR=X")
-            
-            # OR (Gold) - XAU
-            if 'XAUEUR=X' in tickers.tickers:
-                history_gold = tickers.tickers['XAUEUR=X'].history(period="1d")
-                if not history_gold.empty:
-                    # Yahoo donne le prix de l'ONCE (Troy Ounce)
-                    oz_price = history_gold['Close'].iloc[-1]
-                    # 1 Once Troy = 31.1035 grammes
-                    live_price = oz_price / 31.1035
-                    
-                    # On vérifie que la donnée est cohérente (> 50€) sinon on garde le backup
-                    if live_price > 50:
-                        prices["gold_gram"] = live_price
-                        prices["source"] = "live"
-
-            # ARGENT (Silver) - XAG
-            if 'XAGEUR=X' in tickers.tickers:
-                history_silver = tickers.tickers['XAGEUR=X'].history(period="1d")
-                if not history_silver.empty:
-                    oz_price = history_silver['Close'].iloc[-1]
-                    live_price = oz_price / 31.1035
-                    
-                    if live_price > 0.5:
-                        prices["silver_gram"] = live_price
+    def __init__(self, oracle=None):
+        self._oracle = oracle
 
-        except Exception as e:
-            print(f"⚠️ Le live a échoué ({e}), utilisation des valeurs manuelles (136€/2.82€).")
-        
-        return prices
+    @property
+    def oracle(self):
+        return self._oracle or get_nisab_oracle()
+
+    def get_metal_prices(self, currency: str = 'EUR'):
+        """Prix Or et Argent au gramme (dernière valeur live connue ou valeurs de secours)"""
+        return self.oracle.quote(currency)
+
+    def _nisab_data(self, nisab: dict) -> dict:
+        return {
+            "gold_threshold": round(nisab["gold_threshold"], 2),
+            "silver_threshold": round(nisab["silver_threshold"], 2),
+            "gold_price_g": round(nisab["gold_price_g"], 2),
+            "silver_price_g": round(nisab["silver_price_g"], 2),
+            "source": nisab["source"],
+            "currency": nisab["currency"],
+            "as_of": nisab["as_of"],
+            "age": nisab["age"],
+            "fx_rate": round(nisab["fx_rate"], 6),
+            "fx_source": nisab["fx_source"],
+        }
 
     def calculate_zakat(self, data: dict) -> dict:
+        # Devise ou nisab inconnus : ValueError remontée à la route (400)
+        nisab = self.get_metal_prices(data.get('currency', 'EUR'))
+        basis = nisab_basis(data.get('nisab'))
         try:
-            # 1. Récupérer les prix (Live ou Backup)
-            metals = self.get_metal_prices()
-            
-            # 2. Calculer les deux Nisabs
-            # Nisab Or = 85 grammes
-            nisab_gold = metals["gold_gram"] * 85
-            
-            # Nisab Argent = 595 grammes
-            nisab_silver = metals["silver_gram"] * 595
-
-            # 3. Récupération des actifs utilisateur
-            cash = float(data.get('cash', 0))
-            savings = float(data.get('savings', 0))
-            stocks = float(data.get('stocks', 0))
-            crypto = float(data.get('crypto', 0))
-            gold_silver = float(data.get('gold', 0))
-            debts = float(data.get('debts', 0))
-
-            # 4. Calcul Patrimoine Net
-            total_assets = cash + savings + stocks + crypto + gold_silver
-            net_wealth = total_assets - debts
-
-            # 5. Calcul Zakat (2.5%)
-            zakat_amount = net_wealth * 0.025
+            # Avoirs et dettes de l'utilisateur (même calcul que le lot, une seule ligne)
+            assets = np.array([[float(data.get(field, 0)) for field in ASSET_FIELDS]])
+            debts = np.array([float(data.get('debts', 0))])
+            result = zakat_arrays(assets, debts, nisab["gold_threshold"], nisab["silver_threshold"], basis)
 
             return {
-                "net_wealth": round(net_wealth, 2),
-                "zakat_payable": round(zakat_amount if zakat_amount > 0 else 0, 2),
-                "nisab_data": {
-                    "gold_threshold": round(nisab_gold, 2),
-                    "silver_threshold": round(nisab_silver, 2),
-                    "gold_price_g": round(metals["gold_gram"], 2),
-                    "silver_price_g": round(metals["silver_gram"], 2),
-                    "source": metals["source"]
-                }
+                "net_wealth": round(float(result["net_wealth"][0]), 2),
+                "zakat_payable": round(float(result["zakat_payable"][0]), 2),
+                "zakat_due": bool(result["eligible"][0]),
+                "nisab_basis": basis,
+                "above_gold_nisab": bool(result["above_gold_nisab"][0]),
+                "above_silver_nisab": bool(result["above_silver_nisab"][0]),
+                "nisab_data": self._nisab_data(nisab)
             }
 
         except Exception as e:
             print(f"Erreur Zakat: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def _parse_households(self, households: list, default_currency: str) -> tuple:
+        """(index valides, avoirs (n, 5), dettes, index de devise, index invalides)"""
+        rows, debts, currencies, valid, invalid = [], [], [], [], []
+        for i, household in enumerate(households):
+            try:
+                row = [float(household.get(field, 0) or 0) for field in ASSET_FIELDS]
+                debt = float(household.get('debts', 0) or 0)
+                currency = self.oracle.currency_index(household.get('currency') or default_currency)
+            except (AttributeError, TypeError, ValueError):
+                invalid.append(i)
+                continue
+            rows.append(row)
+            debts.append(debt)
+            currencies.append(currency)
+            valid.append(i)
+        return (valid, np.array(rows, dtype=float).reshape(-1, len(ASSET_FIELDS)),
+                np.array(debts, dtype=float), np.array(currencies, dtype=int), invalid)
+
+    @timed("zakat.batch")
+    def calculate_batch(self, households: list, currency: str = 'EUR', nisab: str = DEFAULT_NISAB) -> dict:
+        """Zakat de nombreux foyers : seuils convertis par devise, calcul vectorisé
+
+        Les totaux ne comptent que les foyers au-dessus du nisab choisi.
+        """
+        self.oracle.currency_index(currency)
+        basis = nisab_basis(nisab)
+        valid, assets, debts, currency_idx, invalid = self._parse_households(households, currency)
+
+        snapshot = self.oracle.snapshot()
+        # Seuils du nisab par devise (vecteur), puis par foyer
+        gold = snapshot["gold_gram"] * NISAB_GOLD_GRAMS * snapshot["fx"]
+        silver = snapshot["silver_gram"] * NISAB_SILVER_GRAMS * snapshot["fx"]
+        result = zakat_arrays(assets, debts, gold[currency_idx], silver[currency_idx], basis)
+
+        net_wealth = np.round(result["net_wealth"], 2).tolist()
+        zakat = np.round(result["zakat_payable"], 2).tolist()
+        eligible = result["eligible"].tolist()
+        above_gold = result["above_gold_nisab"].tolist()
+        above_silver = result["above_silver_nisab"].tolist()
+        codes = [CURRENCIES[c] for c in currency_idx.tolist()]
+        rows = [
+            {"index": index, "currency": code, "net_wealth": net, "zakat_payable": due, "zakat_due": e,
+             "above_gold_nisab": g, "above_silver_nisab": s}
+            for index, code, net, due, e, g, s in zip(valid, codes, net_wealth, zakat, eligible,
+                                                       above_gold, above_silver)
+        ]
+
+        # Totaux par devise (les montants ne s'additionnent pas entre devises)
+        totals = {}
+        for idx in np.unique(currency_idx).tolist():
+            mask = currency_idx == idx
+            totals[CURRENCIES[idx]] = {
+                "households": int(mask.sum()),
+                # Nul pour les foyers sous le nisab
+                "zakat_payable": round(float(result["zakat_payable"][mask].sum()), 2),
+                "zakat_due": int(result["eligible"][mask].sum()),
+                "above_gold_nisab": int(result["above_gold_nisab"][mask].sum()),
+                "above_silver_nisab": int(result["above_silver_nisab"][mask].sum()),
+            }
+
+        used = sorted(totals) or [currency.upper()]
+        return {
+            "nisab_basis": basis,
+            "households": rows,
+            "invalid": invalid,
+            "totals": totals,
+            "nisab_data": {code: self._nisab_data(self.oracle.quote(code)) for code in used},
+        }
@@ -0,0 +1,45 @@
+"""Configuration pytest (depuis backend/) : python -m pytest -q
+
+Aucun accès réseau : les données de marché viennent de synthetic_fixtures()
+rejouées par ReplayBackend.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ATHAR_BACKGROUND_REFRESH", "0")
+os.environ.setdefault("ATHAR_PREWARM", "0")
+os.environ.setdefault("ATHAR_CACHE_URL", "memory")
+_tmp = tempfile.mkdtemp(prefix="athar-tests-")
+os.environ.setdefault("ATHAR_HISTORY_DIR", os.path.join(_tmp, "history"))
+os.environ.setdefault("ATHAR_SCREENING_INDEX", os.path.join(_tmp, "screening_index.sqlite"))
+
+from services import market_data  # noqa: E402
+from services.market_data import MarketDataProvider, set_provider  # noqa: E402
+from services.replay import ReplayBackend, synthetic_fixtures  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fixtures():
+    return synthetic_fixtures()
+
+
+@pytest.fixture
+def replay_provider(fixtures):
+    """Provider partagé rejouant les fixtures, restauré après le test"""
+    previous = market_data._provider
+    provider = MarketDataProvider(ReplayBackend(fixtures))
+    set_provider(provider)
+    yield provider
+    set_provider(previous)
+
+
+@pytest.fixture
+def client(replay_provider):
+    from app import create_app
+    app = create_app()
+    app.testing = True
+    return app.test_client()
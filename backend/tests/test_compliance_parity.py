@@ -0,0 +1,152 @@
+"""Parité du moteur AAOIFI vectoriel et du référentiel compilé avec la logique scalaire historique"""
+import re
+
+import numpy as np
+import pytest
+
+from benchmarks.bench_business_rules import legacy_analyze
+from benchmarks.bench_compliance import legacy_profile, random_universe
+from services.business_rules import RULES
+from services.compliance_engine import build_frame, compute_ratios, evaluate, evaluate_row, ratios_row
+from services.screening_service import HalalScreeningService
+
+
+def legacy_analyze_ratios(info: dict) -> tuple:
+    """Copie des ratios historiques de /api/screening/analyze"""
+    market_cap = info.get('marketCap', 0)
+    total_debt = info.get('totalDebt', 0)
+    total_cash = info.get('totalCash', 0)
+    debt_ratio = (total_debt / market_cap * 100) if market_cap > 0 else 0
+    cash_ratio = (total_cash / market_cap * 100) if market_cap > 0 else 0
+    return debt_ratio, cash_ratio
+
+
+def summary(row) -> dict:
+    return {
+        "debt_ratio": float(row['debt_ratio']), "cash_ratio": float(row['cash_ratio']),
+        "is_halal": bool(row['is_halal']), "sharia_score": int(row['sharia_score']),
+        "rating": int(row['rating']),
+    }
+
+
+@pytest.fixture(scope="module")
+def infos(fixtures):
+    """Fixtures de rejeu + univers aléatoire (valeurs manquantes, extrêmes)"""
+    infos = {symbol: entry["info"] for symbol, entry in fixtures.items()}
+    infos.update(random_universe(2000, seed=3))
+    infos.update({
+        "EMPTY": {},
+        "ZERO": {"marketCap": 0, "totalAssets": 0, "totalDebt": 1e9},
+        "EDGE": {"marketCap": 100.0, "totalDebt": 33.0, "totalCash": 32.995},
+        "NEG": {"marketCap": -5e9, "totalDebt": 1e9, "totalCash": 1e9},
+    })
+    return infos
+
+
+@pytest.mark.parametrize("whitelisted,activity_halal", [(False, True), (True, True), (False, False)])
+def test_evaluate_matches_legacy_profile(infos, whitelisted, activity_halal):
+    frame = build_frame(infos)
+    frame['whitelisted'] = whitelisted
+    frame['activity_halal'] = activity_halal
+    result = evaluate(frame)
+    for ticker, info in infos.items():
+        expected = legacy_profile(info, whitelisted, activity_halal)
+        assert summary(result.loc[ticker]) == expected, ticker
+        assert summary(evaluate_row(info, activity_halal, whitelisted)) == expected, ticker
+
+
+def test_evaluate_row_matches_evaluate(infos):
+    rng = np.random.default_rng(5)
+    frame = build_frame(infos)
+    frame['activity_halal'] = rng.random(len(frame)) < 0.8
+    frame['whitelisted'] = rng.random(len(frame)) < 0.1
+    result = evaluate(frame).to_dict('index')
+    for ticker, info in infos.items():
+        flags = frame.loc[ticker]
+        row = evaluate_row(info, bool(flags['activity_halal']), bool(flags['whitelisted']))
+        assert row == {k: v.item() if hasattr(v, 'item') else v for k, v in result[ticker].items()}, ticker
+
+
+def test_non_numeric_values_are_missing():
+    """"N/A" faisait planter la logique historique : traité comme une valeur absente"""
+    info = {"marketCap": "N/A", "totalDebt": 1e9, "totalAssets": 4e9, "pegRatio": "1.2"}
+    expected = legacy_profile({"totalDebt": 1e9, "totalAssets": 4e9, "pegRatio": 1.2})
+    assert summary(evaluate(build_frame({"NA": info})).iloc[0]) == expected
+    assert summary(evaluate_row(info)) == expected
+
+
+def test_analyze_ratios_match_legacy(fixtures):
+    infos = {symbol: entry["info"] for symbol, entry in fixtures.items()}
+    infos["NOCAP"] = {"totalDebt": 1e9}
+    debt, cash = compute_ratios(build_frame(infos), method='analyze')
+    for i, (ticker, info) in enumerate(infos.items()):
+        expected = legacy_analyze_ratios(info)
+        assert (debt[i], cash[i]) == pytest.approx(expected, rel=1e-12), ticker
+        assert ratios_row(info, method='analyze') == (debt[i], cash[i]), ticker
+
+
+def test_screening_profiles_single_and_batch_agree(replay_provider, fixtures):
+    screening = HalalScreeningService()
+    tickers = list(fixtures)
+    batch, errors = screening.get_company_profiles(tickers)
+    assert errors == {}
+    for ticker in tickers:
+        assert batch[ticker] == screening.get_company_profile(ticker), ticker
+
+
+TEXTS = [
+    "Technology Consumer Electronics designs smartphones and tablets worldwide.",
+    "Financial Services Banks - Regional provides banking and mortgage lending services.",
+    "Operates casinos, hotels and resorts in Las Vegas; sports betting online.",
+    "Brewers and distillers of beer, wine and spirits (alcoholic beverages).",
+    "Offices in Birmingham and Shanghai; chamber of commerce member.",
+    "Aerospace & Defense: missiles, weaponry and military aircraft.",
+    "Le Groupe’s “Adult  Entertainment” division — pork and bacon products.",
+    "Interest-rate swaps, reinsurance and insurers.",
+    "",
+]
+
+
+def reference_terms(text: str) -> set:
+    """Référence scalaire : chaque forme de chaque règle cherchée en mots entiers"""
+    lowered = text.lower()
+    return {
+        term for term, _, forms in RULES.rules for form in forms
+        if re.search(r"\b" + r"\s+".join(map(re.escape, form.split())) + r"\b", lowered)
+    }
+
+
+def assert_legacy_whole_words(text: str):
+    """Tout terme historique présent en mot entier est détecté ; les termes
+    partiels historiques ("ham" dans Birmingham) ne le sont plus"""
+    terms = set(RULES.found_terms(text))
+    whole_words = {
+        term for term in legacy_analyze("", "", text)
+        if re.search(rf"\b{re.escape(term)}\b", text.lower())
+    }
+    assert whole_words <= terms <= reference_terms(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_scan_matches_legacy_on_whole_words(text):
+    assert_legacy_whole_words(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_scan_matches_single_regex(text):
+    """Positions et termes identiques à la regex unique du référentiel"""
+    expected = [
+        (m.lastgroup, m.start(), m.end()) for m in RULES._regex.finditer(text)
+    ]
+    got = [
+        (group, m.start, m.end) for m in RULES.scan(text)
+        for group, (term, _) in RULES._by_group.items() if term == m.term
+    ]
+    assert got == expected
+
+
+def test_scan_on_fixture_summaries(fixtures):
+    for entry in fixtures.values():
+        info = entry["info"]
+        assert_legacy_whole_words(
+            f"{info.get('sector', '')} {info.get('industry', '')} {info.get('longBusinessSummary', '')}")
@@ -0,0 +1,63 @@
+"""Indicateurs multi-tickers : chaque ticker sur son propre calendrier"""
+import numpy as np
+import pandas as pd
+
+from api.routes import screening
+from services.indicators import calendar_groups, compute
+
+
+def closes(dates, seed: int, tz: str = None) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    index = pd.DatetimeIndex(dates)
+    if tz:
+        index = index.tz_localize(tz)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index)))), index=index)
+
+
+# Paris cote le vendredi saint, New York non ; Riyad cote du dimanche au jeudi
+US = pd.bdate_range("2023-01-02", "2024-04-30").drop(pd.Timestamp("2024-03-29"))
+EU = pd.bdate_range("2023-01-02", "2024-05-02")
+SA = pd.bdate_range("2023-01-01", "2024-05-02", freq="C", weekmask="Sun Mon Tue Wed Thu")
+SERIES = {
+    "AAPL": closes(US, 1, "America/New_York"),
+    "MSFT": closes(US, 2, "America/New_York"),
+    "AIR.PA": closes(EU, 3, "Europe/Paris"),
+    "2222.SR": closes(SA, 4, "Asia/Riyadh"),
+}
+
+
+def test_groups_follow_each_calendar():
+    groups = {tuple(symbols): (dates, matrix) for symbols, dates, matrix in calendar_groups(SERIES)}
+    assert set(groups) == {("AAPL", "MSFT"), ("AIR.PA",), ("2222.SR",)}
+    dates, matrix = groups[("2222.SR",)]
+    assert len(dates) == len(SA) and np.isfinite(matrix).all()
+
+
+def test_indicators_match_single_ticker_computation():
+    for symbols, _, matrix in calendar_groups(SERIES):
+        values = compute(matrix)
+        for i, ticker in enumerate(symbols):
+            alone = compute(SERIES[ticker].to_numpy()[None, :])
+            for name, expected in alone.items():
+                np.testing.assert_allclose(values[name][i], expected[0], equal_nan=True, err_msg=f"{ticker} {name}")
+
+
+def test_route_reports_each_ticker_last_session(client, monkeypatch):
+    class Store:
+        def get_history(self, ticker, period=None):
+            if ticker not in SERIES:
+                raise ValueError("Ticker inconnu")
+            return pd.DataFrame({"Close": SERIES[ticker]})
+
+    monkeypatch.setattr(screening, "get_history_store", Store)
+    response = client.post("/api/screening/indicators",
+                           json={"tickers": "2222.SR, AAPL, NOPE, AIR.PA", "indicators": ["rsi", "sma"]})
+    body = response.get_json()
+    assert [r["ticker"] for r in body["results"]] == ["2222.SR", "AAPL", "AIR.PA"]
+    assert [e["ticker"] for e in body["errors"]] == ["NOPE"]
+    for row in body["results"]:
+        series = SERIES[row["ticker"]]
+        assert row["date"] == series.index[-1].strftime("%Y-%m-%d")
+        assert row["close"] == round(float(series.iloc[-1]), 2)
+        expected = compute(series.to_numpy()[None, :], ["rsi", "sma"])
+        assert row["indicators"] == {n: round(float(v[0, -1]), 2) for n, v in expected.items()}
@@ -0,0 +1,115 @@
+"""Projection Monte Carlo et simulation DCA vectorisée"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_monte_carlo import synthetic_history
+from services import monte_carlo
+from services.monte_carlo import percentile_bands, project
+from services.simulation_service import MAX_PROJECTION_PATHS, SimulationService
+
+
+def bands(paths: dict) -> dict:
+    return {key: percentile_bands(paths[key]) for key in ("final_value", "purification", "max_drawdown")}
+
+
+@pytest.mark.parametrize("chunk_paths,workers", [(256, 1), (512, 1), (768, 2), (2048, 2)])
+def test_seed_gives_same_paths_for_any_chunking(monkeypatch, chunk_paths, workers):
+    returns, yields = synthetic_history(n_months=120, n_tickers=3)
+    amounts = np.full(3, 100.0)
+    reference = project(returns, yields, amounts, 60, 3000, seed=42, workers=1)
+
+    monkeypatch.setattr(monte_carlo, "CHUNK_PATHS", chunk_paths)
+    paths = project(returns, yields, amounts, 60, 3000, seed=42, workers=workers)
+    for key in ("final_value", "purification", "max_drawdown"):
+        np.testing.assert_array_equal(paths[key], reference[key])
+    assert bands(paths) == bands(reference)
+
+
+def test_more_paths_keep_the_first_ones():
+    returns, yields = synthetic_history(n_months=120, n_tickers=2)
+    amounts = np.full(2, 50.0)
+    small = project(returns, yields, amounts, 24, 1000, seed=7, workers=1)
+    large = project(returns, yields, amounts, 24, 5000, seed=7, workers=1)
+    np.testing.assert_array_equal(large["final_value"][:1000], small["final_value"])
+
+
+def test_project_dca_is_reproducible(replay_provider):
+    service = SimulationService()
+    first = service.project_dca("AAPL, MSFT", 200, horizon_years=5, n_paths=2000, seed=3, workers=1)
+    second = service.project_dca("AAPL, MSFT", 200, horizon_years=5, n_paths=2000, seed=3, workers=2)
+    assert first == second
+    assert first["seed"] == "3"
+
+
+def legacy_dca(prices: pd.DataFrame, dividends: pd.DataFrame, amount: float) -> dict:
+    """Boucle historique mois par mois (un ticker à la fois)
+
+    Le dividende d'un mois est versé aux parts détenues à l'ex-date,
+    c'est-à-dire achetées les mois précédents.
+    """
+    out = {k: np.zeros(prices.shape) for k in ("shares", "invested", "dividends", "value")}
+    for j, ticker in enumerate(prices.columns):
+        shares = invested = received = 0.0
+        last_price = 0.0
+        for m, (price, dividend) in enumerate(zip(prices[ticker], dividends[ticker])):
+            received += dividend * shares
+            if pd.notna(price) and price > 0:
+                shares += amount / price
+                invested += amount
+            if pd.notna(price):
+                last_price = price
+            out["shares"][m, j] = shares
+            out["invested"][m, j] = invested
+            out["dividends"][m, j] = received
+            out["value"][m, j] = shares * last_price
+    return out
+
+
+def assert_dca_matches_legacy(prices: pd.DataFrame, dividends: pd.DataFrame, amounts: list):
+    run = SimulationService()._dca(prices, dividends, amounts)
+    for a, amount in enumerate(amounts):
+        expected = legacy_dca(prices, dividends, amount)
+        for key, values in expected.items():
+            np.testing.assert_allclose(run[key][a], values, rtol=1e-12, err_msg=key)
+
+
+def test_dca_matches_legacy_loop_with_gaps():
+    index = pd.date_range("2015-01-31", periods=36, freq="ME")
+    rng = np.random.default_rng(0)
+    prices = pd.DataFrame(rng.uniform(20, 200, (36, 3)), index=index, columns=["A", "B", "C"])
+    prices.iloc[:10, 1] = np.nan  # coté plus tard
+    prices.iloc[20:23, 2] = np.nan  # suspension de cotation
+    prices.iloc[5, 0] = 0.0  # cours aberrant
+    dividends = pd.DataFrame(0.0, index=index, columns=prices.columns)
+    dividends.iloc[::3] = rng.uniform(0.1, 1.0, (12, 3))
+    assert_dca_matches_legacy(prices, dividends, [50.0, 100.0, 333.33])
+
+
+def test_dca_matches_legacy_loop_on_fixtures(replay_provider):
+    prices, dividends = SimulationService()._load_monthly(["AAPL", "MSFT", "XOM"], 2018)
+    assert prices is not None and dividends.to_numpy().sum() > 0
+    assert_dca_matches_legacy(prices, dividends, [100.0, 250.0])
+
+
+@pytest.mark.parametrize("kwargs,message", [
+    ({"horizon_years": 0}, "horizon_years"),
+    ({"n_paths": 0}, "n_paths"),
+    ({"n_paths": MAX_PROJECTION_PATHS + 1}, "n_paths"),
+    ({"block_months": 0}, "block_months"),
+    ({"block_months": 400}, "Historique insuffisant"),
+])
+def test_project_dca_validation(replay_provider, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        SimulationService().project_dca("AAPL", 100, **{"n_paths": 100, **kwargs})
+
+
+@pytest.mark.parametrize("payload", [
+    {"horizon_years": 0},
+    {"n_paths": 0},
+    {"block_months": 400},
+])
+def test_project_route_rejects_invalid_parameters(client, payload):
+    response = client.post("/api/simulation/project", json={"tickers": "AAPL", "n_paths": 100, **payload})
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
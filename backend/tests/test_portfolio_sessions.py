@@ -0,0 +1,58 @@
+"""Sessions de valorisation incrémentale partagées entre workers"""
+import pytest
+
+from services.portfolio_service import PortfolioSessionService
+from services.shared_cache import SQLiteCache
+
+ASSETS = [
+    {"ticker": "AAPL", "qty": 10, "avg_price": 150},
+    {"ticker": "MSFT", "qty": 5, "avg_price": 300},
+    {"ticker": "SPUS", "qty": 20, "avg_price": 35, "type": "etf_islamic"},
+]
+
+
+@pytest.fixture
+def workers(replay_provider, tmp_path):
+    """Deux workers : chacun son service et sa connexion au même fichier de cache"""
+    path = str(tmp_path / "cache.sqlite")
+    return [PortfolioSessionService(cache=SQLiteCache(path)) for _ in range(2)]
+
+
+def test_session_continues_on_another_worker(workers):
+    first = workers[0].analyze_delta(ASSETS)
+    assert first["full"]
+
+    # Rafraîchissement des cours sur l'autre worker : rien n'a bougé
+    refreshed = workers[1].analyze_delta(session_id=first["session_id"])
+    assert not refreshed["full"]
+    assert refreshed["changed"] == [] and refreshed["removed"] == []
+    assert refreshed["total_value"] == first["total_value"]
+
+    # Ajout d'une ligne : seule la nouvelle ligne est recalculée
+    added = workers[0].analyze_delta(ASSETS + [{"ticker": "NVDA", "qty": 2, "avg_price": 400}],
+                                     refreshed["session_id"])
+    assert not added["full"]
+    assert [row["index"] for row in added["changed"]] == [3]
+
+
+def expire(service: PortfolioSessionService, session_id: str):
+    service.sessions.set(("portfolio_session", session_id), None, -1)
+
+
+def test_expired_session_falls_back_to_a_full_valuation(workers):
+    first = workers[0].analyze_delta(ASSETS)
+    expire(workers[0], first["session_id"])
+
+    with_assets = workers[1].analyze_delta(ASSETS, first["session_id"])
+    assert with_assets["full"] and len(with_assets["changed"]) == len(ASSETS)
+
+    # Sans liste d'actifs : retrouvée par l'empreinte de la session
+    expire(workers[0], first["session_id"])
+    without_assets = workers[1].analyze_delta(session_id=first["session_id"])
+    assert without_assets["full"]
+    assert without_assets["total_value"] == first["total_value"]
+
+
+def test_unknown_portfolio_still_needs_its_assets(workers):
+    with pytest.raises(KeyError):
+        workers[0].analyze_delta(session_id="0" * 24 + "-" + "0" * 16)
@@ -0,0 +1,141 @@
+"""Ordonnanceur de rafraîchissement : bail partagé, publication entre workers, inactivité"""
+import threading
+import time
+
+import pytest
+
+from services.live_feed import LivePricePoller
+from services.market_data import TTLCache
+from services.refresh_scheduler import RefreshScheduler
+from services.shared_cache import LocalRedis, RedisCache, SQLiteCache
+
+
+class WorkerCache(SQLiteCache):
+    """Vue d'un worker sur le cache partagé (détenteur de bail distinct par instance)"""
+
+    def __init__(self, path: str, owner: str):
+        super().__init__(path)
+        self.owner = owner
+
+    def acquire(self, name: str, ttl: float, owner: str = None) -> bool:
+        return super().acquire(name, ttl, owner=self.owner)
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: SQLiteCache(str(tmp_path / "cache.sqlite")),
+    lambda tmp_path: RedisCache(LocalRedis()),
+])
+def test_lease_is_exclusive_until_it_expires(tmp_path, make):
+    cache = make(tmp_path)
+    assert cache.acquire("refresh:x", 0.2, owner="a")
+    assert not cache.acquire("refresh:x", 0.2, owner="b")
+    assert cache.acquire("refresh:x", 0.2, owner="a")  # prolongation
+    assert cache.acquire("refresh:y", 0.2, owner="b")
+    time.sleep(0.3)
+    assert cache.acquire("refresh:x", 0.2, owner="b")
+    assert not cache.acquire("refresh:x", 0.2, owner="a")
+
+
+def test_process_cache_always_grants_the_lease():
+    assert TTLCache().acquire("refresh:x", 1)
+
+
+def counting_loader(calls: list):
+    def load():
+        calls.append(time.monotonic())
+        return {"n": len(calls)}
+    return load
+
+
+def test_only_the_lease_holder_loads_shared_datasets(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    calls, received = [], []
+    workers = [RefreshScheduler(workers=1, cache=WorkerCache(path, f"w{i}")) for i in range(3)]
+    for i, scheduler in enumerate(workers):
+        scheduler.register("prices", counting_loader(calls), 60, shared=True,
+                           on_update=lambda value, at, i=i: received.append((i, value["n"])))
+
+    assert workers[0].get("prices") == {"n": 1}
+    assert [s.get("prices") for s in workers[1:]] == [{"n": 1}, {"n": 1}]
+    assert len(calls) == 1
+    assert sorted(received) == [(0, 1), (1, 1), (2, 1)]
+    assert [s.status()["prices"]["leader"] for s in workers] == [True, False, False]
+
+    # Nouvelle publication du détenteur : les autres la reprennent à leur prochain rechargement
+    workers[0].refresh("prices")
+    time.sleep(0.2)
+    for scheduler in workers[1:]:
+        scheduler.refresh("prices")
+    time.sleep(0.2)
+    assert len(calls) == 2
+    assert [s.peek("prices") for s in workers] == [{"n": 2}] * 3
+
+
+def test_idle_datasets_are_not_refreshed_in_background():
+    calls = []
+    scheduler = RefreshScheduler(workers=1, cache=TTLCache())
+    scheduler.register("prices", counting_loader(calls), 0.05, jitter=0, idle=0.3)
+    scheduler.get("prices")
+    scheduler.start()
+    try:
+        time.sleep(0.6)
+        assert scheduler.status()["prices"]["idle"]
+        paused = len(calls)
+        assert paused >= 3
+        time.sleep(0.3)
+        assert len(calls) == paused
+
+        # Un client revient : dernière valeur servie, le rechargement reprend
+        assert scheduler.get("prices") == {"n": paused}
+        time.sleep(0.3)
+        assert len(calls) > paused
+    finally:
+        scheduler.stop()
+
+
+def test_live_poller_followers_publish_without_polling(replay_provider, tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    polled = []
+    pollers, schedulers = [], []
+    for i in range(2):
+        poller = LivePricePoller({"AAPL": "Apple", "MSFT": "Microsoft"}, interval=60, provider=replay_provider)
+        scheduler = RefreshScheduler(workers=1, cache=WorkerCache(path, f"w{i}"))
+        scheduler.register("live_prices", lambda p=poller: polled.append(1) or p.fetch(), 60, shared=True,
+                           on_update=poller.publish)
+        pollers.append(poller)
+        schedulers.append(scheduler)
+
+    version = pollers[1].snapshot()[0]
+    woken = []
+    waiter = threading.Thread(target=lambda: woken.append(pollers[1].wait_for_update(version, 5)))
+    waiter.start()
+    rows = [s.get("live_prices") for s in schedulers]
+    waiter.join()
+
+    assert len(polled) == 1
+    assert rows[0] == rows[1] and [r["symbol"] for r in rows[0]] == ["AAPL", "MSFT"]
+    assert woken[0][0] == version + 1 and woken[0][2] == rows[0]
+
+
+def test_registered_datasets_are_shared_by_default(replay_provider, tmp_path):
+    import api.routes.news  # noqa: F401 (enregistre news_feed)
+    import services.live_feed  # noqa: F401
+    import services.nisab_oracle  # noqa: F401
+    from services.refresh_scheduler import IDLE_SECONDS, get_scheduler
+
+    datasets = get_scheduler()._datasets
+    assert {"news_feed", "metal_prices", "fx_rates", "live_prices"} <= set(datasets)
+    assert all(ds.shared for ds in datasets.values())
+    assert datasets["news_feed"].idle == IDLE_SECONDS
+
+    path = str(tmp_path / "cache.sqlite")
+    leader = RefreshScheduler(workers=1, cache=WorkerCache(path, "leader"))
+    follower = RefreshScheduler(workers=1, cache=WorkerCache(path, "follower"))
+    for name, ds in datasets.items():
+        calls = []
+        loader = (lambda ds=ds, calls=calls: calls.append(1) or ds.loader())
+        leader.register(name, loader, ds.interval)
+        follower.register(name, loader, ds.interval)
+        value = leader.get(name)
+        assert follower.get(name) == value, name
+        assert len(calls) == 1, name
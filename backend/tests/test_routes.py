@@ -0,0 +1,54 @@
+"""Table des routes paresseuses : générée depuis les blueprints et à jour"""
+import sys
+
+import pytest
+
+from api import lazy, route_table
+from api.lazy import ROUTE_TABLE_PATH, blueprint_routes, check_routes, render_route_table, verify_routes
+
+DEMO_ROUTES = '''
+from flask import Blueprint
+
+demo_bp = Blueprint("demo", __name__)
+WRITE = ["POST", "PUT"]
+
+
+@demo_bp.route(
+    "/items/<int:item_id>",
+    methods=WRITE,
+)
+def update_item(item_id):
+    return ""
+
+
+def list_items():
+    return ""
+
+
+demo_bp.add_url_rule("/items", view_func=list_items)
+'''
+
+
+def test_route_table_is_up_to_date():
+    assert check_routes() == []
+    with open(ROUTE_TABLE_PATH, encoding="utf-8") as f:
+        assert f.read() == render_route_table(blueprint_routes()), "régénérer : python -m api.lazy"
+
+
+def test_routes_are_read_from_blueprints_not_source(tmp_path, monkeypatch):
+    (tmp_path / "demo_routes.py").write_text(DEMO_ROUTES, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(lazy, "LAZY_BLUEPRINTS", {"demo": ("/api/demo", "demo_routes", "demo_bp")})
+    try:
+        assert blueprint_routes() == [
+            ("/api/demo/items", "demo.list_items", "demo_routes:list_items", ("GET",)),
+            ("/api/demo/items/<int:item_id>", "demo.update_item", "demo_routes:update_item", ("POST", "PUT")),
+        ]
+    finally:
+        sys.modules.pop("demo_routes", None)
+
+
+def test_stale_table_fails_verification(monkeypatch):
+    monkeypatch.setattr(route_table, "ROUTE_TABLE", route_table.ROUTE_TABLE[1:])
+    with pytest.raises(RuntimeError, match="python -m api.lazy"):
+        verify_routes()
@@ -0,0 +1,61 @@
+"""Cache L1 par processus devant le cache partagé"""
+import time
+
+import pandas as pd
+
+from services.market_data import MarketDataProvider
+from services.shared_cache import SQLiteCache, TieredCache, make_cache
+
+
+class QuoteBackend:
+    """Backend factice : clôture courante réglable, appels comptés"""
+
+    def __init__(self, price: float):
+        self.price = price
+        self.calls = 0
+
+    def fetch_history(self, ticker: str, **params):
+        self.calls += 1
+        return pd.DataFrame({"Close": [self.price - 1, self.price]}, index=pd.bdate_range("2024-01-01", periods=2))
+
+
+def test_repeated_reads_are_served_by_l1(tmp_path):
+    cache = TieredCache(SQLiteCache(str(tmp_path / "cache.sqlite")), l1_seconds=5)
+    cache.shared.set("k", {"v": 1}, 60)
+    first = cache.get("k")
+    assert all(cache.get("k") is first for _ in range(10))
+    assert cache.shared.hits == 1
+
+
+def test_writes_go_through_to_other_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    a, b = TieredCache(SQLiteCache(path), l1_seconds=0.2), TieredCache(SQLiteCache(path), l1_seconds=0.2)
+    a.set("k", 1, 60)
+    assert b.get("k") == 1
+    a.set("k", 2, 60)
+    assert b.get("k") == 1  # copie L1 de b
+    time.sleep(0.3)
+    assert b.get("k") == 2
+
+
+def test_refreshed_quotes_reach_other_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    poller_backend, reader_backend = QuoteBackend(100.0), QuoteBackend(0.0)
+    poller = MarketDataProvider(poller_backend, cache=TieredCache(SQLiteCache(path), l1_seconds=0.2))
+    reader = MarketDataProvider(reader_backend, cache=TieredCache(SQLiteCache(path), l1_seconds=0.2))
+
+    assert reader_backend.calls == 0 and poller.get_quote("AAPL", refresh=True)["price"] == 100.0
+    assert reader.get_quote("AAPL")["price"] == 100.0
+    poller_backend.price = 101.0
+    poller.get_quote("AAPL", refresh=True)
+    time.sleep(0.3)
+    assert reader.get_quote("AAPL")["price"] == 101.0
+    assert reader_backend.calls == 0
+
+
+def test_make_cache_puts_l1_in_front_of_shared_backends(tmp_path):
+    cache = make_cache("sqlite:///" + str(tmp_path / "cache.sqlite"))
+    assert isinstance(cache, TieredCache) and isinstance(cache.shared, SQLiteCache)
+    cache.set("k", 1, 60)
+    stats = cache.stats()
+    assert stats["backend"] == "sqlite" and stats["entries"] == 1 and stats["l1"]["entries"] == 1
@@ -0,0 +1,90 @@
+"""Budget Yahoo et disjoncteur : gros lots interactifs, pannes vs erreurs ordinaires"""
+import time
+
+import pytest
+
+from services import upstream
+from services.concurrency import fan_out
+from services.upstream import (BATCH, INTERACTIVE, CircuitBreaker, RateLimited, TokenBucket, UpstreamGate,
+                               batch_budget, is_upstream_failure, upstream_deadline, upstream_priority)
+
+
+class Response:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+class HTTPError(OSError):
+    """Comme requests.HTTPError : dérive d'OSError, porte la réponse"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"{status_code} Client Error")
+        self.response = Response(status_code)
+
+
+@pytest.mark.parametrize("error,failure", [
+    (ConnectionError("Connection reset by peer"), True),
+    (TimeoutError("read timed out"), True),
+    (RuntimeError("429 Too Many Requests"), True),
+    (HTTPError(429), True),
+    (HTTPError(503), True),
+    (HTTPError(404), False),
+    (KeyError("regularMarketPrice"), False),
+    (ValueError("No data found, symbol may be delisted"), False),
+    (RateLimited("budget"), False),
+])
+def test_only_transport_429_and_5xx_are_failures(error, failure):
+    assert is_upstream_failure(error) is failure
+
+
+def failing_gate(error, calls: int) -> UpstreamGate:
+    gate = UpstreamGate(TokenBucket(rate=1000, burst=1000), CircuitBreaker(threshold=3, window=60, cooldown=60))
+
+    def call():
+        raise error
+    for _ in range(calls):
+        with pytest.raises(type(error)):
+            gate.call(call)
+    return gate
+
+
+@pytest.mark.parametrize("error", [ValueError("Ticker inconnu"), HTTPError(404)])
+def test_breaker_ignores_ordinary_errors(error):
+    assert failing_gate(error, 10).breaker.state == "closed"
+
+
+def test_breaker_opens_on_server_errors():
+    assert failing_gate(HTTPError(503), 3).breaker.state == "open"
+
+
+def test_deadline_bounds_the_wait_for_a_token():
+    bucket = TokenBucket(rate=0.1, burst=1)
+    assert bucket.acquire(INTERACTIVE)  # vide le seau
+    start = time.monotonic()
+    with upstream_deadline(0.1):
+        assert not bucket.acquire(BATCH)
+    assert time.monotonic() - start < 1
+
+
+def test_large_interactive_batch_waits_for_its_tokens(monkeypatch):
+    monkeypatch.setattr(upstream, "RATE", 40.0)
+    monkeypatch.setattr(upstream, "BURST", 2.0)
+    monkeypatch.setattr(upstream, "MAX_WAIT", {**upstream.MAX_WAIT, INTERACTIVE: 0.2})
+    tickers = [f"T{i}" for i in range(30)]
+
+    def run(priority, timeout):
+        gate = UpstreamGate(TokenBucket(rate=40, burst=2))
+        with upstream_priority(priority), upstream_deadline(timeout):
+            return fan_out(lambda t: gate.call(lambda: t), tickers, timeout=timeout)
+
+    _, errors = run(INTERACTIVE, 10)
+    assert any(isinstance(e, RateLimited) for e in errors.values())
+
+    priority, timeout = batch_budget(len(tickers))
+    assert priority == BATCH and timeout > 0.2
+    results, errors = run(priority, timeout)
+    assert not errors and len(results) == len(tickers)
+
+
+def test_small_batches_stay_interactive():
+    assert batch_budget(1) == (INTERACTIVE, upstream.DEFAULT_TIMEOUT)